@@ -0,0 +1,107 @@
+"""
+模糊匹配微基准：对比 thefuzz.process.extractOne 线性扫描与预建的 FuzzyIndex
+
+用法（在插件根目录执行）:
+    python benchmarks/bench_fuzzy.py [--roster 2000] [--aliases 500] [--queries 2000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from thefuzz import fuzz, process  # noqa: E402
+
+from core.fuzzy import FuzzyIndex  # noqa: E402
+
+# 常见于角色名的汉字，用于生成模拟角色表
+CHARSET = (
+    "钟离胡桃雷电将军艾尔海森纳西妲芙宁娜那维莱特夜兰申鹤甘雨魈刻晴可莉温迪"
+    "丹恒景元刃卡芙卡银狼镜流黄泉花火流萤砂金知更鸟阿米娅能天使陈塞雷娅艾雅法拉"
+    "星见雅朱鸢艾莲安比妮可比利猫又柏妮思今汐长离相里要椿守岸人卡提希娅"
+)
+
+
+def make_roster(size: int, rng: random.Random) -> list[str]:
+    names = set()
+    while len(names) < size:
+        names.add("".join(rng.choices(CHARSET, k=rng.randint(2, 5))))
+    return sorted(names)
+
+
+def make_query(name: str, rng: random.Random) -> str:
+    """模拟用户输入：错一个字、漏一个字或多一个字"""
+    chars = list(name)
+    op = rng.choice(["replace", "drop", "insert", "keep"])
+    pos = rng.randrange(len(chars))
+    if op == "replace":
+        chars[pos] = rng.choice(CHARSET)
+    elif op == "drop" and len(chars) > 2:
+        chars.pop(pos)
+    elif op == "insert":
+        chars.insert(pos, rng.choice(CHARSET))
+    return "".join(chars)
+
+
+def bench(label: str, fn, queries: list[str]) -> list:
+    results = []
+    start = time.perf_counter()
+    for query in queries:
+        results.append(fn(query))
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<28} 总耗时 {elapsed * 1000:9.1f} ms  "
+        f"平均 {elapsed / len(queries) * 1e6:8.1f} µs/次"
+    )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--roster", type=int, default=2000, help="角色表大小")
+    parser.add_argument("--aliases", type=int, default=500, help="别名数量")
+    parser.add_argument("--queries", type=int, default=2000, help="查询次数")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    roster = make_roster(args.roster, rng)
+    aliases = {f"a{i}": rng.choice(roster) for i in range(args.aliases)}
+    targets = [rng.choice(roster) for _ in range(args.queries)]
+    queries = [make_query(name, rng) for name in targets]
+
+    start = time.perf_counter()
+    index = FuzzyIndex(roster, aliases=aliases)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(
+        f"角色表 {len(roster)} 个，别名 {len(aliases)} 个，查询 {len(queries)} 次；"
+        f"索引构建耗时 {build_ms:.1f} ms"
+    )
+
+    def extract_one(query):
+        result = process.extractOne(query, roster, scorer=fuzz.ratio)
+        return result if result and result[1] >= 60 else None
+
+    linear = bench("extractOne 线性扫描", extract_one, queries)
+    indexed = bench("FuzzyIndex.best", index.best, queries)
+    bench("FuzzyIndex.search(top5)", index.search, queries)
+
+    def accuracy(results):
+        return sum(1 for r, t in zip(results, targets) if r and r[0] == t) / len(
+            targets
+        )
+
+    agree = sum(
+        1 for a, b in zip(linear, indexed) if (a and a[0]) == (b and b[0])
+    ) / len(queries)
+    print(
+        f"命中原角色比例: extractOne {accuracy(linear):.1%}，"
+        f"FuzzyIndex {accuracy(indexed):.1%}；两者结果一致 {agree:.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,382 @@
+"""
+离线端到端基准：在本地 HTTP 服务器上提供各游戏站点的页面（见 fixture_site.py），
+先校验 HTTP 解析（HttpResolver 的角色接口、消歧义页检测和选项提取，以及插件的 _resolve_http），
+再用真实的无头浏览器驱动插件的 get_url、_fuzzy_match、_get_role_list 和 take_full_screenshot，
+输出各阶段耗时分位数、不同并发下的吞吐量以及截图大小；HTTP 解析结果与本地站点不符时报错退出
+
+详情页默认使用 benchmarks/snapshots 中的真实页面快照，没有快照的游戏使用生成的页面；
+需要在装有 AstrBot 和浏览器驱动的环境中运行（与插件运行环境相同），不访问任何外部网站
+
+用法（在插件根目录执行）:
+    python benchmarks/bench_offline.py [--games ys,fz] [--rounds 5]
+        [--concurrency 1,2,4] [--latency 0.05] [--snapshots DIR | --synthetic]
+        [--http-only]
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SNAPSHOTS_DIR = os.path.join(PLUGIN_DIR, "benchmarks", "snapshots")
+sys.path.insert(0, PLUGIN_DIR)
+# 插件内部使用相对导入，需要以包的形式导入 main
+sys.path.insert(0, os.path.dirname(PLUGIN_DIR))
+
+from aiohttp import web  # noqa: E402
+from astrbot.api.star import StarTools  # noqa: E402
+
+from bench_fuzzy import make_query  # noqa: E402
+from fixture_site import DISAMBIGUATION_NAMES, FixtureSite  # noqa: E402
+from core.metrics import summarize  # noqa: E402
+
+
+def load_raw_profiles(games: list[str]) -> dict[str, dict]:
+    profiles = {}
+    for path in sorted(Path(PLUGIN_DIR, "profiles").glob("*.json")):
+        if games and path.stem not in games:
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            profiles[path.stem] = json.load(f)
+    return profiles
+
+
+def print_summary(label: str, samples: list[float]) -> None:
+    summary = summarize(samples)
+    if not summary["count"]:
+        print(f"  {label:<20} 无样本")
+        return
+    print(
+        f"  {label:<20} n={summary['count']:<4} p50 {summary['p50_ms']:8.1f} ms  "
+        f"p95 {summary['p95_ms']:8.1f} ms  max {summary['max_ms']:8.1f} ms"
+    )
+
+
+async def timed(samples: list[float], coro):
+    started_at = time.perf_counter()
+    try:
+        return await coro
+    finally:
+        samples.append(time.perf_counter() - started_at)
+
+
+async def start_site(site: FixtureSite, port: int) -> tuple[web.AppRunner, str]:
+    runner = web.AppRunner(site.app())
+    await runner.setup()
+    tcp_site = web.TCPSite(runner, "127.0.0.1", port)
+    await tcp_site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def create_plugin(data_dir: Path, config: dict):
+    """在临时数据目录中加载插件，站点配置覆盖指向本地服务器"""
+    StarTools.get_data_dir = staticmethod(lambda name=None: data_dir)
+    module = importlib.import_module(f"{os.path.basename(PLUGIN_DIR)}.main")
+    return module.FzInfoPlugin(None, config)
+
+
+def expect(actual, expected, label: str) -> None:
+    if actual != expected:
+        raise AssertionError(f"{label}: 期望 {expected!r}，实际 {actual!r}")
+
+
+async def bench_http(plugin, site: FixtureSite, with_browser: bool) -> None:
+    """
+    HTTP 解析：对照本地站点生成的数据校验 HttpResolver 和 _resolve_http 的结果并计时
+
+    消歧义页经 _resolve_http 解析时需要浏览器截图，with_browser 为 False 时只校验检测和选项提取
+    """
+    prefix = importlib.import_module(type(plugin).__module__).DISAMBIGUATION_PREFIX
+    resolver = plugin.http_resolver
+    samples = {"roster": [], "check_page": [], "resolve_http": []}
+    for game in site.profiles:
+        if game not in plugin.gamelist:
+            continue
+        game_config = plugin.gamelist[game]
+        names = [
+            n for n in site.rosters[game].values() if n not in DISAMBIGUATION_NAMES
+        ]
+        if game_config["roster_api"]:
+            roles = await timed(
+                samples["roster"], resolver.fetch_roster(game_config["roster_api"])
+            )
+            expect(
+                roles,
+                {n: site.detail_url(game, n) for n in site.rosters[game].values()},
+                f"{game} fetch_roster",
+            )
+            # 索引为空，_resolve_http 通过接口刷新索引后解析
+            plugin.roster.replace(game, {})
+            plugin.roster.updated_at[game] = 0
+            name = names[0]
+            result = await timed(
+                samples["resolve_http"], plugin._resolve_http(game, name, None)
+            )
+            expect(result, (site.detail_url(game, name), name), f"{game} _resolve_http")
+        disambiguation = game_config["disambiguation"]
+        if not disambiguation:
+            continue
+        name = names[0]
+        page = await timed(
+            samples["check_page"],
+            resolver.check_page(site.detail_url(game, name), disambiguation),
+        )
+        expect(page["disambiguation"], False, f"{game} check_page({name})")
+        result = await timed(
+            samples["resolve_http"], plugin._resolve_http(game, name, None)
+        )
+        expect(result, (site.detail_url(game, name), name), f"{game} _resolve_http")
+        for name in DISAMBIGUATION_NAMES:
+            if name not in site.rosters[game].values():
+                continue
+            url = site.detail_url(game, name)
+            page = await timed(
+                samples["check_page"], resolver.check_page(url, disambiguation)
+            )
+            expect(page["disambiguation"], True, f"{game} check_page({name})")
+            expect(
+                [option["title"] for option in page["options"]],
+                site.disambiguation_options(game),
+                f"{game} 消歧义选项",
+            )
+            expect(
+                [option["url"] for option in page["options"]],
+                [site.detail_url(game, n) for n in site.disambiguation_options(game)],
+                f"{game} 消歧义选项链接",
+            )
+            if with_browser:
+                result = await timed(
+                    samples["resolve_http"], plugin._resolve_http(game, name, None)
+                )
+                expect(result, (prefix + url, name), f"{game} _resolve_http")
+    print("HTTP 解析（结果已校验）:")
+    labels = {
+        "roster": "fetch_roster",
+        "check_page": "check_page",
+        "resolve_http": "_resolve_http",
+    }
+    for key, label in labels.items():
+        print_summary(label, samples[key])
+
+
+async def bench_stages(plugin, site: FixtureSite, game: str, rounds: int, rng) -> None:
+    """逐阶段计时：角色列表、模糊匹配、URL 解析（索引命中/浏览器）、截图与压缩"""
+    # 消歧义页需要用户交互，不参与计时
+    names = [n for n in site.rosters[game].values() if n not in DISAMBIGUATION_NAMES]
+    # URL 解析和截图优先使用有快照的角色
+    pages = site.corpus.get(game) or names
+    samples = {
+        key: []
+        for key in (
+            "role_list",
+            "fuzzy",
+            "url_index",
+            "url_browser",
+            "screenshot",
+            "encode",
+        )
+    }
+    raw_sizes, encoded_sizes, parts = [], [], []
+    game_config = plugin.gamelist[game]
+    # 索引命中路径使用的完整角色表
+    index = {n: site.detail_url(game, n) for n in site.rosters[game].values()}
+    plugin.roster.replace(game, index)
+    async with plugin.browser_pool.lease() as worker:
+        for _ in range(rounds):
+            if game_config.get("roster_link_xpath"):
+                roles = await timed(
+                    samples["role_list"], plugin._get_role_list(game, worker)
+                )
+                plugin.roster.replace(game, roles or index)
+            for name in rng.sample(names, min(10, len(names))):
+                await timed(
+                    samples["fuzzy"],
+                    plugin._fuzzy_match(game, make_query(name, rng), worker),
+                )
+            name = rng.choice(pages)
+            if game_config.get("url_type") == "search":
+                await timed(
+                    samples["url_index"], plugin.get_url(game, name, None, worker)
+                )
+                # 清空索引，走浏览器列表页搜索
+                plugin.roster.replace(game, {})
+                await timed(
+                    samples["url_browser"], plugin.get_url(game, name, None, worker)
+                )
+                plugin.roster.replace(game, index)
+            else:
+                await timed(
+                    samples["url_browser"], plugin.get_url(game, name, None, worker)
+                )
+            output_path = os.path.join(game_config["output_dir"], f"bench_{name}.png")
+            ok = await timed(
+                samples["screenshot"],
+                plugin.take_full_screenshot(
+                    site.detail_url(game, name), output_path, game, 3, worker=worker
+                ),
+            )
+            if not ok:
+                print(f"  截图失败: {name}")
+                continue
+            raw_sizes.append(os.path.getsize(output_path))
+            outputs = await timed(samples["encode"], plugin._encode_output(output_path))
+            encoded_sizes.append(
+                sum(os.path.getsize(p) for p in outputs) or raw_sizes[-1]
+            )
+            parts.append(len(outputs) or 1)
+    labels = {
+        "role_list": "_get_role_list",
+        "fuzzy": "_fuzzy_match",
+        "url_index": "get_url(索引命中)",
+        "url_browser": "get_url(浏览器)",
+        "screenshot": "take_full_screenshot",
+        "encode": "_encode_output",
+    }
+    for key, label in labels.items():
+        if samples[key]:
+            print_summary(label, samples[key])
+    if raw_sizes:
+        print(
+            f"  截图大小: 原图平均 {sum(raw_sizes) / len(raw_sizes) / 1024:.0f}KB，"
+            f"压缩后平均 {sum(encoded_sizes) / len(encoded_sizes) / 1024:.0f}KB，"
+            f"平均 {sum(parts) / len(parts):.1f} 张"
+        )
+
+
+async def bench_throughput(
+    plugin, site: FixtureSite, games: list[str], concurrency: int, requests: int, rng
+) -> None:
+    """完整的截图流程（租用浏览器 + 截图 + 压缩），不经过截图缓存"""
+    queue = asyncio.Queue()
+    for i in range(requests):
+        game = games[i % len(games)]
+        names = site.corpus.get(game) or [
+            n for n in site.rosters[game].values() if n not in DISAMBIGUATION_NAMES
+        ]
+        queue.put_nowait((game, rng.choice(names)))
+    latencies = []
+
+    async def client():
+        while not queue.empty():
+            game, name = queue.get_nowait()
+            started_at = time.perf_counter()
+            output_path = os.path.join(
+                plugin.gamelist[game]["output_dir"], f"tp_{time.monotonic_ns()}.png"
+            )
+            async with plugin.browser_pool.lease() as worker:
+                ok = await plugin.take_full_screenshot(
+                    site.detail_url(game, name), output_path, game, 3, worker=worker
+                )
+            if ok:
+                await plugin._encode_output(output_path)
+                latencies.append(time.perf_counter() - started_at)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started_at
+    summary = summarize(latencies)
+    print(
+        f"  并发 {concurrency:<3} 完成 {summary['count']}/{requests}  "
+        f"吞吐 {summary['count'] / elapsed:6.2f} 次/秒  "
+        f"p50 {summary.get('p50_ms', 0):8.1f} ms  p95 {summary.get('p95_ms', 0):8.1f} ms"
+    )
+
+
+async def run(args) -> None:
+    games = [g for g in args.games.split(",") if g] if args.games else []
+    levels = [int(c) for c in args.concurrency.split(",")]
+    site = FixtureSite(
+        load_raw_profiles(games),
+        roster_size=args.roster,
+        blocks=args.blocks,
+        latency=args.latency,
+        snapshots=None if args.synthetic else args.snapshots,
+    )
+    runner, base_url = await start_site(site, args.port)
+    data_dir = Path(tempfile.mkdtemp(prefix="gameinfo_bench_"))
+    print(f"本地站点: {base_url}，数据目录: {data_dir}")
+    os.makedirs(data_dir / "profiles")
+    for game, override in site.profile_overrides(base_url).items():
+        override["output_dir"] = str(data_dir / "shots" / game)
+        with open(data_dir / "profiles" / f"{game}.json", "w", encoding="utf-8") as f:
+            json.dump(override, f, ensure_ascii=False, indent=2)
+    config = {
+        "browser_type": args.browser,
+        "driver_path": args.driver_path,
+        "browser_pool_size": max(levels),
+        "browser_pool_max_waiting": args.requests,
+        "browser_warmup": False,
+        "metrics_dump_interval": 0,
+        "prewarm_list": [],
+        "prewarm_new_characters": False,
+    }
+    plugin = create_plugin(data_dir, config)
+    plugin.roster_task.cancel()
+    plugin.prewarm_task.cancel()
+    rng = random.Random(args.seed)
+    try:
+        await bench_http(plugin, site, with_browser=not args.http_only)
+        if args.http_only:
+            return
+        for game in site.profiles:
+            if game not in plugin.gamelist:
+                continue
+            os.makedirs(plugin.gamelist[game]["output_dir"], exist_ok=True)
+            print(f"【{plugin.gamelist[game]['name']}】")
+            await bench_stages(plugin, site, game, args.rounds, rng)
+        print("吞吐量（截图 + 压缩）:")
+        for concurrency in levels:
+            await bench_throughput(
+                plugin,
+                site,
+                [g for g in site.profiles if g in plugin.gamelist],
+                concurrency,
+                args.requests,
+                rng,
+            )
+    finally:
+        await plugin.terminate()
+        await runner.cleanup()
+        if not args.keep:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--games", default="", help="逗号分隔的游戏标识，默认全部")
+    parser.add_argument(
+        "--rounds", type=int, default=5, help="每个游戏的逐阶段测试轮数"
+    )
+    parser.add_argument("--concurrency", default="1,2,4", help="逗号分隔的并发数")
+    parser.add_argument("--requests", type=int, default=24, help="每个并发级别的请求数")
+    parser.add_argument("--roster", type=int, default=120, help="每个游戏的角色数")
+    parser.add_argument("--blocks", type=int, default=12, help="详情页内容块数")
+    parser.add_argument(
+        "--latency", type=float, default=0, help="每个请求的模拟网络延迟(秒)"
+    )
+    parser.add_argument("--snapshots", default=SNAPSHOTS_DIR, help="真实页面快照目录")
+    parser.add_argument(
+        "--synthetic", action="store_true", help="不使用快照，全部使用生成的页面"
+    )
+    parser.add_argument(
+        "--http-only", action="store_true", help="只校验 HTTP 解析，不启动浏览器"
+    )
+    parser.add_argument("--browser", default="chrome", help="chrome/edge/firefox")
+    parser.add_argument("--driver-path", default="", help="浏览器驱动路径")
+    parser.add_argument("--port", type=int, default=0, help="本地站点端口，默认随机")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--keep", action="store_true", help="保留临时数据目录和截图")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
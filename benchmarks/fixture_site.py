@@ -0,0 +1,339 @@
+"""
+离线基准测试使用的本地站点：按 profiles/*.json 中的规则生成各游戏的列表页、详情页、
+角色列表 JSON 接口和以撒消歧义页，由本地 aiohttp 服务器提供，不访问任何外部网站
+
+生成的页面满足各站点配置的约定（角色链接 XPath、角色名元素、截图截止元素、就绪选择器、栏目标题），
+页面高度、图片数量与真实 wiki 页面接近
+
+快照目录（默认 benchmarks/snapshots）中按请求路径存放各站点详情页的裁剪快照，保留真实页面的
+结构和 class，去掉脚本、导航和外部资源（如 snapshots/ys/character/10000030.html），存在时优先返回快照；snapshots/index.json 记录
+每个游戏快照对应的角色 {游戏: {角色 id 或页面名: 角色名}}，这些角色加入生成的角色表，
+基准测试的截图和 URL 解析优先使用它们。更新快照时把浏览器"另存为网页"得到的文件去掉脚本、
+图片换成 /static/img/<n>.png 后放入对应路径并更新 index.json
+"""
+
+import asyncio
+import html
+import io
+import json
+import random
+import re
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+from aiohttp import web
+from PIL import Image
+
+# 部分真实角色名，其余角色名随机生成
+KNOWN_NAMES = {
+    "fz": [
+        "阿米娅",
+        "能天使",
+        "陈",
+        "塞雷娅",
+        "艾雅法拉",
+        "银灰",
+        "史尔特尔",
+        "凯尔希",
+    ],
+    "ys": [
+        "钟离",
+        "胡桃",
+        "雷电将军",
+        "艾尔海森",
+        "纳西妲",
+        "芙宁娜",
+        "那维莱特",
+        "夜兰",
+    ],
+    "sr": ["丹恒", "景元", "刃", "卡芙卡", "银狼", "镜流", "黄泉", "流萤"],
+    "zzz": ["星见雅", "朱鸢", "艾莲", "安比", "妮可", "比利", "猫又", "柏妮思"],
+    "ww": ["今汐", "长离", "相里要", "椿", "守岸人", "卡提希娅", "忌炎", "吟霖"],
+    "issac": [
+        "硫磺火",
+        "科学怪人",
+        "妈妈的刀",
+        "血之契约",
+        "硫酸",
+        "魔眼",
+        "悲伤洋葱",
+        "D6",
+    ],
+    "endfield": [
+        "管理员",
+        "陈千语",
+        "佩丽卡",
+        "莱万汀",
+        "艾尔黛拉",
+        "骏卫",
+        "余烬",
+        "赛希",
+    ],
+}
+CHARSET = "钟离胡桃雷电将军艾尔海森纳西妲芙宁娜丹恒景元刃卡芙银狼镜流黄泉花火星见雅朱鸢"
+
+# 以撒中作为消歧义页的词条
+DISAMBIGUATION_NAMES = {"硫磺火"}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ margin: 0; font-family: sans-serif; background: #f6f6f6; }}
+.block {{ margin: 16px auto; width: 1200px; padding: 16px; background: #fff; }}
+.block img {{ width: 360px; height: 240px; margin: 4px; }}
+h2 {{ border-bottom: 1px solid #ccc; }}
+</style></head>
+<body>{body}</body></html>
+"""
+
+
+def _css_element(selector: str, inner: str = "") -> str:
+    """把 div.a.b / #id 这样的简单选择器还原成元素"""
+    if selector.startswith("#"):
+        return f'<div id="{selector[1:]}">{inner}</div>'
+    tag, *classes = selector.split(".")
+    return f'<{tag or "div"} class="{" ".join(classes)}">{inner}</{tag or "div"}>'
+
+
+def _section_titles(section: dict) -> list[str]:
+    """从栏目 XPath 中取出标题文字"""
+    return list(dict.fromkeys(re.findall(r"='([^']+)'\]?", section["value"])))
+
+
+class FixtureSite:
+    """
+    按站点配置生成的本地 wiki
+
+    Args:
+        profiles: 游戏 -> 原始站点配置（profiles/*.json 的内容）
+        roster_size: 每个游戏的角色数
+        images_per_block: 每个内容块中的图片数
+        blocks: 每个详情页的内容块数，决定页面高度
+        latency: 每个请求额外的延迟(秒)，模拟网络
+        snapshots: 快照目录，存在对应文件时返回快照，其中 index.json 列出的角色加入角色表
+        seed: 随机种子，保证每次生成的站点相同
+    """
+
+    def __init__(
+        self,
+        profiles: dict[str, dict],
+        roster_size: int = 120,
+        images_per_block: int = 3,
+        blocks: int = 12,
+        latency: float = 0,
+        snapshots: Path = None,
+        seed: int = 42,
+    ):
+        self.profiles = profiles
+        self.images_per_block = images_per_block
+        self.blocks = blocks
+        self.latency = latency
+        self.snapshots = Path(snapshots) if snapshots else None
+        rng = random.Random(seed)
+        self.rosters: dict[str, dict[str, str]] = {}  # 游戏 -> {角色 id: 角色名}
+        for game in profiles:
+            names = list(KNOWN_NAMES.get(game, []))
+            while len(names) < roster_size:
+                name = "".join(rng.choices(CHARSET, k=rng.randint(2, 4)))
+                if name not in names:
+                    names.append(name)
+            self.rosters[game] = {str(10000 + i): name for i, name in enumerate(names)}
+        self.corpus: dict[str, list[str]] = {}  # 游戏 -> 有快照的角色名
+        index_path = self.snapshots / "index.json" if self.snapshots else None
+        if index_path and index_path.is_file():
+            with open(index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            for game, pages in index.items():
+                if game not in self.rosters:
+                    continue
+                roster = self.rosters[game]
+                for key, name in pages.items():
+                    # 快照使用真实的角色 id，替换掉生成的同名角色
+                    for role_id in [i for i, n in roster.items() if n == name]:
+                        del roster[role_id]
+                    roster[key] = name
+                self.corpus[game] = list(pages.values())
+        self.images = [self._make_image(rng, i) for i in range(8)]
+        self.base_url = ""
+
+    @staticmethod
+    def _make_image(rng: random.Random, index: int) -> bytes:
+        """带渐变和噪点的立绘替身，压缩特性接近真实图片"""
+        size = (360, 240)
+        gradient = Image.linear_gradient("L").resize(size).rotate(index * 45)
+        channels = [
+            Image.blend(gradient, Image.effect_noise(size, 24), rng.uniform(0.2, 0.5))
+            for _ in range(3)
+        ]
+        image = Image.merge("RGB", channels)
+        buffer = io.BytesIO()
+        image.save(buffer, "PNG")
+        return buffer.getvalue()
+
+    def base_path(self, game: str) -> str:
+        """本地站点中该游戏的路径前缀，保留原站点的路径以满足 XPath 中的 href 约定"""
+        return f"/{game}{urlparse(self.profiles[game]['url']).path.rstrip('/')}"
+
+    def profile_overrides(self, base_url: str) -> dict[str, dict]:
+        """指向本地站点的站点配置覆盖，写入插件数据目录的 profiles 文件夹"""
+        self.base_url = base_url
+        overrides = {}
+        for game, profile in self.profiles.items():
+            override = {"url": base_url + self.base_path(game), "cache_ttl": 1}
+            if profile.get("roster_api"):
+                override["roster_api"] = {
+                    "url": f"{base_url}/{game}/api/character.json",
+                    "url_template": base_url + self.base_path(game) + "/{id}",
+                    "name_fields": ["CHS"],
+                }
+            overrides[game] = override
+        return overrides
+
+    def detail_url(self, game: str, name: str) -> str:
+        """角色详情页的本地 URL"""
+        if self.profiles[game].get("url_type") == "search":
+            role_id = next(i for i, n in self.rosters[game].items() if n == name)
+            return f"{self.base_url}{self.base_path(game)}/{role_id}"
+        return f"{self.base_url}{self.base_path(game)}/{name}"
+
+    def app(self) -> web.Application:
+        app = web.Application(middlewares=[self._middleware])
+        app.router.add_get("/static/img/{index}.png", self._image)
+        app.router.add_get("/{game}/api/character.json", self._roster_api)
+        app.router.add_get("/{path:.*}", self._page)
+        return app
+
+    @web.middleware
+    async def _middleware(self, request, handler):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.snapshots:
+            snapshot = self.snapshots / (unquote(request.path).strip("/") + ".html")
+            if snapshot.is_file():
+                return web.FileResponse(snapshot)
+        return await handler(request)
+
+    async def _image(self, request):
+        index = int(request.match_info["index"]) % len(self.images)
+        return web.Response(body=self.images[index], content_type="image/png")
+
+    async def _roster_api(self, request):
+        game = request.match_info["game"]
+        if game not in self.rosters:
+            raise web.HTTPNotFound()
+        return web.json_response(
+            {role_id: {"CHS": name} for role_id, name in self.rosters[game].items()}
+        )
+
+    async def _page(self, request):
+        path = unquote(request.path)
+        for game in self.profiles:
+            base = self.base_path(game)
+            if path == base:
+                return self._html(self.list_page(game))
+            if path.startswith(base + "/"):
+                key = path[len(base) + 1 :]
+                page = self.detail_page(game, key)
+                if page is None:
+                    raise web.HTTPNotFound()
+                return self._html(page)
+        raise web.HTTPNotFound()
+
+    @staticmethod
+    def _html(text: str) -> web.Response:
+        return web.Response(text=text, content_type="text/html")
+
+    def list_page(self, game: str) -> str:
+        base = self.base_path(game)
+        links = "".join(
+            f'<a href="{base}/{role_id}" style="display:inline-block;width:120px">'
+            f'<div class="name">{html.escape(name)}</div><span>{html.escape(name)}</span></a>'
+            for role_id, name in self.rosters[game].items()
+        )
+        return PAGE_TEMPLATE.format(
+            title=f"{game} 角色列表", body=f'<div class="block">{links}</div>'
+        )
+
+    def detail_page(self, game: str, key: str) -> str | None:
+        profile = self.profiles[game]
+        if profile.get("url_type") == "search":
+            name = self.rosters[game].get(key)
+        else:
+            name = key if key in self.rosters[game].values() else None
+        if name is None:
+            return None
+        if game == "issac" and name in DISAMBIGUATION_NAMES:
+            return self.disambiguation_page(game, name)
+        blocks = []
+        titles = [
+            title
+            for section in profile.get("sections", {}).values()
+            for title in _section_titles(section)[:1]
+        ]
+        mediawiki = profile.get("url_type") == "append"
+        for i in range(self.blocks):
+            title = titles[i] if i < len(titles) else f"段落{i}"
+            heading = (
+                f'<h2><span class="mw-headline">{title}</span></h2>'
+                if mediawiki
+                else f"<div><div>{title}</div>"
+            )
+            images = "".join(
+                f'<img loading="lazy" src="/static/img/{i * self.images_per_block + j}.png">'
+                for j in range(self.images_per_block)
+            )
+            text = f"<p>{html.escape(name)} 的{title}说明文字。</p>" * 6
+            block = f"{heading}{text}{images}"
+            blocks.append(
+                f'<div class="block">{block}</div>'
+                if mediawiki
+                else f'<div class="block">{block}</div></div>'
+            )
+        footer = self._footer(profile)
+        body = (
+            f'<div class="mw-parser-output">{"".join(blocks)}</div>{footer}'
+            if mediawiki
+            else "".join(blocks) + footer
+        )
+        return PAGE_TEMPLATE.format(title=name, body=body)
+
+    def disambiguation_options(self, game: str) -> list[str]:
+        """消歧义页中列出的词条"""
+        return [
+            name
+            for name in list(self.rosters[game].values())[1:5]
+            if name not in DISAMBIGUATION_NAMES
+        ][:3]
+
+    def disambiguation_page(self, game: str, name: str) -> str:
+        marker = self.profiles[game]["disambiguation"]["marker"]
+        base = self.base_path(game)
+        options = "".join(
+            f'<li><span class="item"><a href="{base}/{other}" title="{other}">{other}</a></span></li>'
+            for other in self.disambiguation_options(game)
+        )
+        body = (
+            f'<div class="mw-parser-output"><p>{name}</p><ul>{options}</ul>'
+            f"<p>{marker}</p></div>"
+            f'<div id="catlinks"><div id="mw-normal-catlinks">'
+            f'<a title="分类:消歧义页">消歧义页</a></div></div>'
+        )
+        return PAGE_TEMPLATE.format(title=name, body=body)
+
+    @staticmethod
+    def _footer(profile: dict) -> str:
+        """按截图截止规则和就绪选择器生成页脚元素"""
+        selectors = []
+        for rule in profile.get("crop_end", []):
+            if rule.get("if_source_contains"):
+                continue
+            if rule.get("by") == "id":
+                selectors.append(f"#{rule['value']}")
+            elif rule.get("by", "css") == "css":
+                selectors.append(rule["value"])
+        selectors.append(profile.get("ready", {}).get("wait_selector", ""))
+        return "".join(
+            _css_element(selector, "页脚")
+            for selector in dict.fromkeys(selectors)
+            if selector
+        )
@@ -0,0 +1 @@
+"""astrbot_plugin_gameinfo 的内部组件（浏览器池、缓存等），由 main.py 组装使用"""
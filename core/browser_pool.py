@@ -0,0 +1,402 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+from astrbot.api import logger
+
+try:
+    import psutil
+except ImportError:  # 未安装 psutil 时不检查浏览器内存占用
+    psutil = None
+
+# 出现这些错误说明浏览器或 chromedriver 已经崩溃/断开，只能重建
+FATAL_ERROR_MARKERS = (
+    "invalidsessionid",
+    "invalid session id",
+    "session deleted",
+    "not reachable",
+    "disconnected",
+    "no such window",
+    "connection refused",
+    "max retries exceeded",
+)
+
+
+def is_fatal_error(e: Exception) -> bool:
+    if type(e).__name__ == "TimeoutException":
+        # selenium 自身的超时（页面加载、等待元素），浏览器仍然可用
+        return False
+    text = f"{type(e).__name__} {e}".lower()
+    return any(marker in text for marker in FATAL_ERROR_MARKERS)
+
+
+class PoolBusyError(Exception):
+    """等待队列已满或等待超时，无法租到浏览器"""
+
+
+class BrowserOpTimeout(Exception):
+    """单次浏览器操作超时"""
+
+
+class BrowserWorker:
+    """
+    浏览器池中的单个工作单元，持有一个独立的 driver 实例
+
+    selenium 的调用都是阻塞的，每个 worker 配一个专属线程，
+    所有浏览器操作都通过 run() 提交到该线程执行，不阻塞事件循环
+    """
+
+    def __init__(self, index: int, op_timeout: float = 30):
+        self.index = index
+        self.driver = None
+        self.uses = 0  # 已处理的查询次数
+        self.op_timeout = op_timeout
+        self.broken = False  # 操作超时后标记，归还时重建
+        self.tabs = None  # 该 driver 的标签页管理器，driver 重建时清空
+        self.created = 0  # 成功创建 driver 的次数
+        self.rss_mb = 0.0  # 最近一次检查时浏览器进程树的内存占用
+        self.executor = self._new_executor()
+
+    @property
+    def restarts(self) -> int:
+        """回收或崩溃后重建的次数"""
+        return max(0, self.created - 1)
+
+    @property
+    def navigations(self) -> int:
+        """当前 driver 打开过的页面数"""
+        return self.tabs.navigations if self.tabs else 0
+
+    def _new_executor(self) -> ThreadPoolExecutor:
+        return ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix=f"gameinfo-browser-{self.index}"
+        )
+
+    async def run(self, fn: Callable, *args, timeout: float = None, **kwargs):
+        """在 worker 专属线程中执行一次浏览器操作，超时抛出 BrowserOpTimeout"""
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor, functools.partial(fn, *args, **kwargs)
+        )
+        timeout = timeout or self.op_timeout
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            # 线程里的调用无法强制中断，标记后由浏览器池整体重建
+            self.broken = True
+            raise BrowserOpTimeout(
+                f"{self} 浏览器操作超时({timeout}秒): {getattr(fn, '__name__', fn)}"
+            ) from None
+        except Exception as e:
+            if is_fatal_error(e) and not self.broken:
+                # 浏览器已崩溃，归还时重建，下一个查询拿到新的浏览器
+                self.broken = True
+                logger.warning(f"{self} 浏览器已失去连接: {str(e)}")
+            raise
+
+    def rss(self) -> float:
+        """driver 及其启动的浏览器进程树的常驻内存(MB)，无法获取时为 0"""
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        if psutil is None or process is None:
+            return 0.0
+        try:
+            root = psutil.Process(process.pid)
+            total = root.memory_info().rss
+            for child in root.children(recursive=True):
+                try:
+                    total += child.memory_info().rss
+                except psutil.Error:
+                    pass
+        except psutil.Error:
+            return 0.0
+        self.rss_mb = total / 1048576
+        return self.rss_mb
+
+    def __repr__(self) -> str:
+        return f"<BrowserWorker #{self.index} uses={self.uses}>"
+
+
+class BrowserPool:
+    """
+    无头浏览器池：每次查询租用一个 worker，用完后归还
+
+    创建时不启动浏览器，driver 在首次租用时创建，或由 warm_up 在后台预先启动
+
+    Args:
+        factory: 创建 driver 的函数，失败时返回 None
+        size: 池中浏览器数量
+        max_waiting: 最多允许排队等待的查询数
+        acquire_timeout: 单次租用的最长等待时间(秒)
+        op_timeout: 单次浏览器操作的超时时间(秒)
+        max_navigations: 单个浏览器打开页面数上限，达到后回收重建，0 表示不限制
+        max_rss_mb: 单个浏览器进程树的内存上限(MB)，超过后回收重建，0 表示不限制
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        size: int = 2,
+        max_waiting: int = 10,
+        acquire_timeout: float = 120,
+        op_timeout: float = 30,
+        max_navigations: int = 0,
+        max_rss_mb: float = 0,
+    ):
+        self._factory = factory
+        self.size = max(1, int(size))
+        self.max_waiting = max(0, int(max_waiting))
+        self.acquire_timeout = acquire_timeout
+        self.op_timeout = op_timeout
+        self.max_navigations = max_navigations
+        self.max_rss_mb = max_rss_mb
+        self.workers = [BrowserWorker(i, op_timeout) for i in range(self.size)]
+        self._idle: asyncio.Queue[BrowserWorker] = asyncio.Queue()
+        for worker in self.workers:
+            self._idle.put_nowait(worker)
+        self.waiting = 0  # 当前排队数
+        self.closed = False
+        self._bg_tasks: set[asyncio.Task] = set()  # 后台重建任务，保留引用防止被回收
+        # 统计：累计租用次数、被拒绝次数、所有 worker 被占用的总时长
+        self.started_at = time.monotonic()
+        self.leases = 0
+        self.rejected = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def started(self) -> bool:
+        """是否已经启动过浏览器（预热或首次租用）"""
+        return any(worker.created for worker in self.workers)
+
+    async def warm_up(self, delay: float = 0) -> None:
+        """
+        后台依次启动空闲 worker 的浏览器，正被查询租用的 worker 由租用方自行启动；
+        单个 driver 创建失败不影响其他 worker
+        """
+        await asyncio.sleep(delay)
+        started_at = time.monotonic()
+        for _ in range(self._idle.qsize()):
+            try:
+                worker = self._idle.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            try:
+                if worker.driver is None and not self.closed:
+                    worker.driver = await self._create(worker)
+            finally:
+                self._idle.put_nowait(worker)
+        alive = sum(1 for w in self.workers if w.driver)
+        logger.info(
+            f"浏览器池预热完成: {alive}/{self.size} 个实例可用，"
+            f"耗时 {time.monotonic() - started_at:.2f}s"
+        )
+
+    async def _create(self, worker: BrowserWorker):
+        """在 worker 线程中创建 driver（驱动下载、浏览器启动均为阻塞操作）"""
+        try:
+            # 启动浏览器可能需要下载驱动，给足时间
+            driver = await worker.run(self._factory, timeout=max(self.op_timeout, 120))
+            if driver is not None:
+                worker.created += 1
+            return driver
+        except BrowserOpTimeout as e:
+            logger.error(f"{worker} 创建浏览器超时: {str(e)}")
+            self._reset(worker)
+            return None
+
+    @property
+    def busy(self) -> int:
+        """正在被租用的 worker 数"""
+        return len(self.workers) - self._idle.qsize()
+
+    @property
+    def has_idle(self) -> bool:
+        """有空闲的 worker 且没有排队的租用"""
+        return not self._idle.empty() and not self.waiting
+
+    @asynccontextmanager
+    async def lease(self):
+        """租用一个健康的 worker，退出上下文时自动归还"""
+        if self.closed:
+            raise PoolBusyError("浏览器池已关闭")
+        if self._idle.empty() and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise PoolBusyError(f"排队人数已达上限({self.max_waiting})")
+        self.waiting += 1
+        try:
+            worker = await asyncio.wait_for(
+                self._idle.get(), timeout=self.acquire_timeout
+            )
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise PoolBusyError(f"等待浏览器超过 {self.acquire_timeout} 秒") from None
+        finally:
+            self.waiting -= 1
+        leased_at = time.monotonic()
+        self.leases += 1
+        try:
+            await self._ensure_healthy(worker)
+            worker.uses += 1
+            yield worker
+        finally:
+            self.busy_seconds += time.monotonic() - leased_at
+            if worker.broken:
+                self._reset(worker)
+            if self.max_navigations and worker.navigations >= self.max_navigations:
+                # 在后台重建，不拖慢本次查询，重建完成后再放回空闲队列
+                task = asyncio.create_task(
+                    self._recycle_and_release(
+                        worker, f"已打开 {worker.navigations} 个页面"
+                    )
+                )
+                self._bg_tasks.add(task)
+                task.add_done_callback(self._bg_tasks.discard)
+            else:
+                self._idle.put_nowait(worker)
+
+    async def _ensure_healthy(self, worker: BrowserWorker) -> None:
+        """健康检查，driver 无响应或已崩溃时重建"""
+        if worker.driver is not None:
+            try:
+                await worker.run(worker.driver.execute_script, "return 1", timeout=10)
+                return
+            except Exception as e:
+                logger.warning(f"{worker} 健康检查失败，准备重建: {str(e)}")
+                if worker.broken:
+                    self._reset(worker)
+                else:
+                    await worker.run(self._quit, worker, worker.driver)
+                    worker.driver = None
+        worker.driver = await self._create(worker)
+        worker.uses = 0
+        worker.tabs = None
+        if worker.driver is None:
+            logger.error(f"{worker} 浏览器驱动重建失败")
+
+    async def _recycle(self, worker: BrowserWorker, reason: str) -> None:
+        """在达到上限之前主动退出并重建浏览器"""
+        logger.info(f"{worker} 回收浏览器: {reason}")
+        try:
+            await worker.run(self._quit, worker, worker.driver, timeout=15)
+            worker.driver = None
+        except BrowserOpTimeout:
+            self._reset(worker)
+        worker.tabs = None
+        worker.uses = 0
+        worker.rss_mb = 0.0
+        if not self.closed:
+            worker.driver = await self._create(worker)
+
+    async def _recycle_and_release(self, worker: BrowserWorker, reason: str) -> None:
+        try:
+            await self._recycle(worker, reason)
+        finally:
+            self._idle.put_nowait(worker)
+
+    async def run_supervisor(self, interval: float = 60) -> None:
+        """
+        后台任务：定期检查空闲的浏览器
+
+        - driver 不存在（启动或重建失败）时重新创建
+        - 无响应时重建
+        - 进程树内存超过 max_rss_mb 时回收
+        """
+        while not self.closed:
+            await asyncio.sleep(interval)
+            for _ in range(self._idle.qsize()):
+                try:
+                    worker = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                try:
+                    await self._supervise(worker)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"{worker} 检查浏览器状态失败: {str(e)}")
+                finally:
+                    self._idle.put_nowait(worker)
+
+    async def _supervise(self, worker: BrowserWorker) -> None:
+        if not worker.created:
+            return  # 还没有被使用过，等首次租用时再启动
+        await self._ensure_healthy(worker)
+        if worker.driver is None:
+            return
+        rss_mb = await asyncio.to_thread(worker.rss)
+        if self.max_rss_mb and rss_mb > self.max_rss_mb:
+            await self._recycle(worker, f"内存占用 {rss_mb:.0f}MB")
+
+    def snapshot(self) -> dict:
+        """浏览器池整体状态：排队深度、利用率（被占用时长 / 总时长）等"""
+        elapsed = max(time.monotonic() - self.started_at, 1e-6)
+        return {
+            "size": self.size,
+            "alive": sum(1 for worker in self.workers if worker.driver is not None),
+            "busy": self.busy,
+            "waiting": self.waiting,
+            "utilization": round(
+                min(1.0, self.busy_seconds / (elapsed * self.size)), 4
+            ),
+            "leases": self.leases,
+            "rejected": self.rejected,
+            "restarts": sum(worker.restarts for worker in self.workers),
+            "workers": self.stats(),
+        }
+
+    def stats(self) -> list[dict]:
+        """各浏览器的状态，用于日志和统计"""
+        return [
+            {
+                "index": worker.index,
+                "alive": worker.driver is not None,
+                "uses": worker.uses,
+                "navigations": worker.navigations,
+                "restarts": worker.restarts,
+                "rss_mb": round(worker.rss_mb, 1),
+            }
+            for worker in self.workers
+        ]
+
+    def _reset(self, worker: BrowserWorker) -> None:
+        """
+        丢弃卡死的线程和 driver：旧线程里的调用无法中断，
+        在后台线程里退出旧 driver，worker 换用新线程
+        """
+        logger.warning(f"{worker} 已卡死或崩溃，丢弃并重建")
+        if worker.driver is not None:
+            threading.Thread(
+                target=self._quit, args=(worker, worker.driver), daemon=True
+            ).start()
+        worker.driver = None
+        worker.tabs = None
+        worker.rss_mb = 0.0
+        worker.broken = False
+        old_executor = worker.executor
+        worker.executor = worker._new_executor()
+        old_executor.shutdown(wait=False)
+
+    @staticmethod
+    def _quit(worker: BrowserWorker, driver: Any) -> None:
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            logger.warning(f"{worker} 退出 driver 失败: {str(e)}")
+
+    async def close(self) -> None:
+        """关闭所有浏览器"""
+        self.closed = True
+        for task in list(self._bg_tasks):
+            task.cancel()
+        for worker in self.workers:
+            try:
+                await worker.run(self._quit, worker, worker.driver, timeout=15)
+                worker.driver = None
+            except BrowserOpTimeout:
+                self._reset(worker)
+            worker.executor.shutdown(wait=False)
@@ -0,0 +1,350 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+
+from astrbot.api import logger
+
+from .imaging import remove_files
+from .shared_store import SharedStore
+
+
+class ScreenshotCache:
+    """
+    截图缓存管理：以 (游戏, URL, 变体) 的哈希作为缓存键和文件名
+
+    每条缓存包含原始截图和压缩/切分后用于发送的图片（outputs），
+    元数据索引记录来源 URL、总大小、创建时间和最近命中时间，
+    按单游戏和全局的容量上限做 LRU 淘汰，并由后台任务定期清理
+
+    Args:
+        index_path: 元数据索引文件路径
+        game_dirs: 游戏 -> 截图目录
+        ttl: 缓存有效期(秒)，过期后仍可作为旧图先行发送
+        stale_max: 过期缓存最长可继续使用的时间(秒)，不大于 ttl 时不使用过期缓存
+        max_bytes: 全局容量上限(字节)，0 表示不限制
+        game_max_bytes: 单个游戏的容量上限(字节)，0 表示不限制
+        game_ttls: 游戏 -> 单独设置的缓存有效期(秒)
+        shared: 多实例共用的存储，设置时元数据索引保存在其中而不是 index_path；
+            查询只读内存中的索引，写入先排队，由 sync_shared 定期与共享存储双向同步
+    """
+
+    def __init__(
+        self,
+        index_path: Path,
+        game_dirs: dict[str, str],
+        ttl: float,
+        stale_max: float = 0,
+        max_bytes: int = 0,
+        game_max_bytes: int = 0,
+        game_ttls: dict[str, float] = None,
+        shared: SharedStore = None,
+    ):
+        self.index_path = Path(index_path)
+        self.game_dirs = game_dirs
+        self.ttl = ttl
+        self.stale_max = stale_max
+        self.game_ttls = game_ttls or {}
+        self.max_bytes = max_bytes
+        self.game_max_bytes = game_max_bytes
+        self.shared = shared
+        self.entries: dict[str, dict] = {}
+        # 等待写入共享存储的条目、删除和命中时间，以及已同步到的修改时间
+        self._shared_puts: dict[str, dict] = {}
+        self._shared_deletes: set[str] = set()
+        self._shared_hits: dict[str, float] = {}
+        self._shared_since = 0.0
+        self._dirty = False
+        for game_dir in game_dirs.values():
+            os.makedirs(game_dir, exist_ok=True)
+        self.load()
+
+    @staticmethod
+    def make_key(game: str, url: str, variant: str = "") -> str:
+        digest = hashlib.sha1(f"{game}\n{url}\n{variant}".encode("utf-8"))
+        return digest.hexdigest()[:20]
+
+    def load(self) -> None:
+        if self.shared or not self.index_path.exists():
+            return  # 共享存储的索引在 sync_shared 中读取
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+            # 丢弃文件已不存在的记录
+            self.entries = {
+                key: entry
+                for key, entry in entries.items()
+                if all(os.path.exists(path) for path in self._files(entry))
+            }
+        except Exception as e:
+            logger.error(f"读取截图缓存索引失败: {str(e)}")
+            self.entries = {}
+
+    def save(self) -> None:
+        if self.shared:
+            self._dirty = False  # 由 sync_shared 写入共享存储
+            return
+        tmp_path = self.index_path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+        self._dirty = False
+
+    def ttl_for(self, game: str) -> tuple[float, float]:
+        """返回该游戏的 (有效期, 过期缓存最长可用时间)"""
+        ttl = self.game_ttls.get(game, self.ttl)
+        return ttl, max(ttl, self.stale_max)
+
+    def path_for(self, game: str, key: str) -> str:
+        return os.path.join(self.game_dirs[game], f"{key}.png")
+
+    def temp_path(self, final_path: str) -> str:
+        """每个请求独占的临时文件，写完后再原子替换到最终路径"""
+        return f"{final_path}.{uuid.uuid4().hex}.tmp.png"
+
+    def lookup(
+        self, game: str, url: str, variant: str = "", allow_stale: bool = False
+    ) -> list[str] | None:
+        """查找缓存，命中时更新最近命中时间；allow_stale 时也返回未超过 stale_max 的过期缓存"""
+        images, state = self.peek(game, url, variant)
+        if state == "fresh" or (state == "stale" and allow_stale):
+            return images
+        return None
+
+    def peek(
+        self, game: str, url: str, variant: str = ""
+    ) -> tuple[list[str] | None, str | None]:
+        """
+        查找缓存并返回其状态
+
+        Returns:
+            (用于发送的图片列表, "fresh" | "stale")，无可用缓存时为 (None, None)
+        """
+        key = self.make_key(game, url, variant)
+        entry = self.entries.get(key)
+        if not entry:
+            return None, None
+        images = self.images(entry)
+        if not all(os.path.exists(path) for path in images):
+            self._remove(key)
+            return None, None
+        ttl, stale_max = self.ttl_for(game)
+        age = time.time() - entry["created"]
+        if age >= stale_max:
+            return None, None
+        entry["last_hit"] = time.time()
+        self._dirty = True
+        if self.shared:
+            self._shared_hits[key] = entry["last_hit"]
+        return images, "fresh" if age < ttl else "stale"
+
+    def entry(self, game: str, url: str, variant: str = "") -> dict | None:
+        """取缓存条目（不论是否过期），文件已不存在时返回 None"""
+        entry = self.entries.get(self.make_key(game, url, variant))
+        if not entry or not all(os.path.exists(p) for p in self._files(entry)):
+            return None
+        return entry
+
+    def renew(self, key: str) -> list[str] | None:
+        """页面内容没有变化：把缓存的创建时间更新为现在，相当于重新截图"""
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+        entry["created"] = entry["last_hit"] = time.time()
+        entry["renewed"] = entry.get("renewed", 0) + 1
+        self._queue_put(entry)
+        self.save()
+        return self.images(entry)
+
+    @staticmethod
+    def images(entry: dict) -> list[str]:
+        """发送用的图片：有压缩输出时用压缩输出，否则用原始截图"""
+        return entry.get("outputs") or [entry["path"]]
+
+    @staticmethod
+    def _files(entry: dict) -> list[str]:
+        return [entry["path"], *entry.get("outputs", [])]
+
+    def commit(
+        self,
+        game: str,
+        url: str,
+        tmp_path: str,
+        variant: str = "",
+        tmp_outputs: list[str] = None,
+        fingerprint: str = None,
+    ) -> list[str]:
+        """
+        把渲染好的临时文件（原始截图及其压缩输出）放入缓存
+
+        Args:
+            fingerprint: 截图时页面内容的指纹，过期后据此判断是否需要重新截图
+
+        Returns:
+            list[str]: 用于发送的图片的最终路径
+        """
+        key = self.make_key(game, url, variant)
+        final_path = self.path_for(game, key)
+        outputs = []
+        for index, tmp_output in enumerate(tmp_outputs or []):
+            ext = os.path.splitext(tmp_output)[1]
+            outputs.append(f"{final_path[:-4]}.{index}{ext}")
+        old_entry = self.entries.get(key)
+        if old_entry:
+            # 新截图切分出的张数可能变少，删掉多余的旧文件
+            remove_files([p for p in old_entry.get("outputs", []) if p not in outputs])
+        os.replace(tmp_path, final_path)
+        for tmp_output, output in zip(tmp_outputs or [], outputs):
+            os.replace(tmp_output, output)
+        now = time.time()
+        entry = {
+            "key": key,
+            "game": game,
+            "url": url,
+            "variant": variant,
+            "path": final_path,
+            "outputs": outputs,
+            "created": now,
+            "last_hit": now,
+            "fingerprint": fingerprint,
+        }
+        entry["size"] = sum(os.path.getsize(path) for path in self._files(entry))
+        self.entries[key] = entry
+        self._queue_put(entry)
+        self._enforce_budget(protect=key)
+        self.save()
+        return self.images(entry)
+
+    def _remove(self, key: str) -> None:
+        entry = self.entries.pop(key, None)
+        self._dirty = True
+        if self.shared:
+            self._shared_puts.pop(key, None)
+            self._shared_hits.pop(key, None)
+            self._shared_deletes.add(key)
+        if entry:
+            remove_files(self._files(entry))
+
+    def _enforce_budget(self, protect: str = None) -> None:
+        """超出容量上限时按最近命中时间淘汰，protect 为刚写入的缓存"""
+        by_lru = sorted(self.entries.values(), key=lambda e: e["last_hit"])
+        if self.game_max_bytes:
+            usage: dict[str, int] = {}
+            for entry in by_lru:
+                usage[entry["game"]] = usage.get(entry["game"], 0) + entry["size"]
+            for entry in by_lru:
+                game = entry["game"]
+                if usage[game] <= self.game_max_bytes or entry["key"] == protect:
+                    continue
+                usage[game] -= entry["size"]
+                self._remove(entry["key"])
+        if self.max_bytes:
+            total = sum(e["size"] for e in self.entries.values())
+            for entry in by_lru:
+                if total <= self.max_bytes:
+                    break
+                if entry["key"] == protect or entry["key"] not in self.entries:
+                    continue
+                total -= entry["size"]
+                self._remove(entry["key"])
+
+    def sweep(self) -> None:
+        """清理超过 stale_max 的缓存、不在索引中的旧文件和遗留的临时文件，并执行容量限制"""
+        now = time.time()
+        for key, entry in list(self.entries.items()):
+            _, stale_max = self.ttl_for(entry["game"])
+            if now - entry["created"] >= stale_max or not os.path.exists(entry["path"]):
+                self._remove(key)
+        indexed = {
+            path for entry in self.entries.values() for path in self._files(entry)
+        }
+        for game, game_dir in self.game_dirs.items():
+            ttl, _ = self.ttl_for(game)
+            for name in os.listdir(game_dir):
+                path = os.path.join(game_dir, name)
+                if path in indexed or not os.path.isfile(path):
+                    continue
+                try:
+                    # 旧版本按角色名保存的截图和残留临时文件，过期后删除
+                    if now - os.path.getmtime(path) >= ttl:
+                        os.remove(path)
+                except OSError:
+                    pass
+        self._enforce_budget()
+        if self._dirty:
+            self.save()
+
+    def _queue_put(self, entry: dict) -> None:
+        if self.shared:
+            self._shared_deletes.discard(entry["key"])
+            self._shared_puts[entry["key"]] = entry
+
+    async def flush_shared(self) -> None:
+        """把排队的写入、删除和命中时间写入共享存储"""
+        if not self.shared:
+            return
+        puts, deletes, hits = self._shared_puts, self._shared_deletes, self._shared_hits
+        self._shared_puts, self._shared_deletes, self._shared_hits = {}, set(), {}
+        if not (puts or deletes or hits):
+            return
+        try:
+            await self.shared.write_renders(list(puts.values()), list(deletes), hits)
+        except Exception:
+            # 写入失败时放回队列，下次同步重试（期间的新写入优先）
+            self._shared_puts = {**puts, **self._shared_puts}
+            self._shared_deletes |= deletes - set(self._shared_puts)
+            self._shared_hits = {**hits, **self._shared_hits}
+            raise
+
+    async def pull_shared(self) -> None:
+        """读取其他实例写入或删除的条目"""
+        if not self.shared:
+            return
+        changes, self._shared_since = await self.shared.changed_renders(
+            self._shared_since
+        )
+        for key, entry in changes.items():
+            if key in self._shared_puts:
+                continue  # 本实例还没写入的条目更新
+            if entry is None:
+                # 其他实例已淘汰，文件也已由其删除
+                self.entries.pop(key, None)
+            elif all(os.path.exists(path) for path in self._files(entry)):
+                self.entries[key] = entry
+
+    async def sync_shared(self) -> None:
+        await self.flush_shared()
+        await self.pull_shared()
+
+    async def run_shared_sync_loop(self, interval: float = 2) -> None:
+        """后台任务：定期与共享存储同步，查询时只读内存中的索引"""
+        while True:
+            try:
+                await self.sync_shared()
+            except Exception as e:
+                logger.error(f"同步共享截图缓存失败: {str(e)}")
+            await asyncio.sleep(interval)
+
+    async def run_sweep_loop(self, interval: float = 600) -> None:
+        """后台任务：定期清理缓存"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                # 先同步所有实例的条目，不把其他实例刚截好的图当成孤立文件
+                await self.sync_shared()
+                self.sweep()
+                await self.flush_shared()
+            except Exception as e:
+                logger.error(f"清理截图缓存失败: {str(e)}")
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """各游戏的缓存文件数与占用字节数"""
+        result: dict[str, dict[str, int]] = {}
+        for entry in self.entries.values():
+            game_stats = result.setdefault(entry["game"], {"count": 0, "bytes": 0})
+            game_stats["count"] += 1
+            game_stats["bytes"] += entry["size"]
+        return result
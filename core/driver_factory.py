@@ -0,0 +1,145 @@
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from astrbot.api import logger
+
+# selenium 和 webdriver_manager 只在真正创建浏览器时导入，不拖慢插件加载
+
+USER_AGENTS = {
+    "chrome": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
+    "edge": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 Edg/91.0.864.59",
+    "firefox": "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0",
+}
+
+BROWSER_ARGUMENTS = [
+    "--headless",
+    "--disable-gpu",
+    "--window-size=1920,1080",
+    "--ignore-certificate-errors",
+    "--allow-insecure-localhost",
+    "log-level=3",
+    "disable-infobars",
+    "--disable-logging",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+]
+
+
+class DriverPathCache:
+    """
+    webdriver_manager 解析出的驱动路径缓存，保存在插件数据目录中，
+    之后启动直接使用，不再每次联网检查驱动版本
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.paths: dict[str, str] = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.paths = dict(json.load(f))
+            except Exception as e:
+                logger.warning(f"读取驱动路径缓存失败: {str(e)}")
+
+    def get(self, browser_type: str) -> str | None:
+        path = self.paths.get(browser_type)
+        return path if path and os.path.exists(path) else None
+
+    def set(self, browser_type: str, path: str | None) -> None:
+        with self._lock:
+            if path:
+                self.paths[browser_type] = path
+            else:
+                self.paths.pop(browser_type, None)
+            tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.paths, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def install_driver(browser_type: str) -> str:
+    """通过 webdriver_manager 下载或查找与本机浏览器匹配的驱动（需要联网）"""
+    if browser_type == "edge":
+        from webdriver_manager.microsoft import EdgeChromiumDriverManager
+
+        return EdgeChromiumDriverManager().install()
+    if browser_type == "firefox":
+        from webdriver_manager.firefox import GeckoDriverManager
+
+        return GeckoDriverManager().install()
+    from webdriver_manager.chrome import ChromeDriverManager
+
+    return ChromeDriverManager().install()
+
+
+def launch_browser(browser_type: str, driver_path: str):
+    """用指定的驱动启动无头浏览器"""
+    from selenium import webdriver
+
+    if browser_type == "edge":
+        from selenium.webdriver.edge.options import Options
+        from selenium.webdriver.edge.service import Service
+
+        browser = webdriver.Edge
+    elif browser_type == "firefox":
+        from selenium.webdriver.firefox.options import Options
+        from selenium.webdriver.firefox.service import Service
+
+        browser = webdriver.Firefox
+    else:
+        from selenium.webdriver.chrome.options import Options
+        from selenium.webdriver.chrome.service import Service
+
+        browser = webdriver.Chrome
+    options = Options()
+    options.add_argument(f"user-agent={USER_AGENTS[browser_type]}")
+    for argument in BROWSER_ARGUMENTS:
+        options.add_argument(argument)
+    # 只有 Chromium 家族才有 experimental option，做个防守式判断
+    if hasattr(options, "add_experimental_option"):
+        options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    return browser(service=Service(driver_path), options=options)
+
+
+def create_driver(
+    browser_type: str,
+    driver_path: str = "",
+    page_load_timeout: float = 30,
+    path_cache: DriverPathCache = None,
+):
+    """
+    创建一个无头浏览器实例，失败时返回 None；阻塞调用，需在 worker 线程中执行
+
+    驱动路径优先使用配置的 driver_path，其次是缓存的路径，最后才调用 webdriver_manager；
+    缓存的驱动启动失败（如浏览器升级后版本不匹配）时重新解析一次
+    """
+    started_at = time.monotonic()
+    source = "配置"
+    resolved = driver_path
+    if not resolved and path_cache:
+        resolved = path_cache.get(browser_type)
+        source = "缓存"
+    try:
+        if not resolved:
+            source = "webdriver_manager"
+            resolved = install_driver(browser_type)
+            if path_cache:
+                path_cache.set(browser_type, resolved)
+        driver = launch_browser(browser_type, resolved)
+        driver.set_page_load_timeout(page_load_timeout)
+    except Exception as e:
+        if source == "缓存":
+            logger.warning(f"使用缓存的驱动启动浏览器失败，重新解析驱动: {str(e)}")
+            path_cache.set(browser_type, None)
+            return create_driver(browser_type, "", page_load_timeout, path_cache)
+        logger.error(f"浏览器驱动初始化失败: {str(e)},请手动在配置中添加driver地址")
+        return None
+    logger.info(
+        f"浏览器驱动初始化成功: {browser_type}，耗时 {time.monotonic() - started_at:.2f}s"
+        f"（驱动路径来自{source}）"
+    )
+    return driver
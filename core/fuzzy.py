@@ -0,0 +1,133 @@
+import heapq
+import re
+
+from thefuzz import fuzz
+
+try:  # 拼音首字母匹配为可选功能，未安装 pypinyin 时跳过
+    from pypinyin import Style, lazy_pinyin
+except ImportError:
+    lazy_pinyin = None
+
+_STRIP_RE = re.compile(r"[\s·・._\-—()（）\[\]【】「」《》/]+")
+
+
+def normalize(text: str) -> str:
+    """去掉空白与常见分隔符并转小写，作为索引键"""
+    return _STRIP_RE.sub("", text).lower()
+
+
+def ngrams(text: str) -> set[str]:
+    """单字 + 相邻双字，中文名通常很短，单字能兜住错字/漏字"""
+    grams = set(text)
+    grams.update(bigrams(text))
+    return grams
+
+
+def bigrams(text: str) -> set[str]:
+    return {text[i : i + 2] for i in range(len(text) - 1)}
+
+
+def pinyin_keys(text: str) -> tuple[str, str]:
+    """返回 (全拼, 首字母)，未安装 pypinyin 时返回空串"""
+    if lazy_pinyin is None or text.isascii():
+        return "", ""
+    full = "".join(lazy_pinyin(text)).lower()
+    initials = "".join(lazy_pinyin(text, style=Style.FIRST_LETTER)).lower()
+    return full, initials
+
+
+class FuzzyIndex:
+    """
+    角色名模糊匹配索引，每次角色索引刷新时重建一次
+
+    查询时先用 n-gram / 拼音倒排表筛出少量候选，
+    再只对候选做 fuzz.ratio 精确打分，避免对整张列表线性扫描
+
+    Args:
+        names: 角色名列表
+        aliases: 别名 -> 角色名，如 {"42": "艾尔海森"}
+        max_candidates: 进入精确打分的候选数上限
+        min_candidates: 双字候选少于该数量时用单字补充
+    """
+
+    def __init__(
+        self,
+        names: list[str],
+        aliases: dict[str, str] = None,
+        max_candidates: int = 32,
+        min_candidates: int = 8,
+    ):
+        self.max_candidates = max_candidates
+        self.min_candidates = min_candidates
+        self.names: list[str] = list(dict.fromkeys(names))
+        self._keys: list[str] = [normalize(name) for name in self.names]
+        # 归一化键 -> 角色名，精确命中与别名命中都是 O(1)
+        self._exact: dict[str, str] = {}
+        for name, key in zip(self.names, self._keys):
+            self._exact.setdefault(key, name)
+        self._aliases: dict[str, str] = {
+            normalize(alias): target for alias, target in (aliases or {}).items()
+        }
+        self._postings: dict[str, list[int]] = {}
+        self._pinyin: dict[str, list[int]] = {}
+        for i, key in enumerate(self._keys):
+            for gram in ngrams(key):
+                self._postings.setdefault(gram, []).append(i)
+            for pinyin_key in pinyin_keys(key):
+                if pinyin_key:
+                    self._pinyin.setdefault(pinyin_key, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def resolve_alias(self, query: str) -> str | None:
+        return self._aliases.get(normalize(query))
+
+    def _candidates(self, key: str) -> list[int]:
+        """
+        按共享 n-gram 数量排序的候选下标
+
+        先只用双字倒排表（区分度高、倒排链短），候选太少时再用单字补充
+        """
+        hits: dict[int, int] = {}
+        for i in self._pinyin.get(key, ()):
+            hits[i] = 100  # 拼音/首字母完全一致，优先进入候选
+        for gram in bigrams(key):
+            for i in self._postings.get(gram, ()):
+                hits[i] = hits.get(i, 0) + 2
+        if len(hits) < self.min_candidates:
+            for gram in set(key):
+                for i in self._postings.get(gram, ()):
+                    hits[i] = hits.get(i, 0) + 1
+        if len(hits) <= self.max_candidates:
+            return list(hits)
+        return heapq.nlargest(self.max_candidates, hits, key=hits.__getitem__)
+
+    def search(self, query: str, k: int = 5, cutoff: int = 60) -> list[tuple[str, int]]:
+        """
+        返回最相似的 k 个角色名及相似度
+
+        Returns:
+            [(角色名, 相似度)]，按相似度从高到低排列
+        """
+        key = normalize(query)
+        if not key:
+            return []
+        target = self._aliases.get(key)
+        if target:
+            return [(target, 100)]
+        if key in self._exact:
+            return [(self._exact[key], 100)]
+        pinyin_hits = set(self._pinyin.get(key, ()))
+        scored = []
+        for i in self._candidates(key):
+            # 拼音完全一致视为命中，否则用 thefuzz 的 ratio 打分
+            score = 100 if i in pinyin_hits else fuzz.ratio(key, self._keys[i])
+            if score >= cutoff:
+                scored.append((self.names[i], score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:k]
+
+    def best(self, query: str, cutoff: int = 60) -> tuple[str, int] | None:
+        result = self.search(query, k=1, cutoff=cutoff)
+        return result[0] if result else None
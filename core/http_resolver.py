@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import json
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import aiohttp
+
+DEFAULT_USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+)
+
+
+class HttpResolveError(Exception):
+    """HTTP 解析失败，调用方应回退到浏览器"""
+
+
+# MediaWiki 页面中的当前修订版本号
+REVISION_PATTERN = re.compile(r'"wgCurRevisionId"\s*:\s*(\d+)')
+
+# 没有结束标签的元素，不入栈
+VOID_TAGS = set(
+    "area base br col embed hr img input link meta param source track wbr".split()
+)
+
+
+class _ListLinkParser(HTMLParser):
+    """
+    收集正文容器中 ul > li 里带 title 的链接，用于提取消歧义页的选项，
+    与配置中 //div[@class='mw-parser-output']/ul/li//a 的范围一致，不含侧边栏和导航框
+    """
+
+    def __init__(self, base_url: str, scope_class: str):
+        super().__init__()
+        self.base_url = base_url
+        self.scope_class = scope_class
+        self.stack: list[str] = []
+        self.scope = -1  # 正文容器在栈中的位置
+        self.links: list[dict] = []
+        self._seen: set[str] = set()
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "a":
+            self._collect(attrs)
+        if tag in VOID_TAGS:
+            return
+        if self.scope < 0 and self.scope_class in (attrs.get("class") or "").split():
+            self.scope = len(self.stack)
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        # 容错：未闭合的标签随外层标签一起出栈
+        while self.stack:
+            popped = self.stack.pop()
+            if len(self.stack) == self.scope:
+                self.scope = -1
+            if popped == tag:
+                break
+
+    def _collect(self, attrs: dict) -> None:
+        scope = self.scope
+        if scope < 0 or self.stack[scope + 1 : scope + 3] != ["ul", "li"]:
+            return
+        href, title = attrs.get("href"), attrs.get("title")
+        # 跳过页内锚点、编辑链接和不存在的页面（红链）
+        if (
+            not href
+            or not title
+            or href.startswith("#")
+            or "action=edit" in href
+            or "new" in (attrs.get("class") or "").split()
+        ):
+            return
+        url = urljoin(self.base_url, href)
+        if url not in self._seen:
+            self._seen.add(url)
+            self.links.append({"title": title, "url": url})
+
+
+def content_hash(text: str) -> str:
+    return "sha1:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def extract_list_links(
+    html: str, base_url: str, scope_class: str = "mw-parser-output"
+) -> list[dict]:
+    """从 HTML 正文中提取列表项里的链接 [{"title", "url"}]"""
+    parser = _ListLinkParser(base_url, scope_class)
+    parser.feed(html)
+    return parser.links
+
+
+class HttpResolver:
+    """
+    轻量 HTTP 客户端：在不打开浏览器的情况下解析角色详情页 URL
+
+    共用一个带连接池和 keep-alive 的会话，用于：
+
+    - 检查拼接出的页面是否为消歧义页，并直接从 HTML 中取出选项
+    - 从站点的 JSON 接口抓取角色列表，代替在浏览器中加载列表页
+
+    浏览器只用于最终截图
+
+    Args:
+        timeout: 单次请求的超时时间(秒)
+        limit: 连接池的最大连接数
+        user_agent: 请求使用的 User-Agent
+    """
+
+    def __init__(
+        self, timeout: float = 10, limit: int = 8, user_agent: str = DEFAULT_USER_AGENT
+    ):
+        self.timeout = timeout
+        self.limit = limit
+        self.user_agent = user_agent
+        self._session: aiohttp.ClientSession | None = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=4,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                headers={"User-Agent": self.user_agent},
+            )
+        return self._session
+
+    async def fetch(self, url: str) -> tuple[int, str, str]:
+        """
+        Returns:
+            (状态码, 跟随重定向后的最终 URL, 响应文本)
+        """
+        async with self._get_session().get(url) as response:
+            text = await response.text(errors="replace")
+            return response.status, str(response.url), text
+
+    async def fetch_json(self, url: str):
+        """请求 JSON 接口，状态码不是 200 时抛出 HttpResolveError"""
+        status, _, text = await self.fetch(url)
+        if status != 200:
+            raise HttpResolveError(f"请求 {url} 失败: HTTP {status}")
+        return json.loads(text)
+
+    async def fingerprint(self, url: str) -> str | None:
+        """
+        页面内容的指纹 "rev:<id>"，取 MediaWiki 的修订版本号，用于判断截图后页面是否有变化
+
+        ETag、Last-Modified 和 HTML 哈希会随部署或页面上的动态内容变化，与截图内容无关，不使用
+
+        Returns:
+            指纹，不是 MediaWiki 页面或请求失败时为 None
+        """
+        status, _, text = await self.fetch(url)
+        if status != 200:
+            return None
+        revision = REVISION_PATTERN.search(text)
+        return f"rev:{revision.group(1)}" if revision else None
+
+    async def check_page(self, url: str, disambiguation: dict = None) -> dict:
+        """
+        请求页面并判断是否为消歧义页
+
+        Args:
+            disambiguation: 站点配置中的消歧义规则，用到其中的 marker 和 options_scope
+
+        Returns:
+            dict: status, url(最终 URL), exists, disambiguation, options
+        """
+        status, final_url, html = await self.fetch(url)
+        if status >= 500:
+            raise HttpResolveError(f"请求 {url} 失败: HTTP {status}")
+        disambiguation = disambiguation or {}
+        marker = disambiguation.get("marker", "")
+        is_disambiguation = bool(marker) and status == 200 and marker in html
+        return {
+            "status": status,
+            "url": final_url,
+            "exists": status == 200,
+            "disambiguation": is_disambiguation,
+            "options": (
+                extract_list_links(
+                    html,
+                    final_url,
+                    disambiguation.get("options_scope", "mw-parser-output"),
+                )
+                if is_disambiguation
+                else []
+            ),
+        }
+
+    async def fetch_roster(self, source: dict) -> dict[str, str]:
+        """
+        从 JSON 接口抓取角色列表
+
+        Args:
+            source: 站点配置中的 roster_api：
+                url: JSON 接口地址，内容为 {id: 角色数据} 或 [角色数据]
+                name_fields: 依次尝试的角色名字段
+                id_field: 列表形式时角色 id 所在字段
+                url_template: 详情页 URL 模板，{id} 处填入角色 id
+
+        Returns:
+            dict: 角色名 -> 详情页URL
+        """
+        data = await self.fetch_json(source["url"])
+        if isinstance(data, dict):
+            items = data.items()
+        else:
+            items = (
+                (item.get(source["id_field"]) if isinstance(item, dict) else None, item)
+                for item in data
+            )
+        roles: dict[str, str] = {}
+        for role_id, item in items:
+            if role_id is None or not isinstance(item, dict):
+                continue
+            name = next(
+                (
+                    item[field].strip()
+                    for field in source["name_fields"]
+                    if isinstance(item.get(field), str) and item[field].strip()
+                ),
+                "",
+            )
+            if name and name not in roles:
+                roles[name] = source["url_template"].format(id=role_id)
+        return roles
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+            # 给底层连接留出关闭的时间，避免 "Unclosed connector" 告警
+            await asyncio.sleep(0.25)
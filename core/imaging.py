@@ -0,0 +1,238 @@
+import io
+import os
+import struct
+import zlib
+
+from PIL import Image
+
+# 各格式的扩展名与单张图片的最大边长限制
+FORMATS = {
+    "png": (".png", 65500),  # 256 色量化的 PNG
+    "webp": (".webp", 16383),
+    "jpeg": (".jpg", 65500),
+}
+
+# 超高页面截图可能超过 Pillow 默认的像素数保护上限
+Image.MAX_IMAGE_PIXELS = None
+
+
+def _encode(image: Image.Image, fmt: str, quality: int) -> bytes:
+    buffer = io.BytesIO()
+    if fmt == "webp":
+        image.save(buffer, "WEBP", quality=quality, method=4)
+    elif fmt == "jpeg":
+        image.convert("RGB").save(
+            buffer, "JPEG", quality=quality, optimize=True, progressive=True
+        )
+    else:
+        quantized = image.convert("RGB").quantize(
+            colors=256, method=Image.Quantize.FASTOCTREE
+        )
+        quantized.save(buffer, "PNG", optimize=True)
+    return buffer.getvalue()
+
+
+def _split(
+    image: Image.Image,
+    top: int,
+    bottom: int,
+    fmt: str,
+    quality: int,
+    max_bytes: int,
+    min_height: int = 400,
+) -> list[bytes]:
+    """编码 [top, bottom) 区间，超过字节上限时对半切开递归编码"""
+    data = _encode(image.crop((0, top, image.width, bottom)), fmt, quality)
+    if not max_bytes or len(data) <= max_bytes or bottom - top <= min_height * 2:
+        return [data]
+    middle = (top + bottom) // 2
+    return _split(image, top, middle, fmt, quality, max_bytes) + _split(
+        image, middle, bottom, fmt, quality, max_bytes
+    )
+
+
+def _concat(strips: list[Image.Image]) -> Image.Image:
+    if len(strips) == 1:
+        return strips[0]
+    width = max(strip.width for strip in strips)
+    result = Image.new("RGB", (width, sum(strip.height for strip in strips)), "white")
+    top = 0
+    for strip in strips:
+        result.paste(strip, (0, top))
+        top += strip.height
+    return result
+
+
+def _iter_parts(sources: list[str], max_width: int, part_height: int):
+    """
+    按从上到下的顺序读取截图（或分块截图的各块），每次拼出最多 part_height 高的一段，
+    分块截图时同时在内存中的只有一块和正在拼接的一段
+    """
+    pending: list[Image.Image] = []
+    pending_height = 0
+    for path in sources:
+        with Image.open(path) as tile:
+            tile.load()
+        if max_width and tile.width > max_width:
+            height = round(tile.height * max_width / tile.width)
+            tile = tile.resize((max_width, height), Image.Resampling.LANCZOS)
+        top = 0
+        while top < tile.height:
+            rows = min(part_height - pending_height, tile.height - top)
+            pending.append(tile.crop((0, top, tile.width, top + rows)))
+            pending_height += rows
+            top += rows
+            if pending_height == part_height:
+                yield _concat(pending)
+                pending, pending_height = [], 0
+    if pending:
+        yield _concat(pending)
+
+
+def encode_screenshot(
+    src_path: str | list[str],
+    out_base: str,
+    fmt: str = "jpeg",
+    quality: int = 85,
+    max_width: int = 0,
+    max_part_height: int = 0,
+    max_part_bytes: int = 0,
+) -> list[str]:
+    """
+    把原始 PNG 截图缩放、压缩，并把超高的页面切成多张
+
+    Args:
+        src_path: 原始截图，或分块截图从上到下的各块
+        out_base: 输出文件路径前缀，实际文件为 {out_base}.{序号}{扩展名}
+        fmt: png(256 色量化) / webp / jpeg
+        quality: webp/jpeg 的压缩质量
+        max_width: 宽度上限，超过时等比缩小，0 表示不缩放
+        max_part_height: 单张图片的高度上限，0 表示只受格式本身限制
+        max_part_bytes: 单张图片的字节上限，超过时继续对半切开，0 表示不限制
+
+    Returns:
+        list[str]: 按从上到下顺序排列的输出文件
+    """
+    ext, format_limit = FORMATS[fmt]
+    sources = [src_path] if isinstance(src_path, str) else src_path
+    part_height = min(max_part_height or format_limit, format_limit)
+    paths = []
+    for image in _iter_parts(sources, max_width, part_height):
+        # 每段编码后立即写入文件，不在内存中保留
+        for data in _split(image, 0, image.height, fmt, quality, max_part_bytes):
+            path = f"{out_base}.{len(paths)}{ext}"
+            with open(path, "wb") as f:
+                f.write(data)
+            paths.append(path)
+    return paths
+
+
+def save_tile(
+    png: bytes, path: str, top: float, bottom: float, viewport_height: int
+) -> None:
+    """
+    从一个视口的截图中裁出一块保存
+
+    Args:
+        top/bottom: 要保留的区间，相对视口顶部的 CSS 像素
+        viewport_height: 视口的 CSS 高度，用于换算设备像素比
+    """
+    with Image.open(io.BytesIO(png)) as shot:
+        scale = shot.height / viewport_height
+        bottom = min(shot.height, round(bottom * scale))
+        box = (0, round(top * scale), shot.width, bottom)
+        # 临时文件，只求写得快
+        shot.crop(box).save(path, "PNG", compress_level=1)
+
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    body = kind + data
+    return struct.pack(">I", len(data)) + body + struct.pack(">I", zlib.crc32(body))
+
+
+def stitch_tiles(tile_paths: list[str], dst_path: str) -> tuple[int, int]:
+    """
+    把分块截图从上到下拼成一张 PNG：逐块读取、逐行压缩写入，
+    内存占用只与单块大小有关，与页面总高度无关
+
+    Returns:
+        (宽, 高)
+    """
+    sizes = []
+    for path in tile_paths:
+        with Image.open(path) as tile:
+            sizes.append(tile.size)
+    width = sizes[0][0]
+    height = sum(h for _, h in sizes)
+    compressor = zlib.compressobj(6)
+    with open(dst_path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        # 8 位 RGB、不隔行
+        header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        f.write(_png_chunk(b"IHDR", header))
+        for path in tile_paths:
+            with Image.open(path) as tile:
+                tile = tile.convert("RGB")
+            if tile.width != width:
+                canvas = Image.new("RGB", (width, tile.height), "white")
+                canvas.paste(tile, (0, 0))
+                tile = canvas
+            raw = tile.tobytes()
+            stride = width * 3
+            # 每行前加过滤类型 0（无过滤）
+            rows = b"".join(
+                b"\x00" + raw[i : i + stride] for i in range(0, len(raw), stride)
+            )
+            data = compressor.compress(rows)
+            if data:
+                f.write(_png_chunk(b"IDAT", data))
+        f.write(_png_chunk(b"IDAT", compressor.flush()))
+        f.write(_png_chunk(b"IEND", b""))
+    return width, height
+
+
+def crop_regions(
+    src_path: str,
+    regions: list[list[float]],
+    page_width: float = 0,
+    gap: int = 16,
+) -> None:
+    """
+    从整页截图中裁出若干区域，从上到下拼接后覆盖原文件
+
+    Args:
+        regions: [left, top, right, bottom] 列表，单位为 CSS 像素
+        page_width: 页面的 CSS 宽度，用于换算设备像素比，0 表示按 1:1 换算
+        gap: 区域之间的空白间距(像素)
+    """
+    with Image.open(src_path) as original:
+        scale = original.width / page_width if page_width else 1.0
+        parts = []
+        for left, top, right, bottom in sorted(regions, key=lambda r: r[1]):
+            box = (
+                max(0, round(left * scale)),
+                max(0, round(top * scale)),
+                min(original.width, round(right * scale)),
+                min(original.height, round(bottom * scale)),
+            )
+            if box[2] > box[0] and box[3] > box[1]:
+                parts.append(original.crop(box))
+        if not parts:
+            raise ValueError("栏目区域超出截图范围")
+        width = max(part.width for part in parts)
+        height = sum(part.height for part in parts) + gap * (len(parts) - 1)
+        result = Image.new("RGB", (width, height), "white")
+        top = 0
+        for part in parts:
+            result.paste(part, (0, top))
+            top += part.height + gap
+    result.save(src_path, "PNG")
+
+
+def remove_files(paths: list[str]) -> None:
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,187 @@
+import json
+import os
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager
+from pathlib import Path
+
+# 查询各阶段的名称，顺序即统计输出的顺序
+STAGE_LABELS = {
+    "schedule": "调度排队",
+    "queue_wait": "排队",
+    "resolve": "解析URL",
+    "extract": "提取文字",
+    "fuzzy_match": "模糊匹配",
+    "revalidate": "校验指纹",
+    "navigate": "打开页面",
+    "ready": "等待就绪",
+    "screenshot": "截图",
+    "encode": "压缩",
+    "send": "发送",
+    "choice_wait": "等待选择",
+    "total": "总耗时",
+}
+
+COUNTER_LABELS = {
+    "queries": "查询",
+    "cache_hit": "缓存命中",
+    "cache_stale": "过期旧图",
+    "cache_miss": "未命中",
+    "text_answer": "文字回复",
+    "revalidated": "内容未变",
+    "shared_hit": "其他实例截图",
+    "render": "截图",
+    "render_failed": "截图失败",
+    "busy_rejected": "繁忙拒绝",
+    "rate_limited": "限流",
+}
+
+
+class StageTimer:
+    """Metrics.stage 的计时器，paused() 期间的时间不计入该阶段"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.paused_seconds = 0.0
+
+    @contextmanager
+    def paused(self):
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            self.paused_seconds += time.monotonic() - started_at
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at - self.paused_seconds
+
+
+def summarize(values) -> dict:
+    """耗时样本的统计（毫秒）"""
+    ordered = sorted(values)
+    if not ordered:
+        return {"count": 0}
+
+    def percentile(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+    return {
+        "count": len(ordered),
+        "avg_ms": round(sum(ordered) / len(ordered) * 1000, 1),
+        "p50_ms": round(percentile(0.5) * 1000, 1),
+        "p95_ms": round(percentile(0.95) * 1000, 1),
+        "max_ms": round(ordered[-1] * 1000, 1),
+    }
+
+
+class Metrics:
+    """
+    查询各阶段耗时与计数统计，按游戏分别记录
+
+    每个 (游戏, 阶段) 只保留最近 window 个样本，计数器从插件加载起累计
+
+    Args:
+        window: 每个阶段保留的耗时样本数
+    """
+
+    def __init__(self, window: int = 500):
+        self.window = window
+        self.started_at = time.time()
+        self.timings: dict[str, dict[str, deque]] = defaultdict(
+            lambda: defaultdict(lambda: deque(maxlen=self.window))
+        )
+        self.counters: dict[str, Counter] = defaultdict(Counter)
+
+    def record(self, game: str, stage: str, seconds: float) -> None:
+        self.timings[game or "web"][stage].append(seconds)
+
+    def incr(self, game: str, name: str, n: int = 1) -> None:
+        self.counters[game or "web"][name] += n
+
+    @contextmanager
+    def stage(self, game: str, stage: str):
+        """
+        记录一个阶段的耗时，异常退出时同样记录
+
+        Yields:
+            StageTimer: 用其 paused() 排除不应计入该阶段的时间，如等待用户输入
+        """
+        timer = StageTimer()
+        try:
+            yield timer
+        finally:
+            self.record(game, stage, timer.elapsed)
+
+    def snapshot(self, extra: dict = None) -> dict:
+        """可序列化的统计快照，extra 中可附带浏览器池、缓存等状态"""
+        games = sorted(set(self.timings) | set(self.counters))
+        return {
+            "generated_at": time.time(),
+            "uptime": round(time.time() - self.started_at, 1),
+            "games": {
+                game: {
+                    "counters": dict(self.counters.get(game, {})),
+                    "stages": {
+                        stage: summarize(values)
+                        for stage, values in sorted(
+                            self.timings.get(game, {}).items(),
+                            key=lambda item: _stage_order(item[0]),
+                        )
+                    },
+                }
+                for game in games
+            },
+            **(extra or {}),
+        }
+
+    def dump(self, path: Path, extra: dict = None) -> dict:
+        """写入 JSON 文件（先写临时文件再替换），返回写入的快照"""
+        data = self.snapshot(extra)
+        path = Path(path)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        return data
+
+
+def _stage_order(stage: str) -> int:
+    order = list(STAGE_LABELS)
+    return order.index(stage) if stage in order else len(order)
+
+
+def format_report(data: dict, game_names: dict[str, str] = None) -> str:
+    """把统计快照整理成便于在聊天中阅读的文本"""
+    game_names = game_names or {}
+    lines = [f"二游wiki插件统计（已运行 {data['uptime'] / 3600:.1f} 小时）"]
+    pool = data.get("pool")
+    if pool:
+        lines.append(
+            f"浏览器池: {pool['alive']}/{pool['size']} 个可用，使用中 {pool['busy']}，"
+            f"排队 {pool['waiting']}，利用率 {pool['utilization'] * 100:.0f}%，"
+            f"累计租用 {pool['leases']} 次，重建 {pool['restarts']} 次"
+        )
+    scheduler = data.get("scheduler")
+    if scheduler:
+        lines.append(
+            f"调度: 执行中 {scheduler['active']}/{scheduler['slots']}，"
+            f"排队 {scheduler['waiting']}（{scheduler['users_waiting']} 个用户），"
+            f"限流拒绝 {scheduler['rejected']} 次，平均占用 {scheduler['service_time']:.0f}s"
+        )
+    for game, stats in data["games"].items():
+        counters = stats["counters"]
+        counter_text = "，".join(
+            f"{label} {counters[name]}"
+            for name, label in COUNTER_LABELS.items()
+            if counters.get(name)
+        )
+        lines.append(f"【{game_names.get(game, game)}】{counter_text or '暂无查询'}")
+        stage_text = " | ".join(
+            f"{STAGE_LABELS.get(stage, stage)} {summary['p50_ms']:.0f}/{summary['p95_ms']:.0f}ms"
+            for stage, summary in stats["stages"].items()
+            if summary["count"]
+        )
+        if stage_text:
+            lines.append(f"  p50/p95: {stage_text}")
+    return "\n".join(lines)
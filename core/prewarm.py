@@ -0,0 +1,86 @@
+import asyncio
+import time
+from collections import deque
+from typing import Awaitable, Callable
+
+from astrbot.api import logger
+
+
+class Prewarmer:
+    """
+    后台预热截图：在空闲时提前渲染热门角色和新上线角色，首批查询直接命中缓存
+
+    Args:
+        render: 预热单个角色的协程函数 (game, name)
+        is_idle: 判断当前是否空闲（无用户查询占用浏览器）
+        concurrency: 同时进行的预热截图数
+        min_interval: 两次预热截图之间的最小间隔(秒)
+        hot_list: 热门角色 (game, name) 列表，会按 hot_interval 周期性重新预热
+        hot_interval: 热门角色重新入队的间隔(秒)
+    """
+
+    def __init__(
+        self,
+        render: Callable[[str, str], Awaitable[object]],
+        is_idle: Callable[[], bool],
+        concurrency: int = 1,
+        min_interval: float = 10,
+        hot_list: list[tuple[str, str]] = None,
+        hot_interval: float = 3600,
+    ):
+        self._render = render
+        self._is_idle = is_idle
+        self.concurrency = max(1, int(concurrency))
+        self.min_interval = min_interval
+        self.hot_list = hot_list or []
+        self.hot_interval = hot_interval
+        self._queue: deque[tuple[str, str]] = deque()
+        self._pending: set[tuple[str, str]] = set()
+        self._last_hot = 0.0
+        self._last_start = 0.0
+        self.done = 0  # 已完成的预热次数
+
+    def enqueue(self, game: str, names: list[str]) -> None:
+        """加入预热队列，已在队列中的角色不会重复加入"""
+        for name in names:
+            item = (game, name)
+            if item not in self._pending:
+                self._pending.add(item)
+                self._queue.append(item)
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    async def run(self, poll_interval: float = 5) -> None:
+        """后台任务：空闲时按并发和速率限制逐个预热"""
+        running: set[asyncio.Task] = set()
+        while True:
+            if self.hot_list and time.time() - self._last_hot >= self.hot_interval:
+                self._last_hot = time.time()
+                for game, name in self.hot_list:
+                    self.enqueue(game, [name])
+            if (
+                not self._queue
+                or len(running) >= self.concurrency
+                or time.time() - self._last_start < self.min_interval
+                or not self._is_idle()
+            ):
+                await asyncio.sleep(poll_interval)
+                continue
+            item = self._queue.popleft()
+            self._last_start = time.time()
+            task = asyncio.create_task(self._warm(item))
+            running.add(task)
+            task.add_done_callback(running.discard)
+
+    async def _warm(self, item: tuple[str, str]) -> None:
+        game, name = item
+        try:
+            await self._render(game, name)
+            self.done += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"预热 {game} {name} 失败: {str(e)}")
+        finally:
+            self._pending.discard(item)
@@ -0,0 +1,198 @@
+import json
+import os
+import re
+from pathlib import Path
+
+from astrbot.api import logger
+
+from .readiness import ready_profile
+
+# 配置文件里的定位方式 -> selenium By 的取值
+LOCATOR_TYPES = {
+    "xpath": "xpath",
+    "css": "css selector",
+    "id": "id",
+}
+
+PROFILE_DEFAULTS = {
+    "order": 100,  # 排列顺序
+    "url_type": "append",  # append: url + "/" + 角色名；search: 在列表页搜索
+    "xpath_template": "",  # 列表页中角色链接的 XPath，{} 处填入角色名
+    "roster_link_xpath": "",  # 列表页中所有角色链接的 XPath
+    "roster_name_xpath": "",  # 角色链接内角色名元素的相对 XPath
+    "crop_end": [],  # 截图截止位置规则，依次尝试，都不满足时截到页面底部
+    "ready": {},  # 详情页就绪规则，见 readiness.DEFAULT_READY_PROFILE
+    "list_ready": {},  # 列表页就绪规则
+    "disambiguation": None,  # 消歧义页规则 {"marker": 页面文字, "options_xpath": 选项链接}
+    "viewport_width": 1920,  # 截图时的浏览器宽度
+    "cache_ttl": None,  # 截图缓存时间(分钟)，为空时使用全局 keep_temp_time
+    "sections": {},  # 栏目名 -> 栏目截图规则，见 compile_sections
+    "roster_api": None,  # 角色列表 JSON 接口，可用 HTTP 请求代替浏览器抓取列表页
+    "record": None,  # 文字记录的来源，见 compile_record
+    "fingerprint": True,  # 截图缓存过期后是否先校验页面内容指纹
+}
+
+
+class ProfileError(ValueError):
+    """站点配置文件格式错误"""
+
+
+def _merge(base: dict, override: dict) -> dict:
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = {**merged[key], **value}
+        else:
+            merged[key] = value
+    return merged
+
+
+def _compile_locator(rule: dict, field: str) -> tuple[str, str]:
+    by = LOCATOR_TYPES.get(rule.get("by", "css"))
+    if not by or not rule.get("value"):
+        raise ProfileError(f"无效的 {field} 规则: {rule}")
+    return by, rule["value"]
+
+
+def compile_sections(sections: dict) -> dict[str, dict]:
+    """
+    编译栏目截图规则，每个栏目形如：
+
+        "天赋": {"aliases": ["技能"], "by": "xpath", "value": "...",
+                 "end": {"by": "css", "value": "h2"}, "padding": 8}
+
+    by/value 匹配到的每个元素各截一块；配置了 end 时，
+    每块从元素顶部截到其下方第一个 end 元素的顶部（适合 wiki 的标题分节）
+
+    Returns:
+        dict: 栏目名或别名（小写） -> 编译后的规则，规则中的 name 为栏目名
+    """
+    compiled: dict[str, dict] = {}
+    for name, rule in sections.items():
+        by, value = _compile_locator(rule, f"sections.{name}")
+        section = {
+            "name": name,
+            "by": by,
+            "value": value,
+            "end_by": "",
+            "end_value": "",
+            "padding": int(rule.get("padding", 0)),
+        }
+        if rule.get("end"):
+            section["end_by"], section["end_value"] = _compile_locator(
+                rule["end"], f"sections.{name}.end"
+            )
+        for key in (name, *rule.get("aliases", [])):
+            compiled[key.lower()] = section
+    return compiled
+
+
+def compile_record(record: dict, roster_api: dict | None) -> dict:
+    """
+    编译文字记录规则，两种来源：
+
+        {"source": "mediawiki"}: 请求详情页 HTML，按 h2 标题提取各栏目文本
+        {"source": "json", "url_template": ".../{id}.json", "fields": {"简介": "Desc"}}:
+            请求站点的角色数据接口，按字段路径提取；角色 id 从详情页 URL 中按
+            roster_api.url_template 取出
+    """
+    source = record.get("source")
+    if source == "mediawiki":
+        return {"source": source}
+    if source != "json":
+        raise ProfileError(f"不支持的 record.source: {source}")
+    if "{id}" not in record.get("url_template", "") or not record.get("fields"):
+        raise ProfileError("json 类型的 record 需要包含 {id} 的 url_template 和 fields")
+    if not roster_api:
+        raise ProfileError("json 类型的 record 需要配置 roster_api")
+    prefix, _, suffix = roster_api["url_template"].partition("{id}")
+    return {
+        "source": source,
+        "url_template": record["url_template"],
+        "fields": dict(record["fields"]),
+        "id_pattern": re.compile(
+            f"^{re.escape(prefix)}(?P<id>[^/?#]+){re.escape(suffix)}$"
+        ),
+    }
+
+
+def compile_profile(game: str, raw: dict, assets_dir: str) -> dict:
+    """校验并补全单个站点配置，得到运行时使用的 gamelist 条目"""
+    profile = _merge(PROFILE_DEFAULTS, raw)
+    for key in ("name", "url", "output_dir"):
+        if not profile.get(key):
+            raise ProfileError(f"缺少字段 {key}")
+    if profile["url_type"] not in ("append", "search"):
+        raise ProfileError(f"不支持的 url_type: {profile['url_type']}")
+    if profile["url_type"] == "search" and "{}" not in profile["xpath_template"]:
+        raise ProfileError("search 类型需要包含 {} 的 xpath_template")
+    profile["url"] = profile["url"].rstrip("/")
+    profile["output_dir"] = os.path.join(assets_dir, profile["output_dir"])
+    crop_end = []
+    for rule in profile["crop_end"]:
+        by, value = _compile_locator(rule, "crop_end")
+        crop_end.append(
+            {
+                "by": by,
+                "value": value,
+                "edge": rule.get("edge", "bottom"),  # 取元素的 top 或 bottom
+                "offset": int(rule.get("offset", 0)),
+                "if_source_contains": rule.get("if_source_contains", ""),
+            }
+        )
+    profile["crop_end"] = crop_end
+    profile["ready"] = ready_profile(profile["ready"])
+    profile["list_ready"] = ready_profile(profile["list_ready"])
+    profile["viewport_width"] = int(profile["viewport_width"])
+    profile["sections"] = compile_sections(profile["sections"])
+    profile["fingerprint"] = bool(profile["fingerprint"])
+    if profile["roster_api"]:
+        api = profile["roster_api"]
+        if not api.get("url") or "{id}" not in api.get("url_template", ""):
+            raise ProfileError("roster_api 需要 url 和包含 {id} 的 url_template")
+        profile["roster_api"] = {
+            "url": api["url"],
+            "url_template": api["url_template"],
+            "name_fields": list(api.get("name_fields") or ["name"]),
+            "id_field": api.get("id_field", "id"),
+        }
+    if profile["record"]:
+        profile["record"] = compile_record(profile["record"], profile["roster_api"])
+    return profile
+
+
+def load_profiles(
+    builtin_dir: Path, assets_dir: str, override_dir: Path = None
+) -> dict[str, dict]:
+    """
+    加载站点配置：插件自带的 profiles/*.json，再用数据目录下的同名文件覆盖或新增
+
+    文件名即游戏标识（如 ys.json -> ys），启动时编译一次
+    """
+    raw_profiles: dict[str, dict] = {}
+    for directory in (builtin_dir, override_dir):
+        if not directory or not Path(directory).is_dir():
+            continue
+        for path in sorted(Path(directory).glob("*.json")):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except Exception as e:
+                logger.error(f"读取站点配置 {path} 失败: {str(e)}")
+                continue
+            game = path.stem
+            raw_profiles[game] = _merge(raw_profiles.get(game, {}), data)
+    profiles = {}
+    ordered = sorted(
+        raw_profiles.items(),
+        key=lambda item: (item[1].get("order", PROFILE_DEFAULTS["order"]), item[0]),
+    )
+    for game, raw in ordered:
+        if not raw.get("enabled", True):
+            continue
+        try:
+            profiles[game] = compile_profile(game, raw, assets_dir)
+        except ProfileError as e:
+            logger.error(f"站点配置 {game} 无效: {str(e)}")
+    logger.info(f"已加载站点配置: {', '.join(profiles)}")
+    return profiles
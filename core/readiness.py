@@ -0,0 +1,104 @@
+import asyncio
+import time
+
+from astrbot.api import logger
+
+# 默认的页面就绪规则，各游戏可在 gamelist 的 "ready" 中覆盖
+DEFAULT_READY_PROFILE = {
+    "wait_selector": "",  # 必须出现的 CSS 选择器，为空时不检查
+    "scroll_pass": True,  # 是否逐屏滚动一遍以触发懒加载
+    "stable_ms": 500,  # 页面高度保持不变的时长
+    "idle_ms": 500,  # 最后一个网络请求完成后的静默时长
+    "poll_interval": 0.15,  # 轮询间隔(秒)
+    "max_wait": 15,  # 最长等待时间(秒)，超时后照常截图
+}
+
+# 把懒加载资源改为立即加载，并返回当前页面的加载状态
+READY_STATE_JS = """
+const selector = arguments[0];
+for (const img of document.querySelectorAll('img[loading="lazy"]')) {
+    img.loading = "eager";
+}
+for (const img of document.querySelectorAll("img[data-src]")) {
+    if (!img.getAttribute("src")) img.src = img.dataset.src;
+}
+const resources = performance.getEntriesByType("resource");
+let lastEnd = 0;
+for (const entry of resources) lastEnd = Math.max(lastEnd, entry.responseEnd);
+const pendingImages = Array.from(document.images).filter(
+    (img) => img.getAttribute("src") && !img.complete
+).length;
+return {
+    readyState: document.readyState,
+    height: document.body ? document.body.scrollHeight : 0,
+    resources: resources.length,
+    sinceLastResponse: performance.now() - lastEnd,
+    pendingImages: pendingImages,
+    selectorFound: !selector || document.querySelector(selector) !== null,
+    scrollY: window.scrollY,
+    viewport: window.innerHeight,
+};
+"""
+
+# 向下滚动一屏，到底后返回 true
+SCROLL_STEP_JS = """
+window.scrollBy(0, window.innerHeight);
+return window.scrollY + window.innerHeight >= document.body.scrollHeight - 2;
+"""
+
+
+def ready_profile(overrides: dict = None) -> dict:
+    profile = dict(DEFAULT_READY_PROFILE)
+    profile.update(overrides or {})
+    return profile
+
+
+async def wait_until_ready(worker, profile: dict = None) -> dict:
+    """
+    轮询页面状态，直到页面真正加载完成：
+
+    - document.readyState 为 complete，且 wait_selector 已出现
+    - 懒加载图片已触发（改为立即加载 + 逐屏滚动让 IntersectionObserver 回调触发）
+    - 所有图片 complete，网络请求静默 idle_ms，页面高度稳定 stable_ms
+
+    达到 max_wait 仍未就绪时直接返回，由调用方照常截图
+
+    Returns:
+        dict: 就绪耗时与最后一次页面状态，用于日志和统计
+    """
+    profile = ready_profile(profile)
+    driver = worker.driver
+    start = time.monotonic()
+    deadline = start + profile["max_wait"]
+    last_height = -1
+    height_since = start
+    scrolled_to_bottom = not profile["scroll_pass"]
+    state: dict = {}
+    ready = False
+    while time.monotonic() < deadline:
+        state = await worker.run(
+            driver.execute_script, READY_STATE_JS, profile["wait_selector"]
+        )
+        now = time.monotonic()
+        if state["height"] != last_height:
+            last_height = state["height"]
+            height_since = now
+        if not scrolled_to_bottom:
+            # 每次轮询向下滚动一屏，懒加载内容随滚动触发
+            scrolled_to_bottom = await worker.run(driver.execute_script, SCROLL_STEP_JS)
+        elif (
+            state["readyState"] == "complete"
+            and state["selectorFound"]
+            and state["pendingImages"] == 0
+            and state["sinceLastResponse"] >= profile["idle_ms"]
+            and (now - height_since) * 1000 >= profile["stable_ms"]
+        ):
+            ready = True
+            break
+        await asyncio.sleep(profile["poll_interval"])
+    elapsed = time.monotonic() - start
+    if not ready:
+        logger.warning(
+            f"页面在 {profile['max_wait']} 秒内未完全就绪，继续截图: {state}"
+        )
+    return {"elapsed": elapsed, "ready": ready, "state": state}
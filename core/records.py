@@ -0,0 +1,243 @@
+import json
+import os
+import re
+import time
+from html import unescape
+from html.parser import HTMLParser
+from pathlib import Path
+
+from astrbot.api import logger
+
+from .http_resolver import VOID_TAGS
+
+# 游戏内文本中的富文本标记，如 <color=#FFD780FF>、{LINK#N10000001}、{M#他}{F#她}
+MARKUP_PATTERN = re.compile(r"<[^>]*>|\{LINK#[^}]*\}|\{/LINK\}|\{[MF]#([^}]*)\}")
+
+# 不属于正文的元素：编辑链接、目录、导航框、参考文献标号、隐藏内容等
+SKIP_CLASSES = {
+    "mw-editsection",
+    "toc",
+    "navbox",
+    "reference",
+    "noprint",
+    "mw-empty-elt",
+    "catlinks",
+}
+SKIP_TAGS = {"script", "style", "noscript", "sup"}
+# 这些元素结束时换行
+BLOCK_TAGS = {"p", "li", "tr", "div", "br", "dd", "dt", "h3", "h4", "h5", "table", "ul"}
+
+
+def clean_text(text: str) -> str:
+    """去掉游戏内文本的富文本标记，合并多余空白"""
+    text = MARKUP_PATTERN.sub(lambda m: m.group(1) or "", unescape(str(text)))
+    text = text.replace("\\n", "\n")
+    lines = (re.sub(r"[ \t　\xa0]+", " ", line).strip() for line in text.split("\n"))
+    return "\n".join(line for line in lines if line)
+
+
+def _get_path(data, path: str):
+    """按 "a.b.0.c" 形式的路径取值，不存在时返回 None"""
+    for key in path.split("."):
+        if isinstance(data, dict):
+            data = data.get(key)
+        elif isinstance(data, list) and key.isdigit() and int(key) < len(data):
+            data = data[int(key)]
+        else:
+            return None
+    return data
+
+
+def _flatten(value) -> str:
+    """
+    把 JSON 值整理成文本：带 Name/Desc 的对象写成 "名称：描述"，
+    列表和以 id 为键的对象逐项展开
+    """
+    if value is None or isinstance(value, bool):
+        return ""
+    if isinstance(value, (str, int, float)):
+        return clean_text(value)
+    if isinstance(value, list):
+        return "\n".join(filter(None, (_flatten(item) for item in value)))
+    name = value.get("Name") or value.get("name")
+    if isinstance(name, str):
+        desc = value.get("Desc") or value.get("desc") or ""
+        desc = _flatten(desc) if not isinstance(desc, str) else clean_text(desc)
+        return f"{clean_text(name)}：{desc}" if desc else clean_text(name)
+    return "\n".join(filter(None, (_flatten(item) for item in value.values())))
+
+
+def extract_json_record(data: dict, fields: dict[str, str]) -> dict[str, str]:
+    """
+    从站点的角色 JSON 数据中按字段路径提取记录
+
+    Args:
+        fields: 栏目名 -> 字段路径（如 "CharaInfo.Title"）
+
+    Returns:
+        dict: 栏目名 -> 文本，取不到的字段不出现
+    """
+    record = {}
+    for label, path in fields.items():
+        text = _flatten(_get_path(data, path))
+        if text:
+            record[label] = text
+    return record
+
+
+class _MediaWikiTextParser(HTMLParser):
+    """
+    按 h2 标题把 MediaWiki 正文（mw-parser-output）切成若干栏目的纯文本，
+    标题之前的内容（通常是信息框和简介）记为 "概要"
+    """
+
+    def __init__(self, scope_class: str = "mw-parser-output"):
+        super().__init__()
+        self.scope_class = scope_class
+        self.stack: list[str] = []
+        self.scope = -1  # 正文容器在栈中的位置
+        self.skip = -1  # 被跳过的元素在栈中的位置
+        self.heading = -1  # 当前 h2 在栈中的位置
+        self.heading_text: list[str] = []
+        self.section = "概要"
+        self.sections: dict[str, list[str]] = {}
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._write("\n")
+            return
+        classes = set((dict(attrs).get("class") or "").split())
+        if self.scope < 0 and self.scope_class in classes:
+            self.scope = len(self.stack)
+        elif self.scope >= 0 and self.skip < 0:
+            if tag in SKIP_TAGS or classes & SKIP_CLASSES:
+                self.skip = len(self.stack)
+            elif tag == "h2":
+                self.heading = len(self.stack)
+                self.heading_text = []
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if tag not in self.stack:
+            return
+        # 容错：未闭合的标签随外层标签一起出栈
+        while self.stack:
+            popped = self.stack.pop()
+            depth = len(self.stack)
+            if depth == self.skip:
+                self.skip = -1
+            elif depth == self.heading:
+                self.heading = -1
+                self.section = clean_text("".join(self.heading_text)) or self.section
+            elif depth == self.scope:
+                self.scope = -1
+            if popped in BLOCK_TAGS:
+                self._write("\n")
+            elif popped in ("td", "th"):
+                self._write(" ")
+            if popped == tag:
+                break
+
+    def handle_data(self, data):
+        if self.scope < 0 or self.skip >= 0:
+            return
+        if self.heading >= 0:
+            self.heading_text.append(data)
+        else:
+            self._write(data)
+
+    def _write(self, text: str) -> None:
+        if self.scope >= 0 and self.skip < 0 and self.heading < 0:
+            self.sections.setdefault(self.section, []).append(text)
+
+
+def extract_mediawiki_record(html: str) -> dict[str, str]:
+    """从 MediaWiki 页面 HTML 中按 h2 标题提取各栏目文本"""
+    parser = _MediaWikiTextParser()
+    parser.feed(html)
+    record = {}
+    for title, chunks in parser.sections.items():
+        text = clean_text("".join(chunks))
+        if text:
+            record[title] = text
+    return record
+
+
+def format_record(
+    game_name: str, name: str, record: dict, label: str = None, max_chars: int = 500
+) -> str:
+    """
+    把记录整理成回复文字：指定栏目时只回复该栏目，否则回复前两个栏目和可查询的栏目列表
+    """
+
+    def clip(text: str) -> str:
+        return text if len(text) <= max_chars else text[:max_chars] + "……"
+
+    fields = record["fields"]
+    lines = [f"【{game_name}】{name}"]
+    if label:
+        lines.append(f"〔{label}〕\n{clip(fields[label])}")
+    else:
+        for key in list(fields)[:2]:
+            lines.append(f"〔{key}〕\n{clip(fields[key])}")
+        if len(fields) > 2:
+            lines.append(f"可查询的栏目: {'、'.join(list(fields)[2:])}")
+    lines.append(record["url"])
+    return "\n".join(lines)
+
+
+class RecordStore:
+    """
+    从 wiki 页面或站点数据接口提取的角色文字记录，按游戏持久化到数据目录，
+    用于文字回复，比整页截图便宜得多
+
+    Args:
+        data_dir: 插件数据目录
+        ttl: 记录有效期(秒)
+    """
+
+    def __init__(self, data_dir: Path, ttl: float):
+        self.record_dir = Path(data_dir) / "records"
+        self.record_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.records: dict[str, dict[str, dict]] = {}  # 游戏 -> {URL: 记录}
+
+    def _path(self, game: str) -> Path:
+        return self.record_dir / f"{game}.json"
+
+    def _load(self, game: str) -> dict[str, dict]:
+        if game not in self.records:
+            self.records[game] = {}
+            path = self._path(game)
+            if path.exists():
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        self.records[game] = dict(json.load(f))
+                except Exception as e:
+                    logger.error(f"读取 {game} 文字记录失败: {str(e)}")
+        return self.records[game]
+
+    def get(self, game: str, url: str) -> dict | None:
+        """有效期内的记录，过期或不存在时返回 None"""
+        record = self._load(game).get(url)
+        if record and time.time() - record["fetched_at"] < self.ttl:
+            return record
+        return None
+
+    def put(self, game: str, url: str, name: str, fields: dict[str, str]) -> dict:
+        record = {"name": name, "url": url, "fetched_at": time.time(), "fields": fields}
+        self._load(game)[url] = record
+        self.save(game)
+        return record
+
+    def save(self, game: str) -> None:
+        """写入临时文件后替换，避免写到一半被读取"""
+        path = self._path(game)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.records.get(game, {}), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def stats(self) -> dict[str, int]:
+        return {game: len(records) for game, records in self.records.items()}
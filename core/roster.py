@@ -0,0 +1,236 @@
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from astrbot.api import logger
+
+from .fuzzy import FuzzyIndex
+from .shared_store import SharedStore
+
+
+class RosterIndex:
+    """
+    角色名 -> 详情页 URL 的索引，按游戏持久化到数据目录
+
+    启动时从磁盘加载，后台按 TTL 刷新；查询时直接查表，
+    只有索引未命中时才需要打开浏览器
+
+    Args:
+        data_dir: 插件数据目录
+        ttl: 索引有效期(秒)
+        aliases: 游戏 -> {别名: 角色名}
+        shared: 多实例共用的存储，设置时索引同时写入其中，后台刷新循环先取其他实例刷新的结果，
+            同一游戏在所有实例中同时只刷新一次
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        ttl: float,
+        aliases: dict[str, dict[str, str]] = None,
+        shared: SharedStore = None,
+    ):
+        self.roster_dir = Path(data_dir) / "rosters"
+        self.roster_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl  # 秒
+        self.aliases = aliases or {}
+        self.shared = shared
+        self.rosters: dict[str, dict[str, str]] = {}
+        self.updated_at: dict[str, float] = {}
+        self.fuzzy: dict[str, FuzzyIndex] = {}
+        # 刷新后发现新角色时的回调 (game, 新增角色名)，如预热新角色截图
+        self.on_added: Callable[[str, list[str]], None] | None = None
+        self._refreshing: set[str] = set()  # 正在刷新的游戏
+        self._shared_writes: set[asyncio.Task] = set()  # 写入共享存储的任务
+
+    def _rebuild_fuzzy(self, game: str) -> None:
+        """角色列表变化后重建模糊匹配索引"""
+        self.fuzzy[game] = FuzzyIndex(self.names(game), aliases=self.aliases.get(game))
+
+    def _path(self, game: str) -> Path:
+        return self.roster_dir / f"{game}.json"
+
+    def load(self, games: list[str]) -> None:
+        """从磁盘加载各游戏的角色索引"""
+        for game in games:
+            path = self._path(game)
+            if not path.exists():
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.rosters[game] = dict(data.get("roles", {}))
+                self.updated_at[game] = float(data.get("updated_at", 0))
+            except Exception as e:
+                logger.error(f"读取 {game} 角色索引失败: {str(e)}")
+        for game in games:
+            self._rebuild_fuzzy(game)
+        loaded = {g: len(r) for g, r in self.rosters.items()}
+        logger.info(f"已加载角色索引: {loaded}")
+
+    async def sync(self, game: str) -> bool:
+        """
+        共享存储中的索引比本实例新时（其他实例刷新过）改用共享的索引
+
+        Returns:
+            bool: 是否更新了本实例的索引
+        """
+        if not self.shared:
+            return False
+        try:
+            shared = await self.shared.get_roster(game)
+        except Exception as e:
+            logger.error(f"读取共享的 {game} 角色索引失败: {str(e)}")
+            return False
+        if not shared or shared[0] <= self.updated_at.get(game, 0):
+            return False
+        self.updated_at[game], self.rosters[game] = shared
+        self._rebuild_fuzzy(game)
+        return True
+
+    def save(self, game: str) -> None:
+        """写入临时文件后替换，避免写到一半被读取"""
+        path = self._path(game)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        data = {
+            "updated_at": self.updated_at.get(game, 0),
+            "roles": self.rosters.get(game, {}),
+        }
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+        if self.shared:
+            # 在后台写入，共享的索引更新时不会被覆盖
+            task = asyncio.create_task(
+                self.shared.put_roster(game, data["updated_at"], data["roles"])
+            )
+            self._shared_writes.add(task)
+            task.add_done_callback(self._shared_write_done)
+
+    def _shared_write_done(self, task: asyncio.Task) -> None:
+        self._shared_writes.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"写入共享角色索引失败: {str(task.exception())}")
+
+    def names(self, game: str) -> list[str]:
+        return list(self.rosters.get(game, {}))
+
+    def get(self, game: str, name: str) -> str | None:
+        """精确查找角色详情页 URL"""
+        roles = self.rosters.get(game, {})
+        if name in roles:
+            return roles[name]
+        return roles.get(name.split("/")[0])
+
+    def resolve_alias(self, game: str, name: str) -> str | None:
+        """用户配置的别名，如 42 -> 艾尔海森"""
+        index = self.fuzzy.get(game)
+        return index.resolve_alias(name) if index else None
+
+    def match(
+        self, game: str, name: str, k: int = 5, cutoff: int = 60
+    ) -> list[tuple[str, int]]:
+        """模糊匹配，返回最相似的 k 个 (角色名, 相似度)"""
+        index = self.fuzzy.get(game)
+        return index.search(name, k=k, cutoff=cutoff) if index else []
+
+    def is_stale(self, game: str) -> bool:
+        return time.time() - self.updated_at.get(game, 0) > self.ttl
+
+    def add(self, game: str, name: str, url: str) -> None:
+        """记录一次浏览器查询得到的结果，不改变刷新时间"""
+        roles = self.rosters.setdefault(game, {})
+        if roles.get(name) == url:
+            return
+        roles[name] = url
+        self._rebuild_fuzzy(game)
+        self.save(game)
+
+    def replace(self, game: str, roles: dict[str, str]) -> list[str]:
+        """
+        用新抓取的列表替换索引
+
+        Returns:
+            list[str]: 新增的角色名
+        """
+        old_roles = self.rosters.get(game, {})
+        added = [name for name in roles if name not in old_roles]
+        self.rosters[game] = dict(roles)
+        self.updated_at[game] = time.time()
+        self._rebuild_fuzzy(game)
+        self.save(game)
+        logger.info(
+            f"{game} 角色索引已刷新，共 {len(roles)} 个角色，新增 {len(added)} 个"
+        )
+        # 首次建立索引时所有角色都算"新增"，不触发回调
+        if added and old_roles and self.on_added:
+            self.on_added(game, added)
+        return added
+
+    async def refresh(
+        self,
+        game: str,
+        fetch: Callable[[str], Awaitable[dict[str, str] | None]],
+        force: bool = False,
+    ) -> list[str]:
+        """
+        刷新单个游戏的索引，同一游戏同时只刷新一次（使用共享存储时跨实例）；
+        fetch 返回 None 表示本轮不刷新（如需要浏览器而浏览器尚未启动）
+
+        已有刷新在进行时直接跳过、沿用现有索引，不等待：fetch 可能要租用浏览器，
+        而调用方可能正占着浏览器，等待会与进行中的刷新互相卡住
+        """
+        if game in self._refreshing:
+            return []
+        self._refreshing.add(game)
+        try:
+            if not self.shared:
+                return await self._refresh(game, fetch, force)
+            async with self.shared.try_lock(f"roster:{game}") as acquired:
+                if not acquired:
+                    return []  # 其他实例正在刷新，结果由刷新循环同步
+                # 其他实例刚刷新过时直接使用共享的索引
+                if await self.sync(game):
+                    return []
+                return await self._refresh(game, fetch, force)
+        finally:
+            self._refreshing.discard(game)
+
+    async def _refresh(
+        self,
+        game: str,
+        fetch: Callable[[str], Awaitable[dict[str, str] | None]],
+        force: bool,
+    ) -> list[str]:
+        if not force and not self.is_stale(game):
+            return []
+        roles = await fetch(game)
+        if roles is None:
+            return []  # 本轮跳过
+        if not roles:
+            logger.warning(f"{game} 角色列表为空，保留旧索引")
+            return []
+        return self.replace(game, roles)
+
+    async def run_refresh_loop(
+        self,
+        games: list[str],
+        fetch: Callable[[str], Awaitable[dict[str, str] | None]],
+        interval: float = 600,
+    ) -> None:
+        """后台任务：定期检查并刷新过期的索引"""
+        while True:
+            for game in games:
+                await self.sync(game)
+                if not self.is_stale(game):
+                    continue
+                try:
+                    await self.refresh(game, fetch)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.error(f"刷新 {game} 角色索引失败: {str(e)}")
+            await asyncio.sleep(min(interval, self.ttl))
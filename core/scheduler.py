@@ -0,0 +1,259 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict, deque
+
+
+class RateLimited(Exception):
+    """超出频率限制或排队数量上限，消息可直接回复给用户"""
+
+    def __init__(self, message: str, retry_after: float = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    令牌桶：容量 burst，每分钟补充 per_minute 个令牌
+
+    Args:
+        per_minute: 每分钟补充的令牌数，0 表示不限制
+        burst: 桶容量，即允许的突发次数
+    """
+
+    def __init__(self, per_minute: float, burst: int):
+        self.rate = per_minute / 60
+        self.capacity = max(1, int(burst))
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.updated_at) * self.rate
+        )
+        self.updated_at = now
+
+    def retry_after(self, now: float = None, cost: int = 1) -> float:
+        """
+        距离攒够 cost 个令牌的秒数，当前足够时为 0；cost 超过桶容量时等到桶满即可，
+        多出的部分由 take 记为欠账
+        """
+        if not self.rate:
+            return 0
+        self._refill(now or time.monotonic())
+        need = min(cost, self.capacity)
+        return 0 if self.tokens >= need else (need - self.tokens) / self.rate
+
+    def take(self, cost: int = 1) -> None:
+        """扣除全部 cost，余额可以为负，之后的查询要等欠账补齐"""
+        if self.rate:
+            self.tokens -= cost
+
+    def full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+
+class Ticket:
+    """
+    调度器中的一个查询，async with ticket 等待轮到自己，退出时归还名额
+
+    Attributes:
+        slots: 占用的名额数，批量查询可同时使用多个浏览器
+        position: 提交时前面还有多少个查询
+        eta: 提交时估计的等待秒数
+    """
+
+    def __init__(self, scheduler: "FairScheduler", user: str, slots: int = 1):
+        self.scheduler = scheduler
+        self.user = user
+        self.slots = slots
+        self.future = asyncio.get_running_loop().create_future()
+        self.submitted_at = time.monotonic()
+        self.granted_at = None
+        self.finished = False
+        self.position = 0
+        self.eta = 0.0
+
+    @property
+    def waited(self) -> float:
+        """实际排队的秒数"""
+        return (self.granted_at or time.monotonic()) - self.submitted_at
+
+    async def __aenter__(self) -> "Ticket":
+        try:
+            await self.future
+        except asyncio.CancelledError:
+            self.cancel()
+            raise
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.cancel()
+
+    def cancel(self) -> None:
+        """放弃该查询：还在排队时移出队列，已分配名额时归还，重复调用无影响"""
+        if not self.finished:
+            self.finished = True
+            self.scheduler._cancel(self)
+
+
+class FairScheduler:
+    """
+    查询调度器：按用户和群做令牌桶限流，排队的查询在用户之间轮转分配名额，
+    一个用户连续提交很多查询也不会让其他用户一直等待
+
+    名额数与浏览器池大小相同，只有需要浏览器的查询才经过调度器，命中缓存的查询直接返回
+
+    Args:
+        slots: 同时执行的查询数
+        user_per_minute / user_burst: 每个用户的令牌桶参数，per_minute 为 0 时不限制
+        group_per_minute / group_burst: 每个群的令牌桶参数（私聊不检查）
+        max_pending_per_user: 每个用户同时排队和执行中的查询上限
+        max_waiting: 所有用户排队的查询总数上限
+    """
+
+    def __init__(
+        self,
+        slots: int,
+        user_per_minute: float = 6,
+        user_burst: int = 3,
+        group_per_minute: float = 20,
+        group_burst: int = 8,
+        max_pending_per_user: int = 2,
+        max_waiting: int = 10,
+    ):
+        self.slots = max(1, int(slots))
+        self.user_limit = (user_per_minute, user_burst)
+        self.group_limit = (group_per_minute, group_burst)
+        self.max_pending_per_user = max(1, int(max_pending_per_user))
+        self.max_waiting = max_waiting
+        self.buckets: dict[tuple[str, str], TokenBucket] = {}
+        # 用户 -> 该用户排队中的查询，字典顺序即轮转顺序
+        self.queues: OrderedDict[str, deque[Ticket]] = OrderedDict()
+        self.pending: dict[str, int] = {}  # 用户 -> 排队和执行中的查询数
+        self.active = 0
+        self.service_time = 15.0  # 每个查询占用名额的平均秒数（指数移动平均）
+        self.granted = 0
+        self.rejected = 0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(q) for q in self.queues.values())
+
+    def _bucket(self, kind: str, key: str) -> TokenBucket:
+        bucket = self.buckets.get((kind, key))
+        if bucket is None:
+            if len(self.buckets) > 1024:
+                # 清理已经回满的桶，和新建的桶等价
+                now = time.monotonic()
+                self.buckets = {
+                    k: b for k, b in self.buckets.items() if not b.full(now)
+                }
+            limit = self.user_limit if kind == "user" else self.group_limit
+            bucket = self.buckets[(kind, key)] = TokenBucket(*limit)
+        return bucket
+
+    def submit(
+        self, user: str, group: str = "", cost: int = 1, slots: int = 1
+    ) -> Ticket:
+        """
+        提交一个查询，超出限制时抛出 RateLimited；否则返回 Ticket，
+        其 position/eta 可用于提示用户排队情况
+
+        Args:
+            cost: 消耗的令牌数，批量查询按需要截图的角色数计
+            slots: 占用的名额数，最多为全部名额
+        """
+        user = str(user or "")
+        buckets = [self._bucket("user", user)]
+        if group:
+            buckets.append(self._bucket("group", str(group)))
+        now = time.monotonic()
+        retry_after = max(bucket.retry_after(now, cost) for bucket in buckets)
+        if retry_after:
+            self.rejected += 1
+            raise RateLimited(
+                f"查询太频繁了，请 {math.ceil(retry_after)} 秒后再试", retry_after
+            )
+        if self.pending.get(user, 0) >= self.max_pending_per_user:
+            self.rejected += 1
+            raise RateLimited("你还有查询在进行中，请等待完成后再查询")
+        if self.max_waiting and self.waiting >= self.max_waiting:
+            self.rejected += 1
+            raise RateLimited("当前查询人数过多，请稍后再试")
+        for bucket in buckets:
+            bucket.take(cost)
+        ticket = Ticket(self, user, max(1, min(int(slots), self.slots)))
+        self.pending[user] = self.pending.get(user, 0) + 1
+        self.queues.setdefault(user, deque()).append(ticket)
+        ticket.position = self._position(ticket)
+        ticket.eta = math.ceil(ticket.position / self.slots) * self.service_time
+        self._dispatch()
+        return ticket
+
+    def _position(self, ticket: Ticket) -> int:
+        """按轮转顺序计算该查询之前会被分配名额的查询数"""
+        queue = self.queues[ticket.user]
+        rank = queue.index(ticket)
+        position = rank
+        before = True
+        for user, other in self.queues.items():
+            if user == ticket.user:
+                before = False
+                continue
+            # 排在前面的用户在第 rank 轮也先于本查询
+            position += min(len(other), rank + 1 if before else rank)
+        if self.active + ticket.slots > self.slots:
+            position += 1
+        return position
+
+    def _dispatch(self) -> None:
+        while self.active < self.slots and self.queues:
+            user, queue = next(iter(self.queues.items()))
+            # 占多个名额的查询等空出足够的名额，之后的查询不越过它，保持轮转顺序
+            if self.active + queue[0].slots > self.slots:
+                break
+            ticket = queue.popleft()
+            if queue:
+                self.queues.move_to_end(user)
+            else:
+                del self.queues[user]
+            self.active += ticket.slots
+            self.granted += 1
+            ticket.granted_at = time.monotonic()
+            ticket.future.set_result(True)
+
+    def _cancel(self, ticket: Ticket) -> None:
+        if ticket.future.done() and not ticket.future.cancelled():
+            self._release(ticket)
+            return
+        queue = self.queues.get(ticket.user)
+        if queue and ticket in queue:
+            queue.remove(ticket)
+            if not queue:
+                del self.queues[ticket.user]
+        self._done(ticket.user)
+
+    def _release(self, ticket: Ticket) -> None:
+        self.active -= ticket.slots
+        held = time.monotonic() - ticket.granted_at
+        self.service_time = self.service_time * 0.8 + held * 0.2
+        self._done(ticket.user)
+        self._dispatch()
+
+    def _done(self, user: str) -> None:
+        self.pending[user] -= 1
+        if not self.pending[user]:
+            del self.pending[user]
+
+    def snapshot(self) -> dict:
+        return {
+            "slots": self.slots,
+            "active": self.active,
+            "waiting": self.waiting,
+            "users_waiting": len(self.queues),
+            "granted": self.granted,
+            "rejected": self.rejected,
+            "service_time": round(self.service_time, 1),
+        }
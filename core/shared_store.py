@@ -0,0 +1,260 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from astrbot.api import logger
+
+
+class SharedStore:
+    """
+    同一台机器上多个 AstrBot 实例共用的存储：角色索引、截图缓存元数据和跨进程锁
+    保存在共享目录的 SQLite 数据库中，截图文件放在共享目录下按缓存键命名
+
+    数据库使用 WAL 模式，读写都是短事务；图片文件先写临时文件再原子替换，
+    因此任一实例截好的图其他实例可以直接发送
+
+    所有数据库操作都在专属线程中执行，其他实例写入时的等待不会阻塞事件循环；
+    查询的热路径只读内存，由 ScreenshotCache/RosterIndex 定期与数据库同步
+
+    Args:
+        root: 共享目录，所有实例需配置为同一目录
+        busy_timeout: 数据库被其他进程锁住时的最长等待时间(秒)
+    """
+
+    def __init__(self, root: str | Path, busy_timeout: float = 5):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="gameinfo-shared"
+        )
+        # 只在专属线程中使用
+        self.conn = sqlite3.connect(
+            self.root / "shared.db",
+            timeout=busy_timeout,
+            isolation_level=None,
+            check_same_thread=False,
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rosters (
+                game TEXT PRIMARY KEY, updated_at REAL NOT NULL, roles TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS renders (
+                key TEXT PRIMARY KEY, data TEXT NOT NULL, last_hit REAL NOT NULL,
+                deleted INTEGER NOT NULL DEFAULT 0, changed REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS renders_changed ON renders (changed);
+            CREATE TABLE IF NOT EXISTS locks (
+                key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires REAL NOT NULL
+            );
+            """
+        )
+
+    def shot_dir(self, game: str) -> str:
+        return str(self.root / "shots" / game)
+
+    async def _run(self, fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, fn, *args
+        )
+
+    async def close(self) -> None:
+        def close():
+            # 进程退出前释放本实例持有的锁
+            self.conn.execute(
+                "DELETE FROM locks WHERE owner LIKE ?", (f"{self.owner}-%",)
+            )
+            self.conn.close()
+
+        await self._run(close)
+        self.executor.shutdown(wait=False)
+
+    # 角色索引
+
+    async def get_roster(self, game: str) -> tuple[float, dict[str, str]] | None:
+        """返回 (刷新时间, 角色表)，没有记录时返回 None"""
+
+        def get():
+            return self.conn.execute(
+                "SELECT updated_at, roles FROM rosters WHERE game = ?", (game,)
+            ).fetchone()
+
+        row = await self._run(get)
+        return (row[0], json.loads(row[1])) if row else None
+
+    async def put_roster(
+        self, game: str, updated_at: float, roles: dict[str, str]
+    ) -> None:
+        """写入角色索引；共享的索引比要写入的更新（其他实例刚刷新过）时不覆盖"""
+
+        def put():
+            self.conn.execute(
+                """
+                INSERT INTO rosters (game, updated_at, roles) VALUES (?, ?, ?)
+                ON CONFLICT(game) DO UPDATE SET
+                    updated_at = excluded.updated_at, roles = excluded.roles
+                WHERE excluded.updated_at >= rosters.updated_at
+                """,
+                (game, updated_at, json.dumps(roles, ensure_ascii=False)),
+            )
+
+        await self._run(put)
+
+    # 截图缓存元数据
+
+    async def changed_renders(
+        self, since: float
+    ) -> tuple[dict[str, dict | None], float]:
+        """
+        取 since 及之后写入或删除的条目（重复读到的条目与本地相同，不影响结果）
+
+        Returns:
+            ({缓存键: 条目，已删除为 None}, 本次读到的最新修改时间)
+        """
+
+        def query():
+            return self.conn.execute(
+                "SELECT key, data, last_hit, deleted, changed FROM renders "
+                "WHERE changed >= ? ORDER BY changed",
+                (since,),
+            ).fetchall()
+
+        changes = {}
+        latest = since
+        for key, data, last_hit, deleted, changed in await self._run(query):
+            latest = max(latest, changed)
+            if deleted:
+                changes[key] = None
+                continue
+            entry = json.loads(data)
+            entry["last_hit"] = max(entry.get("last_hit", 0), last_hit)
+            changes[key] = entry
+        return changes, latest
+
+    async def write_renders(
+        self, puts: list[dict], deletes: list[str], hits: dict[str, float]
+    ) -> None:
+        """
+        在一个事务中写入新条目、标记删除的条目（保留删除标记供其他实例同步）
+        和最近命中时间（只会往后推，不覆盖其他实例写入的内容）
+        """
+
+        def write():
+            with self.conn:
+                self.conn.execute("BEGIN IMMEDIATE")
+                # 取得写锁后再取时间，修改时间的顺序与提交顺序一致，增量同步不会漏读
+                now = time.time()
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO renders (key, data, last_hit, deleted, changed) "
+                    "VALUES (?, ?, ?, 0, ?)",
+                    [
+                        (
+                            entry["key"],
+                            json.dumps(entry, ensure_ascii=False),
+                            entry["last_hit"],
+                            now,
+                        )
+                        for entry in puts
+                    ],
+                )
+                self.conn.executemany(
+                    "UPDATE renders SET deleted = 1, changed = ? WHERE key = ?",
+                    [(now, key) for key in deletes],
+                )
+                self.conn.executemany(
+                    "UPDATE renders SET last_hit = max(last_hit, ?) WHERE key = ?",
+                    [(last_hit, key) for key, last_hit in hits.items()],
+                )
+                # 删除标记保留一天，足够其他实例同步
+                self.conn.execute(
+                    "DELETE FROM renders WHERE deleted = 1 AND changed < ?",
+                    (now - 86400,),
+                )
+
+        await self._run(write)
+
+    # 跨进程锁
+
+    def _try_acquire(self, key: str, token: str, ttl: float) -> bool:
+        now = time.time()
+        cursor = self.conn.execute(
+            """
+            INSERT INTO locks (key, owner, expires) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET
+                owner = excluded.owner, expires = excluded.expires
+            WHERE locks.expires < ?
+            """,
+            (key, token, now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def _extend(self, key: str, token: str, ttl: float) -> bool:
+        cursor = self.conn.execute(
+            "UPDATE locks SET expires = ? WHERE key = ? AND owner = ?",
+            (time.time() + ttl, key, token),
+        )
+        return cursor.rowcount == 1
+
+    def _release(self, key: str, token: str) -> None:
+        self.conn.execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, token))
+
+    async def _heartbeat(self, key: str, token: str, ttl: float) -> None:
+        """持有锁期间定期续期，持有者崩溃时锁在 ttl 后过期"""
+        while True:
+            await asyncio.sleep(ttl / 3)
+            try:
+                if not await self._run(self._extend, key, token, ttl):
+                    logger.warning(f"共享锁 {key} 已被其他实例取得")
+                    return
+            except Exception as e:
+                logger.warning(f"共享锁 {key} 续期失败: {str(e)}")
+
+    @asynccontextmanager
+    async def _hold(self, key: str, token: str, ttl: float):
+        heartbeat = asyncio.create_task(self._heartbeat(key, token, ttl))
+        try:
+            yield
+        finally:
+            heartbeat.cancel()
+            await self._run(self._release, key, token)
+
+    @asynccontextmanager
+    async def lock(self, key: str, ttl: float = 60, poll: float = 0.5):
+        """
+        跨进程的单飞锁：同一键同时只有一个实例持有，其余实例轮询等待；
+        持有期间自动续期，锁不依赖文件锁，Windows 上也可用
+
+        Yields:
+            bool: 是否等待过其他实例，等待过时调用方应先检查对方是否已产出结果
+        """
+        token = f"{self.owner}-{uuid.uuid4().hex[:8]}"
+        waited = False
+        while not await self._run(self._try_acquire, key, token, ttl):
+            waited = True
+            await asyncio.sleep(poll)
+        async with self._hold(key, token, ttl):
+            yield waited
+
+    @asynccontextmanager
+    async def try_lock(self, key: str, ttl: float = 60):
+        """
+        不等待的跨进程锁：其他实例正持有时不阻塞
+
+        Yields:
+            bool: 是否取得了锁，未取得时调用方应跳过
+        """
+        token = f"{self.owner}-{uuid.uuid4().hex[:8]}"
+        if not await self._run(self._try_acquire, key, token, ttl):
+            yield False
+            return
+        async with self._hold(key, token, ttl):
+            yield True
@@ -0,0 +1,118 @@
+from astrbot.api import logger
+
+# 当前标签页的 JS 堆占用(MB)，只有 Chromium 支持 performance.memory
+HEAP_USAGE_JS = """
+return performance.memory ? performance.memory.usedJSHeapSize / 1048576 : null;
+"""
+
+
+class TabManager:
+    """
+    单个浏览器内的标签页管理：每个游戏保留一个停在列表页的常驻标签页，
+    详情页在临时标签页中打开，用完关闭并恢复窗口大小
+
+    常驻标签页使用 max_uses 次或 JS 堆超过 max_heap_mb 后关闭重开，
+    避免单页应用长时间运行后内存膨胀
+
+    所有方法都是阻塞的 selenium 调用，需通过 BrowserWorker.run 在 worker 线程中执行
+
+    Args:
+        driver: 所属的 driver
+        max_uses: 常驻标签页的最大使用次数
+        max_heap_mb: 常驻标签页的 JS 堆上限(MB)，0 表示不检查
+        viewport: 默认窗口大小 (宽, 高)
+    """
+
+    def __init__(
+        self,
+        driver,
+        max_uses: int = 50,
+        max_heap_mb: float = 512,
+        viewport: tuple[int, int] = (1920, 1080),
+    ):
+        self.driver = driver
+        self.max_uses = max(1, int(max_uses))
+        self.max_heap_mb = max_heap_mb
+        self.viewport = viewport
+        # 浏览器启动时的标签页始终保留，关闭其他标签页后切回这里，避免关闭整个浏览器
+        self.base_handle = driver.current_window_handle
+        self.list_tabs: dict[str, str] = {}  # 游戏 -> 常驻标签页句柄
+        self.uses: dict[str, int] = {}
+        self.recycled = 0  # 回收的常驻标签页数
+        self.navigations = 0  # 该 driver 打开过的页面数，供浏览器池判断是否需要回收
+
+    def list_tab(self, game: str, url: str, reload: bool = False) -> bool:
+        """
+        切换到该游戏的常驻列表页标签页，不存在、需要回收或已离开列表页时重新打开
+
+        Args:
+            reload: 强制重新加载列表页（如刷新角色索引）
+
+        Returns:
+            bool: 是否直接复用了已加载好的列表页
+        """
+        handle = self.list_tabs.get(game)
+        if handle and handle not in self.driver.window_handles:
+            handle = None
+        if handle and self._should_recycle(game, handle):
+            self._close(handle)
+            self.recycled += 1
+            handle = None
+        if not handle:
+            self.driver.switch_to.new_window("tab")
+            handle = self.driver.current_window_handle
+            self.list_tabs[game] = handle
+            self.uses[game] = 0
+        else:
+            self.driver.switch_to.window(handle)
+        self.uses[game] += 1
+        if reload or not self.driver.current_url.startswith(url):
+            self.navigate(url)
+            return False
+        return True
+
+    def navigate(self, url: str) -> None:
+        """在当前标签页打开页面并计数"""
+        self.navigations += 1
+        self.driver.get(url)
+
+    def base_tab(self) -> None:
+        """切回启动时的标签页，临时导航在这里进行，不覆盖常驻列表页"""
+        self.driver.switch_to.window(self.base_handle)
+
+    def _should_recycle(self, game: str, handle: str) -> bool:
+        if self.uses.get(game, 0) >= self.max_uses:
+            logger.info(f"{game} 常驻标签页已使用 {self.uses[game]} 次，重新打开")
+            return True
+        if not self.max_heap_mb:
+            return False
+        self.driver.switch_to.window(handle)
+        heap_mb = self.driver.execute_script(HEAP_USAGE_JS)
+        if heap_mb and heap_mb > self.max_heap_mb:
+            logger.info(f"{game} 常驻标签页 JS 堆占用 {heap_mb:.0f}MB，重新打开")
+            return True
+        return False
+
+    def open_detail(self) -> str:
+        """打开一个临时标签页用于详情页截图，返回其句柄"""
+        self.driver.switch_to.new_window("tab")
+        return self.driver.current_window_handle
+
+    def close_detail(self, handle: str) -> None:
+        """关闭临时标签页，切回启动时的标签页并恢复默认窗口大小"""
+        self._close(handle)
+        self.driver.set_window_size(*self.viewport)
+
+    def _close(self, handle: str) -> None:
+        if handle != self.base_handle and handle in self.driver.window_handles:
+            self.driver.switch_to.window(handle)
+            self.driver.close()
+        self.driver.switch_to.window(self.base_handle)
+
+    def stats(self) -> dict:
+        return {
+            "tabs": len(self.list_tabs),
+            "uses": dict(self.uses),
+            "recycled": self.recycled,
+            "navigations": self.navigations,
+        }
@@ -2,27 +2,116 @@ import time
 import os
 import asyncio
 import json
+from contextlib import asynccontextmanager, nullcontext
 from astrbot.api.event import filter, AstrMessageEvent
 from astrbot.core.utils.session_waiter import session_waiter, SessionController
 import astrbot.api.message_components as Comp
 from astrbot.api.star import Context, Star, register, StarTools
 from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.api import logger
-from thefuzz import fuzz, process
-from selenium import webdriver
-from selenium.webdriver.chrome.options import (
-    Options as ChromeOptions,
-)  # 导入 ChromeOptions
-from selenium.webdriver.edge.options import Options as EdgeOptions
-from selenium.webdriver.firefox.options import Options as FirefoxOptions
-from webdriver_manager.chrome import ChromeDriverManager
-from webdriver_manager.microsoft import (
-    EdgeChromiumDriverManager,
-)  # 导入 Edge DriverManager
-from webdriver_manager.firefox import GeckoDriverManager
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
+from .core.browser_pool import BrowserOpTimeout, BrowserPool, PoolBusyError
+from .core.cache import ScreenshotCache
+from .core.driver_factory import DriverPathCache, create_driver
+from .core.http_resolver import HttpResolver, content_hash
+from .core.imaging import (
+    crop_regions,
+    encode_screenshot,
+    remove_files,
+    save_tile,
+    stitch_tiles,
+)
+from .core.metrics import Metrics, StageTimer, format_report
+from .core.prewarm import Prewarmer
+from .core.profiles import load_profiles
+from .core.records import (
+    RecordStore,
+    extract_json_record,
+    extract_mediawiki_record,
+    format_record,
+)
+from .core.readiness import wait_until_ready
+from .core.roster import RosterIndex
+from .core.scheduler import FairScheduler, RateLimited
+from .core.shared_store import SharedStore
+from .core.singleflight import SingleFlight
+from .core.tabs import TabManager
+
+# get_url/_resolve_http 遇到消歧义页时返回的 URL 前缀，后接消歧义页的 URL
+DISAMBIGUATION_PREFIX = "disambiguation:"
+
+# 在列表页中按 XPath 取出所有角色链接及其中的角色名
+ROSTER_EXTRACT_JS = """
+const [linkXpath, nameXpath] = arguments;
+const snapshot = (xpath, ctx) =>
+    document.evaluate(xpath, ctx, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+const links = snapshot(linkXpath, document);
+const result = [];
+for (let i = 0; i < links.snapshotLength; i++) {
+    const link = links.snapshotItem(i);
+    const names = snapshot(nameXpath, link);
+    for (let j = 0; j < names.snapshotLength; j++) {
+        const text = (names.snapshotItem(j).textContent || "").trim();
+        if (text) result.push([text, link.href]);
+    }
+}
+return result;
+"""
+
+# 按栏目规则取出各区域在页面中的位置 [left, top, right, bottom]（CSS 像素）
+SECTION_RECTS_JS = """
+const [by, value, endBy, endValue, padding] = arguments;
+const find = (by, value) => {
+    if (by === "xpath") {
+        const snapshot = document.evaluate(
+            value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null
+        );
+        const nodes = [];
+        for (let i = 0; i < snapshot.snapshotLength; i++) nodes.push(snapshot.snapshotItem(i));
+        return nodes;
+    }
+    if (by === "id") {
+        const node = document.getElementById(value);
+        return node ? [node] : [];
+    }
+    return Array.from(document.querySelectorAll(value));
+};
+const pageWidth = document.documentElement.clientWidth;
+const pageHeight = document.body.scrollHeight;
+const pageTop = (node) => node.getBoundingClientRect().top + window.scrollY;
+const ends = endValue ? find(endBy, endValue).map(pageTop).sort((a, b) => a - b) : [];
+const rects = [];
+for (const node of find(by, value)) {
+    const rect = node.getBoundingClientRect();
+    if (!rect.width || !rect.height) continue;
+    const top = rect.top + window.scrollY;
+    let left = rect.left + window.scrollX;
+    let right = rect.right + window.scrollX;
+    let bottom = rect.bottom + window.scrollY;
+    if (endValue) {
+        // 从标题截到下一个同级标题，横向取整个页面宽度
+        const next = ends.find((y) => y > top + 1);
+        [left, right, bottom] = [0, pageWidth, next === undefined ? pageHeight : next];
+    }
+    rects.push([left - padding, top - padding, right + padding, bottom + padding]);
+}
+return {rects: rects, width: pageWidth};
+"""
+
+# 分块截图：滚动到指定位置，返回实际滚动到的位置（到达页面底部时会小于目标位置）
+TILE_SCROLL_JS = """
+window.scrollTo(0, arguments[0]);
+return window.scrollY;
+"""
+
+# 分块截图的第一块之后隐藏固定定位和粘性定位的元素，避免导航栏在每一块中重复出现
+HIDE_FIXED_JS = """
+for (const el of document.querySelectorAll('body *')) {
+    const position = getComputedStyle(el).position;
+    if (position === 'fixed' || position === 'sticky') {
+        el.style.setProperty('visibility', 'hidden', 'important');
+    }
+}
+"""
 
 
 @register(
@@ -31,6 +120,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 class FzInfoPlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
         super().__init__(context)
+        started_at = time.monotonic()
         self.data_dir = StarTools.get_data_dir("astrbot_plugin_gameinfo")
         self.plugin_dir = os.path.dirname(__file__)
         self.assets_dir = os.path.join(self.plugin_dir, "assets")
@@ -43,59 +133,43 @@ class FzInfoPlugin(Star):
         self.keep_temp_time = (
             self.config.get("keep_temp_time", 3600)
         ) * 60  # 截图缓存时间 单位转化为秒
-        logger.info("二游wiki插件初始化中...")  # 使用框架自带logger
-        self.gamelist = {
-            "fz": {
-                "name": "明日方舟",
-                "url": "https://prts.wiki/w",
-                "output_dir": os.path.join(self.assets_dir, "fzassets"),
-                "url_type": "append",  # url + "/" + character
-            },
-            "ys": {
-                "name": "原神",
-                "url": "https://gi20.hakush.in/character",
-                "output_dir": os.path.join(self.assets_dir, "ysassets"),
-                "url_type": "search",  # 需要在列表页搜索
-                "xpath_template": "//a[contains(@href, '/character/') and .//div[contains(text(), '{}')]]",
-            },
-            "sr": {
-                "name": "崩坏：星穹铁道",
-                "url": "https://hsr20.hakush.in/char",
-                "output_dir": os.path.join(self.assets_dir, "srassets"),
-                "url_type": "search",
-                "xpath_template": "//a[contains(@href, '/char/') and .//div[contains(text(), '{}')]]",
-            },
-            "zzz": {
-                "name": "绝区零",
-                "url": "https://zzz3.hakush.in/character",
-                "output_dir": os.path.join(self.assets_dir, "zzzassets"),
-                "url_type": "search",
-                "xpath_template": "//a[contains(@href, '/character/') and .//div[contains(text(), '{}')]]",
-            },
-            "ww": {
-                "name": "鸣潮",
-                "url": "https://ww2.hakush.in/character",
-                "output_dir": os.path.join(self.assets_dir, "wwassets"),
-                "url_type": "search",
-                "xpath_template": "//a[contains(@href, '/character/') and .//div[contains(text(), '{}')]]",
-            },
-            "issac": {
-                "name": "以撒的结合：重生",
-                "url": "https://isaac.huijiwiki.com/wiki",
-                "output_dir": os.path.join(self.assets_dir, "issacassets"),
-                "url_type": "append",  # url + "/" + character
-            },
-            "endfield": {
-                "name": "终末地",
-                "url": "https://warfarin.wiki/cn/operators",
-                "output_dir": os.path.join(self.assets_dir, "endfieldassets"),
-                "url_type": "search",
-                "xpath_template": "//a[contains(@href, '/cn/operators/') and .//span[contains(text(), '{}')]]",
-            },
+        self.browser_op_timeout = self.config.get("browser_op_timeout", 30)
+        # 截图发送前的压缩与切分参数
+        self.image_options = {
+            "fmt": self.config.get("image_format", "jpeg"),
+            "quality": self.config.get("image_quality", 85),
+            "max_width": self.config.get("image_max_width", 0),
+            "max_part_height": self.config.get("image_max_part_height", 6000),
+            "max_part_bytes": self.config.get("image_max_part_kb", 3072) * 1024,
         }
+        # 页面高于 tile_threshold 时按 tile_height 高的视口分块截图，
+        # 浏览器内存不随页面长度增长
+        self.tile_threshold = self.config.get("tile_threshold", 8000)
+        self.tile_height = max(500, self.config.get("tile_height", 2000))
+        logger.info("二游wiki插件初始化中...")  # 使用框架自带logger
+        # 各游戏的站点配置（列表页、XPath、截图截止位置、就绪规则、缓存时间等），
+        # 插件自带 profiles/*.json，可在数据目录的 profiles 文件夹中覆盖或新增
+        self.gamelist = load_profiles(
+            builtin_dir=os.path.join(self.plugin_dir, "profiles"),
+            assets_dir=self.assets_dir,
+            override_dir=self.data_dir / "profiles",
+        )
         self._handle_config_schema()  # 调用处理配置文件方法
         self._handle_driver_manager()  # 调用浏览器驱动管理方法
-        self.query_lock = asyncio.Lock()  # 查询锁，防止并发访问浏览器导致页面覆盖
+        self._handle_scheduler()  # 按用户/群限流并轮流分配浏览器
+        self.disambiguations: dict[str, dict] = {}  # 消歧义页URL -> 选项
+        self.choice_sessions: dict[str, asyncio.Future] = {}  # 会话 -> 等待选择的任务
+        self._handle_http_resolver()  # 不占用浏览器的 HTTP 解析通道
+        self._handle_shared_store()  # 同一台机器上多个实例共用的索引和截图
+        self._handle_roster_index()  # 加载角色索引并启动后台刷新
+        self._handle_screenshot_cache()  # 加载截图缓存索引并启动后台清理
+        self._handle_records()  # 从 wiki 页面/数据接口提取的文字记录
+        self._handle_prewarm()  # 空闲时预热热门角色和新角色截图
+        self._handle_metrics()  # 各阶段耗时与缓存、浏览器池统计
+        logger.info(
+            f"二游wiki插件初始化完成，耗时 {time.monotonic() - started_at:.2f}s，"
+            f"浏览器将{'在后台预热' if self.config.get('browser_warmup', True) else '在首次查询时'}启动"
+        )
 
     def _handle_config_schema(self) -> None:
         """处理配置文件,确保它在正确的位置"""
@@ -104,223 +178,1228 @@ class FzInfoPlugin(Star):
             logger.error("配置文件不存在,请重新下载插件...")
 
     def _handle_driver_manager(self) -> None:
-        self.driver = None
-        service = None
+        """
+        校验浏览器配置并创建浏览器池，每个查询租用池中的一个浏览器；
+        浏览器不在加载插件时启动，而是首次使用时或在后台预热任务中启动，
+        解析出的驱动路径会缓存下来，之后启动不再联网检查驱动版本；
+        后台监控各浏览器的响应、内存和打开页面数，超限前回收，崩溃后自动重建
+        """
         if self.browser_type not in ["chrome", "edge", "firefox"]:
             logger.error(f"不支持的浏览器类型: {self.browser_type}")
             self.browser_type = "chrome"
         if self.driver_path and not os.path.exists(self.driver_path):
             logger.error(f"驱动路径不存在: {self.driver_path}")
             self.driver_path = ""
+        self.driver_path_cache = DriverPathCache(self.data_dir / "driver_paths.json")
+        self.browser_pool = BrowserPool(
+            factory=self._create_driver,
+            size=self.config.get("browser_pool_size", 2),
+            max_waiting=self.config.get("browser_pool_max_waiting", 10),
+            acquire_timeout=self.config.get("browser_pool_acquire_timeout", 120),
+            op_timeout=self.browser_op_timeout,
+            max_navigations=self.config.get("browser_max_navigations", 300),
+            max_rss_mb=self.config.get("browser_max_rss_mb", 1536),
+        )
+        self.warmup_task = None
+        if self.config.get("browser_warmup", True):
+            # 稍等片刻再启动，不和机器人自身的启动抢资源
+            self.warmup_task = asyncio.create_task(self.browser_pool.warm_up(delay=5))
+        self.supervisor_task = asyncio.create_task(
+            self.browser_pool.run_supervisor(
+                self.config.get("browser_check_interval", 60)
+            )
+        )
+
+    def _handle_scheduler(self) -> None:
+        """需要浏览器的查询先经过调度器：令牌桶限流，排队时在用户之间轮转"""
+        self.scheduler = FairScheduler(
+            slots=self.browser_pool.size,
+            user_per_minute=self.config.get("rate_limit_user", 6),
+            user_burst=self.config.get("rate_limit_user_burst", 3),
+            group_per_minute=self.config.get("rate_limit_group", 20),
+            group_burst=self.config.get("rate_limit_group_burst", 8),
+            max_pending_per_user=self.config.get("queue_max_per_user", 2),
+            max_waiting=self.config.get("browser_pool_max_waiting", 10),
+        )
+
+    def _submit(self, event: AstrMessageEvent, cost: int = 1, slots: int = 1):
+        """向调度器提交当前用户的查询，超出限制时抛出 RateLimited"""
+        return self.scheduler.submit(
+            event.get_sender_id(), event.get_group_id(), cost=cost, slots=slots
+        )
+
+    @staticmethod
+    def _queue_hint(ticket) -> str:
+        if not ticket.position:
+            return ""
+        return f"，前面还有 {ticket.position} 个查询，预计等待 {ticket.eta:.0f} 秒"
 
-        def add_argument(options):
-            options.add_argument("--headless")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--ignore-certificate-errors")
-            options.add_argument("--allow-insecure-localhost")
-            options.add_argument("log-level=3")
-            options.add_argument("disable-infobars")
-            options.add_argument("--disable-logging")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-
-            # 只有 Chromium 家族才有 experimental option，做个防守式判断
-            if hasattr(options, "add_experimental_option"):
-                options.add_experimental_option("excludeSwitches", ["enable-logging"])
+    def _handle_http_resolver(self) -> None:
+        """用 HTTP 请求检测消歧义页、抓取角色列表 JSON，浏览器只用于截图"""
+        self.http_resolver = None
+        if self.config.get("http_resolve", True):
+            self.http_resolver = HttpResolver(
+                timeout=self.config.get("http_timeout", 10)
+            )
 
+    def _handle_shared_store(self) -> None:
+        """配置了 shared_dir 时，角色索引、截图缓存和截图锁在多个实例之间共享"""
+        self.shared_store = None
+        shared_dir = self.config.get("shared_dir", "").strip()
+        if not shared_dir:
+            return
         try:
-            if self.browser_type == "edge":  # 添加 Edge 支持
-                options = EdgeOptions()
-                options.add_argument(
-                    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36 Edg/91.0.864.59"
-                )
-                add_argument(options)
-                service = (
-                    webdriver.edge.service.Service(
-                        EdgeChromiumDriverManager().install()
-                    )
-                    if not self.driver_path
-                    else webdriver.edge.service.Service(self.driver_path)
-                )
-                self.driver = webdriver.Edge(service=service, options=options)
-            elif self.browser_type == "firefox":  # 添加 Firefox 支持
-                options = FirefoxOptions()
-                options.add_argument(
-                    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:89.0) Gecko/20100101 Firefox/89.0"
-                )
-                add_argument(options)
-                service = (
-                    webdriver.firefox.service.Service(GeckoDriverManager().install())
-                    if not self.driver_path
-                    else webdriver.firefox.service.Service(self.driver_path)
-                )
-                self.driver = webdriver.Firefox(service=service, options=options)
-            else:  # 默认为 Chrome
-                options = ChromeOptions()
-                options.add_argument(
-                    "user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-                )
-                add_argument(options)
-                service = (
-                    webdriver.chrome.service.Service(ChromeDriverManager().install())
-                    if not self.driver_path
-                    else webdriver.chrome.service.Service(self.driver_path)
-                )
-                self.driver = webdriver.Chrome(service=service, options=options)
-            logger.info(f"浏览器驱动初始化成功: {self.browser_type}")
+            self.shared_store = SharedStore(shared_dir)
+            logger.info(f"已启用共享存储: {shared_dir}")
+        except Exception as e:
+            logger.error(f"打开共享存储失败，改用本实例的缓存: {str(e)}")
+
+    def _handle_roster_index(self) -> None:
+        """加载各游戏的角色索引，并在后台按 TTL 刷新需要列表页搜索的游戏"""
+        self.roster = RosterIndex(
+            self.data_dir,
+            ttl=self.config.get("roster_ttl", 1440) * 60,
+            aliases=self._parse_aliases(self.config.get("aliases", [])),
+            shared=self.shared_store,
+        )
+        self.roster.load(list(self.gamelist))
+        search_games = [
+            game
+            for game, game_config in self.gamelist.items()
+            if game_config.get("url_type") == "search"
+        ]
+        self.roster_task = asyncio.create_task(
+            self.roster.run_refresh_loop(search_games, self._fetch_roster_background)
+        )
+
+    def _handle_screenshot_cache(self) -> None:
+        """截图缓存：各游戏目录 + getscreenshot 使用的 webassets 目录"""
+        game_dirs = {game: cfg["output_dir"] for game, cfg in self.gamelist.items()}
+        game_dirs["web"] = os.path.join(self.assets_dir, "webassets")
+        if self.shared_store:
+            # 截图放在共享目录中，文件名即缓存键，所有实例相同
+            game_dirs = {game: self.shared_store.shot_dir(game) for game in game_dirs}
+        self.screenshot_cache = ScreenshotCache(
+            index_path=self.data_dir / "screenshot_cache.json",
+            game_dirs=game_dirs,
+            ttl=self.keep_temp_time,
+            stale_max=self.config.get("stale_max_time", 10080) * 60,
+            max_bytes=self.config.get("cache_max_mb", 1024) * 1024 * 1024,
+            game_max_bytes=self.config.get("cache_game_max_mb", 300) * 1024 * 1024,
+            game_ttls={
+                game: cfg["cache_ttl"] * 60
+                for game, cfg in self.gamelist.items()
+                if cfg.get("cache_ttl")
+            },
+            shared=self.shared_store,
+        )
+        self.cache_task = asyncio.create_task(self.screenshot_cache.run_sweep_loop())
+        self.shared_sync_task = None
+        if self.shared_store:
+            # 定期与共享存储同步截图缓存索引，查询只读内存
+            self.shared_sync_task = asyncio.create_task(
+                self.screenshot_cache.run_shared_sync_loop()
+            )
+        self.render_flight = SingleFlight()  # 按缓存键合并并发截图
+        # 截图时记录页面内容指纹，过期后内容未变化则直接续期，不再重新截图
+        self.content_fingerprint = self.config.get("content_fingerprint", True)
+        # 连续续期的上限，达到后无论指纹是否变化都重新截图，避免指纹漏掉的变化一直不更新
+        self.fingerprint_max_renewals = self.config.get("fingerprint_max_renewals", 5)
+        self.revalidating: set[str] = set()  # 正在后台刷新的缓存键
+        self._bg_tasks: set[asyncio.Task] = set()  # 后台刷新任务，保留引用防止被回收
+        # 后台刷新同时只进行一个，不与用户查询争抢浏览器
+        self.revalidate_slot = asyncio.Semaphore(1)
+
+    def _handle_records(self) -> None:
+        """文字记录：answer_mode 为 text 时优先回复文字，提取失败再截图"""
+        self.records = RecordStore(
+            self.data_dir, ttl=self.config.get("record_ttl", 4320) * 60
+        )
+        self.prefer_text = self.config.get("answer_mode", "image") == "text"
+        self.text_max_chars = self.config.get("text_max_chars", 500)
+
+    def _handle_prewarm(self) -> None:
+        """
+        预热配置：prewarm_list 每条形如 "ys:钟离"，
+        开启 prewarm_new_characters 时角色索引刷新发现的新角色也会预热
+        """
+        self.last_query_at = 0.0  # 最近一次用户查询的时间，用于判断空闲
+        hot_list = []
+        for entry in self.config.get("prewarm_list", []):
+            game, sep, name = entry.partition(":")
+            game, name = game.strip(), name.strip()
+            if not sep or game not in self.gamelist or not name:
+                logger.warning(f"无效的预热配置: {entry}")
+                continue
+            hot_list.append((game, name))
+        idle_seconds = self.config.get("prewarm_idle_seconds", 30)
+        self.prewarmer = Prewarmer(
+            render=self._prewarm_character,
+            is_idle=lambda: (
+                self.browser_pool.busy == 0
+                and self.browser_pool.waiting == 0
+                and time.time() - self.last_query_at >= idle_seconds
+            ),
+            concurrency=self.config.get("prewarm_concurrency", 1),
+            min_interval=self.config.get("prewarm_interval", 10),
+            hot_list=hot_list,
+            # 在缓存过期前重新预热热门角色
+            hot_interval=max(self.keep_temp_time * 0.8, 60),
+        )
+        if self.config.get("prewarm_new_characters", True):
+            self.roster.on_added = self.prewarmer.enqueue
+        self.prewarm_task = asyncio.create_task(self.prewarmer.run())
+
+    def _handle_metrics(self) -> None:
+        """查询各阶段耗时统计，定期写入数据目录的 metrics.json 供外部程序读取"""
+        self.metrics = Metrics()
+        self.metrics_path = self.data_dir / "metrics.json"
+        self.metrics_task = None
+        interval = self.config.get("metrics_dump_interval", 300)
+        if interval > 0:
+            self.metrics_task = asyncio.create_task(self._run_metrics_dump(interval))
+
+    async def _run_metrics_dump(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.metrics.dump(self.metrics_path, self._metrics_extra())
+            except Exception as e:
+                logger.error(f"写入统计数据失败: {str(e)}")
+
+    def _metrics_extra(self) -> dict:
+        """统计快照中附带的浏览器池、缓存、预热状态"""
+        return {
+            "pool": self.browser_pool.snapshot(),
+            "scheduler": self.scheduler.snapshot(),
+            "cache": self.screenshot_cache.stats(),
+            "records": self.records.stats(),
+            "inflight_renders": len(self.render_flight),
+            "prewarm": {"queued": len(self.prewarmer), "done": self.prewarmer.done},
+        }
+
+    @asynccontextmanager
+    async def _lease(self, game: str):
+        """租用浏览器并记录排队等待时间"""
+        started_at = time.monotonic()
+        async with self.browser_pool.lease() as worker:
+            self.metrics.record(game, "queue_wait", time.monotonic() - started_at)
+            yield worker
+
+    async def _prewarm_character(self, game: str, name: str) -> None:
+        """预热单个角色：已有有效缓存时跳过"""
+        url_result = self._resolve_without_browser(game, name)
+        if not url_result:
+            logger.info(f"预热跳过 {game} {name}：角色索引中不存在")
+            return
+        url, matched_character = url_result
+        if self.screenshot_cache.lookup(game, url):
+            return
+        logger.info(f"预热截图: {game} {matched_character}")
+        await self._render_shared(game, url)
+
+    def _parse_aliases(self, entries: list[str]) -> dict[str, dict[str, str]]:
+        """
+        解析别名配置，每条形如 "42=艾尔海森"（对所有游戏生效）
+        或 "ys:42=艾尔海森"（只对指定游戏生效）
+        """
+        aliases = {game: {} for game in self.gamelist}
+        for entry in entries or []:
+            if "=" not in entry:
+                logger.warning(f"无效的别名配置: {entry}")
+                continue
+            alias, target = (part.strip() for part in entry.split("=", 1))
+            games = list(self.gamelist)
+            prefix, sep, rest = alias.partition(":")
+            if sep and prefix in self.gamelist:
+                games, alias = [prefix], rest.strip()
+            if not alias or not target:
+                logger.warning(f"无效的别名配置: {entry}")
+                continue
+            for game in games:
+                aliases[game][alias] = target
+        return aliases
+
+    async def _fetch_roster(self, game: str) -> dict[str, str]:
+        """
+        抓取角色列表，供角色索引刷新使用：
+        配置了 roster_api 的站点先请求 JSON 接口，失败时再租用浏览器抓取列表页
+        """
+        roles = await self._fetch_roster_http(game)
+        if roles:
+            return roles
+        async with self.browser_pool.lease() as worker:
+            return await self._get_role_list(game, worker)
+
+    async def _fetch_roster_background(self, game: str) -> dict[str, str] | None:
+        """
+        后台刷新角色索引使用：浏览器尚未启动时只请求 JSON 接口，
+        不为刷新索引而启动浏览器（browser_warmup 关闭时浏览器在首次查询时才启动）
+
+        Returns:
+            角色表；需要浏览器但浏览器尚未启动时返回 None，本轮跳过
+        """
+        roles = await self._fetch_roster_http(game)
+        if roles:
+            return roles
+        if not self.browser_pool.started:
+            logger.info(f"浏览器尚未启动，暂不通过列表页刷新 {game} 角色索引")
+            return None
+        async with self.browser_pool.lease() as worker:
+            return await self._get_role_list(game, worker)
+
+    async def _fetch_roster_http(self, game: str) -> dict[str, str]:
+        """通过站点的 JSON 接口抓取角色列表，不可用时返回空字典"""
+        source = self.gamelist[game].get("roster_api")
+        if not self.http_resolver or not source:
+            return {}
+        try:
+            roles = await self.http_resolver.fetch_roster(source)
+            logger.info(f"已通过接口获取 {game} 角色列表，共 {len(roles)} 个角色")
+            return roles
         except Exception as e:
-            logger.error(f"浏览器驱动初始化失败: {str(e)},请手动在配置中添加driver地址")
+            logger.warning(f"通过接口获取 {game} 角色列表失败，改用浏览器: {str(e)}")
+            return {}
+
+    async def _tabs(self, worker) -> TabManager:
+        """该浏览器的标签页管理器，driver 重建后重新创建"""
+        if worker.tabs is None or worker.tabs.driver is not worker.driver:
+            worker.tabs = await worker.run(
+                TabManager,
+                worker.driver,
+                max_uses=self.config.get("tab_max_uses", 50),
+                max_heap_mb=self.config.get("tab_max_heap_mb", 512),
+            )
+        return worker.tabs
+
+    def _create_driver(self):
+        """创建一个无头浏览器实例，失败时返回 None（在浏览器池的 worker 线程中调用）"""
+        # 页面加载超时要明显短于单次操作超时：加载慢时由 selenium 抛出可恢复的
+        # TimeoutException，而不是先触发操作超时把整个浏览器丢弃重建
+        page_load_timeout = max(
+            5, min(self.browser_op_timeout - 5, self.browser_op_timeout * 0.8)
+        )
+        return create_driver(
+            self.browser_type,
+            driver_path=self.driver_path,
+            page_load_timeout=page_load_timeout,
+            path_cache=self.driver_path_cache,
+        )
 
     async def game_info_handler(
-        self, event: AstrMessageEvent, game: str = None, character: str = None
+        self,
+        event: AstrMessageEvent,
+        game: str = None,
+        character: str = None,
+        section: str = None,
+        prefer_text: bool = None,
     ):
+        """
+        Args:
+            prefer_text: 先尝试回复文字记录，为空时按 answer_mode 配置
+        """
         if not character:
             yield event.plain_result("角色名不能为空")
             return
         if game not in self.gamelist:
             yield event.plain_result("还不支持该游戏喵")
-        yield event.plain_result(
-            f"正在查询 {self.gamelist[game]['name']} 中的 {character} 词条，请稍后..."
-        )
-
-        # 使用锁确保同一时间只有一个查询在执行，防止页面覆盖
-        async with self.query_lock:
-            output_dir = self.gamelist[game]["output_dir"]
-            os.makedirs(output_dir, exist_ok=True)
-            # 获取URL和实际匹配的角色名（用于正确的缓存路径）
-            url_result = await self.get_url(game=game, character=character, event=event)
-            if url_result == "no_need_to_return_url":  # 无需返回url，停止
+            return
+        variant = ""
+        if section:
+            # 只截取指定栏目，每个栏目单独缓存
+            sections = self.gamelist[game]["sections"]
+            if section.lower() not in sections:
+                names = "、".join(dict.fromkeys(s["name"] for s in sections.values()))
+                yield event.plain_result(
+                    f"{self.gamelist[game]['name']} 可查询的栏目: {names}"
+                    if names
+                    else f"{self.gamelist[game]['name']} 暂不支持按栏目查询"
+                )
                 return
-            if not url_result:
-                yield event.plain_result("url获取失败")
+            section = sections[section.lower()]["name"]
+            variant = f"section:{section}"
+        self.last_query_at = time.time()
+        self.metrics.incr(game, "queries")
+        if self.prefer_text if prefer_text is None else prefer_text:
+            text = await self._answer_text(game, character, section)
+            if text:
+                yield event.plain_result(text)
                 return
-            url, matched_character = url_result
-            output_path = os.path.join(output_dir, f"{matched_character}.png")
+        with self.metrics.stage(game, "total") as total:
+            async for ret in self._query(
+                event, game, character, section, variant, total
+            ):
+                yield ret
+
+    async def _query(
+        self,
+        event: AstrMessageEvent,
+        game: str,
+        character: str,
+        section: str,
+        variant: str,
+        total: StageTimer,
+    ):
+        """
+        game_info_handler 的查询流程，各阶段耗时记入 self.metrics
 
-            # 如果发生了模糊匹配，提示用户
+        命中缓存时直接发送，不经过调度器；其余查询按用户限流并排队
+
+        Args:
+            total: 总耗时的计时器，等待用户选择消歧义项的时间单独记录，不计入总耗时
+        """
+        # 先查角色索引，命中且截图缓存有效时不需要浏览器
+        started_at = time.monotonic()
+        url_result = self._resolve_without_browser(game, character)
+        resolve_seconds = time.monotonic() - started_at
+        if url_result:
+            self.metrics.record(game, "resolve", resolve_seconds)
+            url, matched_character = url_result
             if matched_character != character:
                 yield event.plain_result(
                     f"未找到 '{character}'，已自动匹配为 '{matched_character}'"
                 )
+            images = self._lookup_or_revalidate(game, url, variant, count=True)
+            if images:
+                with self.metrics.stage(game, "send"):
+                    yield self._image_result(event, images)
+                return
 
-            if os.path.exists(output_path):
-                if (
-                    time.time() - os.path.getmtime(output_path) < self.keep_temp_time
-                ):  # 1小时缓存
-                    yield event.image_result(output_path)
+        try:
+            ticket = self._submit(event)
+        except RateLimited as e:
+            self.metrics.incr(game, "rate_limited")
+            yield event.plain_result(str(e))
+            return
+        choice_url = None
+        try:
+            yield event.plain_result(
+                f"正在查询 {self.gamelist[game]['name']} 中的 {character}"
+                f"{f' {section}' if section else ''} 词条{self._queue_hint(ticket)}，请稍后..."
+            )
+            async with ticket:
+                self.metrics.record(game, "schedule", ticket.waited)
+                resolved_by_index = bool(url_result)
+                if not url_result:
+                    # 索引未命中，先尝试 HTTP 请求解析，仍无法确定时才租用浏览器
+                    started_at = time.monotonic()
+                    url_result = await self._resolve_http(game, character, event)
+                    resolve_seconds += time.monotonic() - started_at
+                    if not url_result:
+                        async with self._lease(game) as worker:
+                            if not worker.driver:
+                                yield event.plain_result("浏览器驱动初始化失败")
+                                return
+                            started_at = time.monotonic()
+                            url_result = await self.get_url(
+                                game=game,
+                                character=character,
+                                event=event,
+                                worker=worker,
+                            )
+                            resolve_seconds += time.monotonic() - started_at
+                    self.metrics.record(game, "resolve", resolve_seconds)
+                    if not url_result:
+                        yield event.plain_result("url获取失败")
+                        return
+                    url, matched_character = url_result
+                    if url.startswith(DISAMBIGUATION_PREFIX):
+                        choice_url = url[len(DISAMBIGUATION_PREFIX) :]
+                    # 如果发生了模糊匹配，提示用户
+                    elif matched_character != character:
+                        yield event.plain_result(
+                            f"未找到 '{character}'，已自动匹配为 '{matched_character}'"
+                        )
+
+                # 相同页面的并发查询只截图一次，共享同一张图；消歧义页的截图已准备好
+                if not choice_url:
+                    images = self._lookup_or_revalidate(
+                        game, url, variant, count=not resolved_by_index
+                    ) or await self._render_shared(game, url, variant)
+            # 截图完成后即归还名额，发送图片不占用排队名额
+            if choice_url:
+                # 消歧义页：已归还名额和浏览器，再等待用户选择
+                with total.paused(), self.metrics.stage(game, "choice_wait"):
+                    await self._disambiguation_session(event, game, choice_url)
+            elif images:
+                # 消息在 yield 之后由框架发出，恢复执行时即发送完毕
+                with self.metrics.stage(game, "send"):
+                    yield self._image_result(event, images)
+            elif section:
+                yield event.plain_result(f"未能在页面中找到 {section} 栏目，或截图失败")
+            else:
+                yield event.plain_result("截图失败，请稍后再试")
+        except PoolBusyError as e:
+            logger.warning(f"浏览器池繁忙: {str(e)}")
+            self.metrics.incr(game, "busy_rejected")
+            yield event.plain_result("当前查询人数过多，请稍后再试")
+        finally:
+            ticket.cancel()  # 等待期间被取消或生成器被关闭时归还名额
+
+    def _image_result(self, event: AstrMessageEvent, images: list[str]):
+        """单张图片直接发送，切分成多张时合并成一条消息"""
+        if len(images) == 1:
+            return event.image_result(images[0])
+        return event.chain_result([Comp.Image.fromFileSystem(p) for p in images])
+
+    def _lookup_or_revalidate(
+        self, game: str, url: str, variant: str = "", count: bool = False
+    ) -> list[str] | None:
+        """
+        查找截图缓存：有效缓存直接返回；过期但未超过 stale_max_time 的旧图也直接返回，
+        同时在后台重新截图，下次查询即可拿到新图
+
+        Args:
+            count: 是否计入缓存命中统计（每个用户查询只计一次）
+        """
+        images, state = self.screenshot_cache.peek(game, url, variant)
+        if count:
+            counter = {"fresh": "cache_hit", "stale": "cache_stale"}.get(state)
+            self.metrics.incr(game, counter or "cache_miss")
+        if state == "stale" and self._idle_for_background():
+            key = self.screenshot_cache.make_key(game, url, variant)
+            if not self.render_flight.inflight(key) and key not in self.revalidating:
+                self.revalidating.add(key)
+                task = asyncio.create_task(self._revalidate(game, url, variant))
+                self._bg_tasks.add(task)
+                task.add_done_callback(self._bg_tasks.discard)
+        return images
+
+    def _idle_for_background(self) -> bool:
+        """浏览器池有空闲且没有用户查询在排队时才进行后台刷新，否则留到之后的过期命中"""
+        return (
+            not self.revalidate_slot.locked()
+            and self.browser_pool.has_idle
+            and not self.scheduler.waiting
+        )
+
+    async def _revalidate(self, game: str, url: str, variant: str) -> None:
+        """后台刷新过期缓存：页面内容未变化时直接续期，否则重新截图"""
+        try:
+            async with self.revalidate_slot:
+                if await self._renew_if_unchanged(game, url, variant):
                     return
-                else:
-                    os.remove(output_path)  # 缓存过期，删除旧的截图
-            try:
-                await self.take_full_screenshot(url, output_path, game, 3)
-                yield event.image_result(output_path)
-            except Exception as e:
-                logger.error(f"截图失败: {str(e)}")
+                # 校验期间可能来了用户查询，浏览器不空闲时放弃，不占用排队名额
+                if not self.browser_pool.has_idle or self.scheduler.waiting:
+                    logger.info(f"浏览器池繁忙，推迟后台刷新: {url}")
+                    return
+                logger.info(f"后台刷新过期截图: {url}")
+                await self._render_shared(game, url, variant, force=True)
+        except PoolBusyError as e:
+            logger.warning(f"浏览器池繁忙，跳过后台刷新: {str(e)}")
+        except Exception as e:
+            logger.error(f"后台刷新截图失败: {str(e)}")
+        finally:
+            self.revalidating.discard(
+                self.screenshot_cache.make_key(game, url, variant)
+            )
+
+    async def _render_shared(
+        self,
+        game: str,
+        url: str,
+        variant: str = "",
+        worker=None,
+        force: bool = False,
+    ) -> list[str] | None:
+        """
+        按 (游戏, URL, 变体) 合并并发截图请求，同一页面同时只截图一次
+
+        启用共享存储时还持有跨进程锁，其他实例正在截图同一页面时等它完成后直接使用
+
+        Args:
+            worker: 调用方已租用的浏览器，为空时从浏览器池租用
+            force: 忽略有效缓存，强制重新截图
+        """
+
+        async def render() -> list[str] | None:
+            async with self._shared_lock(key) as waited:
+                if waited:
+                    # 其他实例刚截完同一页面，先取回它写入的缓存
+                    await self.screenshot_cache.pull_shared()
+                try:
+                    return await render_locked(waited)
+                finally:
+                    # 释放跨进程锁之前写入共享存储，等待的实例立即可用
+                    try:
+                        await self.screenshot_cache.flush_shared()
+                    except Exception as e:
+                        logger.error(f"写入共享截图缓存失败: {str(e)}")
+
+        async def render_locked(waited: bool) -> list[str] | None:
+            if not force or waited:
+                # 排在前一次截图（本实例或其他实例）之后的请求，可能已经有新缓存了
+                images = self.screenshot_cache.lookup(
+                    game, url, variant
+                ) or await self._renew_if_unchanged(game, url, variant)
+                if images:
+                    if waited:
+                        self.metrics.incr(game, "shared_hit")
+                    return images
+            if worker is not None:
+                return await self._render_to_cache(game, url, worker, variant)
+            async with self._lease(game) as leased:
+                return await self._render_to_cache(game, url, leased, variant)
+
+        key = self.screenshot_cache.make_key(game, url, variant)
+        return await self.render_flight.do(key, render)
+
+    def _shared_lock(self, key: str):
+        """截图的跨进程锁，未启用共享存储时不加锁"""
+        if not self.shared_store:
+            return nullcontext(False)
+        # 持有期间自动续期，ttl 只决定持有者崩溃后多久释放
+        return self.shared_store.lock(f"render:{key}", ttl=60)
+
+    async def _render_to_cache(
+        self, game: str, url: str, worker, variant: str = ""
+    ) -> list[str] | None:
+        """
+        截图写入本请求独占的临时文件，压缩/切分后连同原图一起放入截图缓存
+
+        Returns:
+            list[str]: 用于发送的图片路径，截图失败返回 None
+        """
+        final_path = self.screenshot_cache.path_for(
+            game, self.screenshot_cache.make_key(game, url, variant)
+        )
+        tmp_path = self.screenshot_cache.temp_path(final_path)
+        # 截图的同时取页面指纹，不增加截图耗时
+        fingerprint_task = asyncio.create_task(self._fingerprint(game, url))
+        tiles: list[str] = []
+        try:
+            success = await self.take_full_screenshot(
+                url,
+                tmp_path,
+                game if game in self.gamelist else None,
+                3,
+                worker=worker,
+                section=self._section_for(game, variant),
+                tiles=tiles,
+            )
+            if not success or not os.path.exists(tmp_path):
+                fingerprint_task.cancel()
+                self.metrics.incr(game, "render_failed")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return None
+            self.metrics.incr(game, "render")
+            with self.metrics.stage(game, "encode"):
+                # 分块截图时按块压缩，不需要把整页大图读入内存
+                tmp_outputs = await self._encode_output(tmp_path, tiles)
+        finally:
+            remove_files(tiles)
+        return self.screenshot_cache.commit(
+            game, url, tmp_path, variant, tmp_outputs, await fingerprint_task
+        )
+
+    async def _fingerprint(self, game: str, url: str) -> str | None:
+        """
+        页面内容指纹：配置了 JSON 文字记录的站点（单页应用）取角色数据接口内容的哈希，
+        其他站点取 MediaWiki 修订版本号；没有可靠的内容来源、站点关闭了 fingerprint
+        或请求失败时返回 None，缓存过期后照常重新截图
+        """
+        if not self.content_fingerprint or not self.http_resolver:
+            return None
+        if game not in self.gamelist or not self.gamelist[game]["fingerprint"]:
+            return None
+        try:
+            rule = self.gamelist[game]["record"]
+            if rule and rule["source"] == "json":
+                match = rule["id_pattern"].match(url)
+                if not match:
+                    return None
+                status, _, text = await self.http_resolver.fetch(
+                    rule["url_template"].format(id=match.group("id"))
+                )
+                return content_hash(text) if status == 200 else None
+            return await self.http_resolver.fingerprint(url)
+        except Exception as e:
+            logger.debug(f"获取页面指纹失败 {url}: {str(e)}")
+            return None
+
+    async def _renew_if_unchanged(
+        self, game: str, url: str, variant: str = ""
+    ) -> list[str] | None:
+        """
+        过期缓存的廉价校验：页面指纹与截图时相同则续期并返回缓存的图片，
+        否则返回 None，由调用方重新截图
+        """
+        entry = self.screenshot_cache.entry(game, url, variant)
+        if not entry or not entry.get("fingerprint"):
+            return None
+        if entry.get("renewed", 0) >= self.fingerprint_max_renewals:
+            logger.info(f"缓存已连续续期 {entry['renewed']} 次，重新截图: {url}")
+            return None
+        with self.metrics.stage(game, "revalidate"):
+            fingerprint = await self._fingerprint(game, url)
+        if fingerprint != entry["fingerprint"]:
+            logger.info(f"页面内容已变化，重新截图: {url}")
+            return None
+        logger.info(f"页面内容未变化，缓存续期: {url}")
+        self.metrics.incr(game, "revalidated")
+        return self.screenshot_cache.renew(entry["key"])
+
+    def _section_for(self, game: str, variant: str) -> dict | None:
+        """缓存变体 "section:<栏目名>" 对应的栏目规则"""
+        kind, _, name = variant.partition(":")
+        if kind != "section" or game not in self.gamelist:
+            return None
+        return self.gamelist[game]["sections"].get(name.lower())
+
+    async def _encode_output(self, tmp_path: str, tiles: list[str] = None) -> list[str]:
+        """
+        在线程中把原始截图缩放、压缩并切分，每次截图只做一次，结果随原图一起缓存
+
+        Args:
+            tiles: 分块截图的各块，有分块时直接按块读取，结果与读取整张原图相同
+
+        Returns:
+            list[str]: 压缩后的临时文件，关闭压缩或失败时为空（直接发送原图）
+        """
+        if self.image_options["fmt"] == "original":
+            return []
+        try:
+            started_at = time.monotonic()
+            outputs = await asyncio.to_thread(
+                encode_screenshot,
+                tiles or tmp_path,
+                tmp_path[: -len(".png")],
+                **self.image_options,
+            )
+            logger.info(
+                f"截图压缩完成: {os.path.getsize(tmp_path) // 1024}KB -> "
+                f"{sum(os.path.getsize(p) for p in outputs) // 1024}KB，"
+                f"共 {len(outputs)} 张，耗时 {time.monotonic() - started_at:.2f}s"
+            )
+            return outputs
+        except Exception as e:
+            logger.error(f"截图压缩失败，发送原图: {str(e)}")
+            return []
+
+    async def _get_or_render(
+        self, game: str, url: str, worker, variant: str = ""
+    ) -> list[str] | None:
+        """优先使用缓存（过期旧图会后台刷新），否则截图（合并相同页面的并发请求）"""
+        images = self._lookup_or_revalidate(game, url, variant)
+        if images:
+            return images
+        return await self._render_shared(game, url, variant, worker=worker)
 
     @filter.command("srinfo", alias={"崩铁wiki查询", "星穹铁道wiki查询"})
-    async def sr_handler(self, event: AstrMessageEvent, character: str = None):
-        """输入 srinfo [角色名]    返回角色信息截图"""
+    async def sr_handler(
+        self, event: AstrMessageEvent, character: str = None, section: str = None
+    ):
+        """输入 srinfo [角色名] [栏目(可选)]    返回角色信息截图"""
         async for ret in self.game_info_handler(
-            event=event, game="sr", character=character
+            event=event, game="sr", character=character, section=section
         ):
             yield ret
 
     @filter.command("fzinfo", alias={"方舟wiki查询", "明日方舟wiki查询"})
-    async def fz_handler(self, event: AstrMessageEvent, character: str = None):
-        """输入 fzinfo [角色名]    返回角色信息截图"""
+    async def fz_handler(
+        self, event: AstrMessageEvent, character: str = None, section: str = None
+    ):
+        """输入 fzinfo [角色名] [栏目(可选)]    返回角色信息截图"""
         async for ret in self.game_info_handler(
-            event=event, game="fz", character=character
+            event=event, game="fz", character=character, section=section
         ):
             yield ret
 
     @filter.command("ysinfo", alias={"原神wiki查询"})
-    async def ys_handler(self, event: AstrMessageEvent, character: str = None):
-        """输入 ysinfo [角色名]    返回角色信息截图"""
+    async def ys_handler(
+        self, event: AstrMessageEvent, character: str = None, section: str = None
+    ):
+        """输入 ysinfo [角色名] [栏目(可选)]    返回角色信息截图"""
         async for ret in self.game_info_handler(
-            event=event, game="ys", character=character
+            event=event, game="ys", character=character, section=section
         ):
             yield ret
 
     @filter.command("zzzinfo", alias={"绝区零wiki查询"})
-    async def zzz_handler(self, event: AstrMessageEvent, character: str = None):
-        """输入 zzzinfo [角色名]    返回角色信息截图"""
+    async def zzz_handler(
+        self, event: AstrMessageEvent, character: str = None, section: str = None
+    ):
+        """输入 zzzinfo [角色名] [栏目(可选)]    返回角色信息截图"""
         async for ret in self.game_info_handler(
-            event=event, game="zzz", character=character
+            event=event, game="zzz", character=character, section=section
         ):
             yield ret
 
     @filter.command("wwinfo", alias={"鸣潮wiki查询"})
-    async def ww_handler(self, event: AstrMessageEvent, character: str = None):
-        """输入 wwinfo [角色名]    返回角色信息截图"""
+    async def ww_handler(
+        self, event: AstrMessageEvent, character: str = None, section: str = None
+    ):
+        """输入 wwinfo [角色名] [栏目(可选)]    返回角色信息截图"""
         async for ret in self.game_info_handler(
-            event=event, game="ww", character=character
+            event=event, game="ww", character=character, section=section
         ):
             yield ret
 
     @filter.command("issacinfo", alias={"以撒wiki查询"})
-    async def issac_handler(self, event: AstrMessageEvent, character: str = None):
-        """输入 issacinfo [角色名]    返回角色信息截图"""
+    async def issac_handler(
+        self, event: AstrMessageEvent, character: str = None, section: str = None
+    ):
+        """输入 issacinfo [角色名] [栏目(可选)]    返回角色信息截图"""
         async for ret in self.game_info_handler(
-            event=event, game="issac", character=character
+            event=event, game="issac", character=character, section=section
         ):
             yield ret
 
     @filter.command("endfieldinfo", alias={"终末地wiki查询"})
-    async def endfield_handler(self, event: AstrMessageEvent, character: str = None):
-        """输入 endfieldinfo [角色名]    返回角色信息截图"""
+    async def endfield_handler(
+        self, event: AstrMessageEvent, character: str = None, section: str = None
+    ):
+        """输入 endfieldinfo [角色名] [栏目(可选)]    返回角色信息截图"""
         async for ret in self.game_info_handler(
-            event=event, game="endfield", character=character
+            event=event, game="endfield", character=character, section=section
         ):
             yield ret
 
-    async def get_url(self, game: str, character: str, event: AstrMessageEvent):
+    @filter.command("wikiinfo", alias={"游戏wiki查询"})
+    async def wiki_handler(
+        self,
+        event: AstrMessageEvent,
+        game: str = None,
+        character: str = None,
+        section: str = None,
+    ):
+        """输入 wikiinfo [游戏标识] [角色名] [栏目(可选)]    查询任意已配置站点的角色信息截图"""
+        if game not in self.gamelist:
+            games = "、".join(
+                f"{key}({cfg['name']})" for key, cfg in self.gamelist.items()
+            )
+            yield event.plain_result(f"支持的游戏标识: {games}")
+            return
+        async for ret in self.game_info_handler(
+            event=event, game=game, character=character, section=section
+        ):
+            yield ret
+
+    @filter.command("wikitext", alias={"wiki文字查询"})
+    async def wiki_text_handler(
+        self,
+        event: AstrMessageEvent,
+        game: str = None,
+        character: str = None,
+        section: str = None,
+    ):
+        """输入 wikitext [游戏标识] [角色名] [栏目(可选)]    以文字回复角色信息，无法提取时改为截图"""
+        if game not in self.gamelist:
+            games = "、".join(
+                f"{key}({cfg['name']})"
+                for key, cfg in self.gamelist.items()
+                if cfg["record"]
+            )
+            yield event.plain_result(f"支持文字查询的游戏标识: {games}")
+            return
+        if not character:
+            yield event.plain_result("角色名不能为空")
+            return
+        self.last_query_at = time.time()
+        text = await self._answer_text(game, character, section)
+        if text:
+            self.metrics.incr(game, "queries")
+            yield event.plain_result(text)
+            return
+        if self.gamelist[game]["record"]:
+            yield event.plain_result("未能提取到文字信息，改为截图")
+        if section and section.lower() not in self.gamelist[game]["sections"]:
+            section = None  # 只在文字记录中存在的栏目，截取整页
+        async for ret in self.game_info_handler(
+            event=event,
+            game=game,
+            character=character,
+            section=section,
+            prefer_text=False,
+        ):
+            yield ret
+
+    async def _answer_text(
+        self, game: str, character: str, section: str = None
+    ) -> str | None:
+        """
+        用文字记录回答查询，不需要浏览器
+
+        Returns:
+            回复文字；站点未配置文字记录、角色无法不经浏览器解析、
+            提取失败或记录中没有该栏目时返回 None，由调用方改为截图
+        """
+        if not self.gamelist[game]["record"] or not self.http_resolver:
+            return None
+        url_result = self._resolve_without_browser(game, character)
+        if not url_result and self.gamelist[game]["url_type"] == "search":
+            url_result = await self._resolve_http(game, character, None)
+        if not url_result:
+            # 有消歧义页的站点：直接请求页面，提取时发现是消歧义页则改为截图流程
+            name = self.roster.resolve_alias(game, character) or character
+            url_result = (f"{self.gamelist[game]['url']}/{name}", name)
+        url, matched_character = url_result
+        with self.metrics.stage(game, "extract"):
+            record = await self._fetch_record(game, url, matched_character)
+        if not record:
+            return None
+        label = None
+        if section:
+            label = self._record_label(game, record, section)
+            if not label:
+                return None
+        self.metrics.incr(game, "text_answer")
+        text = format_record(
+            self.gamelist[game]["name"],
+            matched_character,
+            record,
+            label,
+            self.text_max_chars,
+        )
+        if matched_character != character:
+            text = f"未找到 '{character}'，已自动匹配为 '{matched_character}'\n{text}"
+        return text
+
+    async def _fetch_record(self, game: str, url: str, name: str) -> dict | None:
+        """取有效期内的文字记录，没有时请求页面或数据接口提取并保存"""
+        record = self.records.get(game, url)
+        if record:
+            return record
+        rule = self.gamelist[game]["record"]
+        try:
+            if rule["source"] == "json":
+                match = rule["id_pattern"].match(url)
+                if not match:
+                    return None
+                data = await self.http_resolver.fetch_json(
+                    rule["url_template"].format(id=match.group("id"))
+                )
+                fields = extract_json_record(data, rule["fields"])
+            else:
+                status, _, html = await self.http_resolver.fetch(url)
+                disambiguation = self.gamelist[game].get("disambiguation") or {}
+                if status != 200 or (
+                    disambiguation.get("marker") and disambiguation["marker"] in html
+                ):
+                    return None
+                fields = await asyncio.to_thread(extract_mediawiki_record, html)
+        except Exception as e:
+            logger.warning(f"提取 {game} {name} 的文字记录失败: {str(e)}")
+            return None
+        if not fields:
+            return None
+        logger.info(f"已提取 {game} {name} 的文字记录: {'、'.join(fields)}")
+        return self.records.put(game, url, name, fields)
+
+    def _record_label(self, game: str, record: dict, section: str) -> str | None:
+        """把用户输入的栏目名对应到记录中的栏目：精确匹配、栏目别名、包含关系依次尝试"""
+        fields = record["fields"]
+        names = [section]
+        rule = self.gamelist[game]["sections"].get(section.lower())
+        if rule:
+            names.append(rule["name"])
+        for name in names:
+            for label in fields:
+                if label.lower() == name.lower():
+                    return label
+        for name in names:
+            for label in fields:
+                if name in label or label in name:
+                    return label
+        return None
+
+    @filter.command("infobatch", alias={"批量wiki查询"})
+    async def batch_handler(self, event: AstrMessageEvent):
+        """输入 infobatch [游戏标识] [角色名...]    一次查询多个角色，如 infobatch ys 钟离 胡桃 sr 刃"""
+        items, error = self._parse_batch(event.message_str.split()[1:])
+        if error:
+            yield event.plain_result(error)
+            return
+        self.last_query_at = time.time()
+        for game, _character in items:
+            self.metrics.incr(game, "queries")
+        # 先用不需要浏览器的方式解析并取缓存，其余角色拿到调度名额后再解析和截图
+        resolved = {item: self._resolve_without_browser(*item) for item in items}
+        results: dict[tuple[str, str], list[str] | str] = {}
+        pending = []
+        for item, result in resolved.items():
+            if result is None:
+                pending.append(item)
+                continue
+            images = self._lookup_or_revalidate(item[0], result[0], count=True)
+            if images:
+                results[item] = images
+            else:
+                pending.append(item)
+        if pending:
+            try:
+                # 每个未命中的角色一个名额，最多占满浏览器池，拿到名额后并发截图
+                ticket = self._submit(
+                    event,
+                    cost=len(pending),
+                    slots=min(len(pending), self.browser_pool.size),
+                )
+            except RateLimited as e:
+                self.metrics.incr(pending[0][0], "rate_limited")
+                yield event.plain_result(str(e))
+                return
+            try:
+                yield event.plain_result(
+                    f"正在查询 {len(items)} 个角色，其中 {len(pending)} 个未命中缓存"
+                    f"{self._queue_hint(ticket)}，请稍后..."
+                )
+                async with ticket:
+                    # 解析时可能用浏览器刷新角色索引，必须在拿到名额之后
+                    unresolved = [item for item in pending if resolved[item] is None]
+                    if unresolved:
+                        resolved.update(await self._resolve_batch(unresolved))
+                    misses = []
+                    for item in pending:
+                        result = resolved[item]
+                        if isinstance(result, str):
+                            results[item] = result
+                            continue
+                        images = self._lookup_or_revalidate(
+                            item[0], result[0], count=item in unresolved
+                        )
+                        if images:
+                            results[item] = images
+                        else:
+                            misses.append(item)
+                    # 并发数不超过票占用的名额，不和其他用户抢浏览器
+                    slot = asyncio.Semaphore(ticket.slots)
+
+                    async def render(game: str, url: str) -> list[str] | None:
+                        async with slot:
+                            return await self._render_shared(game, url)
+
+                    rendered = await asyncio.gather(
+                        *(
+                            render(game, resolved[(game, name)][0])
+                            for game, name in misses
+                        ),
+                        return_exceptions=True,
+                    )
+            finally:
+                ticket.cancel()
+            for item, images in zip(misses, rendered):
+                if isinstance(images, PoolBusyError):
+                    results[item] = "当前查询人数过多，请稍后再试"
+                elif isinstance(images, BaseException) or not images:
+                    if isinstance(images, BaseException):
+                        logger.error(f"批量查询截图失败 {item}: {str(images)}")
+                    results[item] = "截图失败，请稍后再试"
+                else:
+                    results[item] = images
+        yield self._batch_result(event, items, resolved, results)
+
+    def _parse_batch(
+        self, tokens: list[str]
+    ) -> tuple[list[tuple[str, str]], str | None]:
+        """
+        解析批量查询参数：游戏标识切换后续角色所属的游戏，也可写成 "ys:钟离"
+
+        Returns:
+            ([(游戏, 角色名)], 错误提示)
+        """
+        items = []
+        game = None
+        for token in tokens:
+            prefix, sep, rest = token.partition(":")
+            if sep and prefix in self.gamelist and rest:
+                items.append((prefix, rest))
+            elif token in self.gamelist:
+                game = token
+            elif game:
+                items.append((game, token))
+            else:
+                return [], "请先指定游戏标识，如 infobatch ys 钟离 胡桃 sr 刃"
+        items = list(dict.fromkeys(items))
+        max_size = self.config.get("batch_max_size", 6)
+        if not items:
+            return (
+                [],
+                "用法: infobatch [游戏标识] [角色名...]，如 infobatch ys 钟离 胡桃 sr 刃",
+            )
+        if len(items) > max_size:
+            return [], f"一次最多查询 {max_size} 个角色"
+        return items, None
+
+    async def _resolve_batch(
+        self, items: list[tuple[str, str]]
+    ) -> dict[tuple[str, str], tuple[str, str] | str]:
+        """
+        一次性解析所有角色的详情页URL：先查角色索引，未命中的游戏只刷新一次索引后再查；
+        有消歧义页的站点并发用 HTTP 检测，消歧义页提示用户单独查询
+
+        Returns:
+            (游戏, 角色名) -> (url, matched_character)，失败时为提示文字
+        """
+        resolved = {item: self._resolve_without_browser(*item) for item in items}
+        stale_games = {
+            game
+            for (game, _), result in resolved.items()
+            if result is None
+            and self.gamelist[game]["url_type"] == "search"
+            and time.time() - self.roster.updated_at.get(game, 0) >= 300
+        }
+        for game in stale_games:
+            try:
+                await self.roster.refresh(game, self._fetch_roster, force=True)
+            except Exception as e:
+                logger.warning(f"批量查询刷新 {game} 角色索引失败: {str(e)}")
+        for item, result in resolved.items():
+            if result is None and self.gamelist[item[0]]["url_type"] == "search":
+                resolved[item] = self._resolve_without_browser(*item) or "未找到该角色"
+
+        async def check(game: str, character: str) -> tuple[str, str] | str:
+            game_config = self.gamelist[game]
+            character = self.roster.resolve_alias(game, character) or character
+            query_url = f"{game_config['url']}/{character}"
+            if not self.http_resolver:
+                return (query_url, character)
+            try:
+                page = await self.http_resolver.check_page(
+                    query_url, game_config["disambiguation"]
+                )
+            except Exception as e:
+                logger.warning(f"HTTP 检测 {query_url} 失败: {str(e)}")
+                return (query_url, character)
+            if page["disambiguation"]:
+                return f"是消歧义页，请用 /wikiinfo {game} {character} 单独查询"
+            return (query_url, character)
+
+        pending = [item for item, result in resolved.items() if result is None]
+        for item, result in zip(
+            pending, await asyncio.gather(*(check(*item) for item in pending))
+        ):
+            resolved[item] = result
+        return resolved
+
+    def _batch_result(
+        self,
+        event: AstrMessageEvent,
+        items: list[tuple[str, str]],
+        resolved: dict,
+        results: dict,
+    ):
+        """把批量查询的结果合并成一条消息：QQ(aiocqhttp) 下为合并转发，其他平台为图文消息链"""
+        sections = []
+        for game, character in items:
+            result = results[(game, character)]
+            matched = resolved[(game, character)]
+            title = f"【{self.gamelist[game]['name']}】{character}"
+            if not isinstance(matched, str) and matched[1] != character:
+                title += f"（已匹配为 {matched[1]}）"
+            if isinstance(result, str):
+                sections.append([Comp.Plain(text=f"{title}: {result}")])
+            else:
+                sections.append(
+                    [
+                        Comp.Plain(text=title),
+                        *[Comp.Image.fromFileSystem(p) for p in result],
+                    ]
+                )
+        if (
+            self.config.get("batch_forward", True)
+            and event.get_platform_name() == "aiocqhttp"
+        ):
+            nodes = [
+                Comp.Node(uin=event.get_self_id(), name="二游wiki", content=content)
+                for content in sections
+            ]
+            return event.chain_result([Comp.Nodes(nodes=nodes)])
+        chain = []
+        for content in sections:
+            if chain:
+                content[0] = Comp.Plain(text=f"\n{content[0].text}")
+            chain.extend(content)
+        return event.chain_result(chain)
+
+    async def get_url(
+        self, game: str, character: str, event: AstrMessageEvent, worker=None
+    ):
         """
         获取角色详情页URL
 
+        Args:
+            worker: 从浏览器池租用的浏览器
+
         Returns:
-            tuple: (url, matched_character) 或 None
+            tuple: (url, matched_character) 或 None；
+                消歧义页的 url 为 DISAMBIGUATION_PREFIX + 页面URL，选项和截图已准备好
         """
-        if not self.driver:
+        if not worker or not worker.driver:
             logger.error("浏览器驱动未初始化")
-            self._handle_driver_manager()
-        if not self.driver:
-            logger.error("浏览器驱动初始化失败")
             return None
         if game not in self.gamelist:
             return None
 
         game_config = self.gamelist[game]
         url_type = game_config.get("url_type", "append")
+        driver = worker.driver
 
         # 需要在列表页搜索的游戏
         if url_type == "search":
+            url_result = self._resolve_without_browser(game, character)
+            if url_result:
+                return url_result
             try:
                 logger.info(f"开始尝试获取url: {character}")
-                driver = self.driver
-                driver.get(game_config["url"])
-
                 # 从配置中获取 XPath 模板并填充角色名
                 xpath_template = game_config.get("xpath_template", "")
                 character_link_xpath = xpath_template.format(character.split("/")[0])
 
-                # 等待角色链接加载并可点击
-                character_link = WebDriverWait(driver, 10).until(
-                    EC.element_to_be_clickable((By.XPATH, character_link_xpath))
-                )
-                url = character_link.get_attribute("href")
-                logger.info(f"获取到url: {url}")
-                return (url, character)  # 返回URL和实际匹配的角色名
+                tabs = await self._tabs(worker)
+
+                def find_character_href():
+                    from selenium.webdriver.common.by import By
+                    from selenium.webdriver.support import expected_conditions as EC
+                    from selenium.webdriver.support.ui import WebDriverWait
+
+                    # 等待角色链接加载并可点击
+                    character_link = WebDriverWait(driver, 10).until(
+                        EC.element_to_be_clickable((By.XPATH, character_link_xpath))
+                    )
+                    # XPath 按包含关系匹配，实际角色名取链接中的角色名元素，与抓取列表时一致
+                    names = []
+                    if game_config.get("roster_name_xpath"):
+                        names = character_link.find_elements(
+                            By.XPATH, game_config["roster_name_xpath"]
+                        )
+                    name = next(
+                        (e.text.strip() for e in names if e.text.strip()),
+                        character_link.text.strip(),
+                    )
+                    return character_link.get_attribute("href"), name
+
+                # 打开列表页和等待角色链接分两次执行，各自受浏览器操作超时限制，
+                # 加载较慢的列表页不会让两者合计超时而丢弃浏览器
+                try:
+                    # 切到常驻的列表页标签页，已加载好时不需要重新打开
+                    await worker.run(tabs.list_tab, game, game_config["url"])
+                    url, matched = await worker.run(find_character_href)
+                finally:
+                    if not worker.broken:
+                        try:
+                            await worker.run(tabs.base_tab)
+                        except Exception as e:
+                            logger.warning(f"切回初始标签页失败: {str(e)}")
+                logger.info(f"获取到url: {url}，角色名: {matched}")
+                if not matched or len(matched) >= 20:
+                    # 取不到像角色名的文字时不写入索引，避免用户输入的片段成为角色名
+                    return (url, character)
+                self.roster.add(game, matched, url)  # 索引未收录，记录下来
+                return (url, matched)  # 返回URL和实际匹配的角色名
+            except BrowserOpTimeout as e:
+                logger.error(f"获取url超时: {str(e)}")
+                return False
             except Exception as e:
                 logger.error(f"精确匹配失败: {str(e)}，尝试模糊匹配")
                 # 模糊匹配：自动选择相似度最高的角色
-                best_match = await self._fuzzy_match(game, character)
+                best_match = await self._fuzzy_match(game, character, worker)
                 if best_match:
                     logger.info(
                         f"模糊匹配成功: {character} -> {best_match[0]} (相似度: {best_match[1]}%)"
                     )
                     # 使用最佳匹配重新获取URL
-                    result = await self.get_url(game, best_match[0], event)
+                    result = await self.get_url(game, best_match[0], event, worker)
                     if result:
                         url, _ = result
                         return (url, best_match[0])  # 返回URL和模糊匹配的角色名
@@ -328,17 +1407,24 @@ class FzInfoPlugin(Star):
 
         # 直接拼接 URL 的游戏
         elif url_type == "append":
-            if game == "issac":
+            disambiguation = game_config.get("disambiguation")
+            if disambiguation:
                 base_url = game_config["url"]
-                driver = self.driver
                 query_url = f"{base_url}/{character}"
-                driver.get(query_url)
-                if "这是一个消歧义页" in driver.page_source:
-                    logger.info(f"检测到以撒消歧义页面: {query_url}")
-                    await self._handle_disambiguation_page(
-                        original_query=character, query_url=query_url, event=event
-                    )
-                    return ("no_need_to_return_url", character)
+
+                tabs = await self._tabs(worker)
+
+                def is_disambiguation_page():
+                    # 在启动时的标签页中打开，不覆盖常驻列表页
+                    tabs.base_tab()
+                    tabs.navigate(query_url)
+                    return disambiguation["marker"] in driver.page_source
+
+                if await worker.run(is_disambiguation_page):
+                    logger.info(f"检测到消歧义页面: {query_url}")
+                    if not await self._prepare_disambiguation(game, query_url, worker):
+                        return None
+                    return (DISAMBIGUATION_PREFIX + query_url, character)
                 else:
                     return (query_url, character)
             else:
@@ -346,91 +1432,198 @@ class FzInfoPlugin(Star):
 
         return None
 
-    async def _fuzzy_match(self, game: str, character: str) -> tuple[str, int] | None:
+    def _resolve_without_browser(
+        self, game: str, character: str
+    ) -> tuple[str, str] | None:
+        """
+        不打开浏览器直接得到角色详情页URL：拼接型游戏直接拼接，
+        搜索型游戏查角色索引（精确匹配优先，其次模糊匹配）
+
+        Returns:
+            (url, matched_character) 或 None（需要浏览器处理）
+        """
+        game_config = self.gamelist[game]
+        url_type = game_config.get("url_type", "append")
+        alias_target = self.roster.resolve_alias(game, character)
+        if alias_target:
+            logger.info(f"别名匹配: {character} -> {alias_target}")
+            character = alias_target
+        if url_type == "append" and not game_config.get("disambiguation"):
+            # 有消歧义页的站点（以撒）需要打开页面检测
+            return (f"{game_config['url']}/{character}", character)
+        if url_type != "search":
+            return None
+        url = self.roster.get(game, character)
+        if url:
+            return (url, character)
+        best_match = self._match_roster(game, character)
+        if not best_match:
+            return None
+        # 匹配到的可能是尚未收录的别名目标，索引中没有时交给浏览器处理
+        url = self.roster.get(game, best_match[0])
+        if not url:
+            return None
+        logger.info(
+            f"模糊匹配成功: {character} -> {best_match[0]} (相似度: {best_match[1]}%)"
+        )
+        return (url, best_match[0])
+
+    async def _resolve_http(
+        self, game: str, character: str, event: AstrMessageEvent
+    ) -> tuple[str, str] | None:
+        """
+        不打开浏览器、只用 HTTP 请求解析角色详情页URL：
+
+        - 有消歧义页的拼接型站点：请求页面判断是否为消歧义页，是则直接从 HTML 取出选项
+        - 配置了 roster_api 的搜索型站点：索引未命中时通过接口刷新索引后再查
+
+        Returns:
+            (url, matched_character)，无法确定时返回 None，由浏览器继续处理；
+            消歧义页同 get_url
+        """
+        if not self.http_resolver:
+            return None
+        game_config = self.gamelist[game]
+        character = self.roster.resolve_alias(game, character) or character
+        try:
+            if game_config["url_type"] == "search":
+                # 接口请求很便宜，但也不必每次未命中都刷新
+                if (
+                    game_config.get("roster_api")
+                    and time.time() - self.roster.updated_at.get(game, 0) >= 300
+                ):
+                    await self.roster.refresh(game, self._fetch_roster_http, force=True)
+                    return self._resolve_without_browser(game, character)
+                return None
+            disambiguation = game_config.get("disambiguation")
+            query_url = f"{game_config['url']}/{character}"
+            page = await self.http_resolver.check_page(query_url, disambiguation)
+        except Exception as e:
+            logger.warning(f"HTTP 解析 {game} {character} 失败，改用浏览器: {str(e)}")
+            return None
+        if not page["disambiguation"]:
+            return (query_url, character)
+        if not page["options"]:
+            return None  # 选项结构与预期不符，交给浏览器按 XPath 提取
+        logger.info(f"检测到消歧义页面: {query_url}")
+        if not await self._prepare_disambiguation(
+            game, query_url, options=page["options"]
+        ):
+            return None
+        return (DISAMBIGUATION_PREFIX + query_url, character)
+
+    def _match_roster(self, game: str, character: str) -> tuple[str, int] | None:
+        """在角色索引中模糊匹配，相似度 >= 60% 才接受"""
+        with self.metrics.stage(game, "fuzzy_match"):
+            candidates = self.roster.match(game, character, k=5, cutoff=60)
+        if not candidates:
+            return None
+        logger.debug(f"{character} 的模糊匹配候选: {candidates}")
+        return candidates[0]
+
+    async def _fuzzy_match(
+        self, game: str, character: str, worker=None
+    ) -> tuple[str, int] | None:
         """
         模糊匹配角色名，自动选择相似度最高的结果
 
+        索引为空或已过期时，先用当前租用的浏览器刷新索引再匹配
+
         Args:
             game: 游戏标识
             character: 用户输入的角色名
+            worker: 从浏览器池租用的浏览器
 
         Returns:
             (最佳匹配角色名, 相似度) 或 None
         """
         try:
-            role_list = await self._get_role_list(game)
-            if not role_list:
-                return None
-
-            # 使用 thefuzz 进行模糊匹配，获取最佳结果
-            result = process.extractOne(character, role_list, scorer=fuzz.ratio)
-            if result and result[1] >= 60:  # 相似度 >= 60% 才接受
-                return result
-            return None
+            if not self.roster.names(game) or self.roster.is_stale(game):
+                await self.roster.refresh(
+                    game, lambda g: self._get_role_list(g, worker)
+                )
+            return self._match_roster(game, character)
         except Exception as e:
             logger.error(f"模糊匹配失败: {str(e)}")
             return None
 
-    async def _get_role_list(self, game: str) -> list[str]:
-        """获取游戏角色列表（每次从网页抓取最新数据）"""
-        if not self.driver:
-            self._handle_driver_manager()
-        if not self.driver:
-            return []
+    async def _get_role_list(self, game: str, worker=None) -> dict[str, str]:
+        """
+        从列表页抓取游戏角色列表
 
-        try:
-            driver = self.driver
-            driver.get(self.gamelist[game]["url"])
-            await asyncio.sleep(2)  # 等待页面加载
-
-            # 根据游戏类型提取角色名
-            role_list = []
-            if game in ["ys", "sr", "zzz", "ww"]:
-                # 从 div 元素中提取角色名
-                elements = driver.find_elements(
-                    By.XPATH,
-                    "//a[contains(@href, '/character/') or contains(@href, '/char/')]//div[contains(@class, 'name') or contains(@class, 'text')]",
-                )
-                for elem in elements:
-                    text = elem.text.strip()
-                    if text and len(text) < 20:  # 过滤掉非角色名的长文本
-                        role_list.append(text)
-            elif game == "endfield":
-                # 从 span 元素中提取角色名
-                elements = driver.find_elements(
-                    By.XPATH, "//a[contains(@href, '/cn/operators/')]//span"
-                )
-                for elem in elements:
-                    text = elem.text.strip()
-                    if text and len(text) < 20 and text not in role_list:
-                        role_list.append(text)
+        Returns:
+            dict: 角色名 -> 详情页URL
+        """
+        if not worker or not worker.driver:
+            return {}
+        game_config = self.gamelist[game]
+        if not game_config.get("roster_link_xpath"):
+            return {}
+
+        driver = worker.driver
 
-            # 去重
-            role_list = list(dict.fromkeys(role_list))
-            logger.info(f"已获取 {game} 角色列表，共 {len(role_list)} 个角色")
+        def extract_roles() -> list[list[str]]:
+            # 一次脚本调用取回所有 [角色名, 链接]，避免逐个元素往返
+            return driver.execute_script(
+                ROSTER_EXTRACT_JS,
+                game_config["roster_link_xpath"],
+                game_config["roster_name_xpath"],
+            )
 
-            return role_list
+        try:
+            # 刷新索引需要最新列表，在常驻标签页中重新加载
+            tabs = await self._tabs(worker)
+            await worker.run(tabs.list_tab, game, game_config["url"], True)
+            # 等待角色链接出现且页面稳定，无需滚动
+            ready = await wait_until_ready(worker, game_config.get("list_ready"))
+            logger.info(f"{game} 角色列表页就绪耗时 {ready['elapsed']:.2f}s")
+            roles = {}
+            for name, href in await worker.run(extract_roles) or []:
+                # 过滤掉非角色名的长文本，同名只保留第一个
+                if name and len(name) < 20 and name not in roles:
+                    roles[name] = href
+            logger.info(f"已获取 {game} 角色列表，共 {len(roles)} 个角色")
+
+            return roles
         except Exception as e:
             logger.error(f"抓取角色列表失败: {str(e)}")
-            return []
+            return {}
+        finally:
+            # 切回启动时的标签页，之后的临时导航不会落在列表页上
+            if worker.tabs is not None and not worker.broken:
+                try:
+                    await worker.run(worker.tabs.base_tab)
+                except Exception as e:
+                    logger.warning(f"切回初始标签页失败: {str(e)}")
 
-    async def _handle_disambiguation_page(
+    async def _prepare_disambiguation(
         self,
-        event: AstrMessageEvent,
+        game: str,
         query_url: str,
-        original_query: str,
-    ):
+        worker=None,
+        options: list[dict] = None,
+    ) -> bool:
         """
-        处理以撒wiki的消歧义页面，识别所有选项并根据用户消息进行选择和跳转。
+        准备以撒wiki消歧义页的选择：取出选项并截好消歧义页，都放入缓存，
+        之后在释放调度名额和浏览器后再等待用户选择（见 _disambiguation_session）
+
+        Args:
+            worker: 从浏览器池租用的浏览器，提取选项和截图时直接使用；为空时截图再按需租用
+            options: 已通过 HTTP 请求提取的选项，为空时先查缓存，再在浏览器中按 XPath 提取
+
+        Returns:
+            bool: 选项和截图是否都已就绪
         """
-        try:
-            disambiguation_links = WebDriverWait(self.driver, 10).until(
-                EC.presence_of_all_elements_located(
-                    (
-                        By.XPATH,
-                        "//div[@class='mw-parser-output']/ul/li/span[@class='item']/a | //div[@class='mw-parser-output']/ul/li/span[@style='display:inline-block;']/a",
-                    )
-                )
+        options_xpath = self.gamelist[game]["disambiguation"]["options_xpath"]
+        ttl, _ = self.screenshot_cache.ttl_for(game)
+
+        def collect_options() -> list[dict]:
+            from selenium.webdriver.common.by import By
+            from selenium.webdriver.support import expected_conditions as EC
+            from selenium.webdriver.support.ui import WebDriverWait
+
+            disambiguation_links = WebDriverWait(worker.driver, 10).until(
+                EC.presence_of_all_elements_located((By.XPATH, options_xpath))
             )
             options = []
             for link_element in disambiguation_links:
@@ -438,207 +1631,370 @@ class FzInfoPlugin(Star):
                 href = link_element.get_attribute("href")
                 if title and href:
                     options.append({"title": title, "url": href})
+            return options
 
+        try:
+            cached = self.disambiguations.get(query_url)
+            if options is None and cached and time.time() - cached["created"] < ttl:
+                options = cached["options"]
+            if options is None and worker is not None:
+                options = await worker.run(collect_options)
             if not options:
                 logger.warning("未能在消歧义页面找到有效选项。")
-                event.send(
-                    event.plain_result("未能在消歧义页面找到有效选项。杂鱼程序员")
-                )
-                return None
-
+                return False
             logger.info(f"{options}")
-            output_path = os.path.join(
-                self.gamelist["issac"]["output_dir"],
-                f"{original_query}消歧义页.png",
-            )
-            if (
-                not os.path.exists(output_path)
-                or time.time() - os.path.getmtime(output_path) > self.keep_temp_time
-            ):  # 1小时缓存
-                await self.take_full_screenshot(query_url, output_path, "issac")
-
-            msg_components = [
-                (Comp.Plain(text="请输入你要查看的选项序号数字\n")),
-                Comp.Image.fromFileSystem(output_path),
-            ]
-            await event.send(event.chain_result(msg_components))
+            self.disambiguations[query_url] = {
+                "options": options,
+                "created": time.time(),
+            }
+            while len(self.disambiguations) > 256:
+                self.disambiguations.pop(next(iter(self.disambiguations)))
+            return bool(await self._get_or_render(game, query_url, worker))
+        except Exception as e:
+            logger.error(f"处理以撒消歧义页面失败: {str(e)}", exc_info=True)
+            return False
 
-            @session_waiter(timeout=60, record_history_chains=False)
-            async def empty_mention_waiter(
-                controller: SessionController, event: AstrMessageEvent
-            ):
-                try:
-                    choice = event.message_str
-                    if choice == "取消":
-                        logger.info("用户取消选择")
-                        await event.send(event.plain_result("已退出wiki查询~"))
-                        controller.stop()
-                        return
-                    choice_index = int(choice) - 1  # 将用户输入转换为索引
-                    if 0 <= choice_index < len(options):
-                        logger.info(f"选择选项: {options[choice_index]['title']}")
-                        await event.send(
-                            event.plain_result(
-                                f"你选择了{choice_index + 1}: {options[choice_index]['title']}，请稍后..."
-                            )
-                        )
-                        matched_url = options[choice_index]["url"]
-                        output_path = os.path.join(
-                            self.gamelist["issac"]["output_dir"],
-                            f"{original_query}_{choice_index + 1}.png",
-                        )
-                        if (
-                            not os.path.exists(output_path)
-                            or time.time() - os.path.getmtime(output_path)
-                            > self.keep_temp_time
-                        ):
-                            await self.take_full_screenshot(
-                                matched_url, output_path, "issac"
-                            )
-                        await event.send(event.image_result(output_path))
-                        controller.stop()
-                        return
-                    else:
-                        logger.info(f"选项超出范围: {event.message_str}")
-                        await event.send(
-                            event.plain_result(
-                                f"选项超出范围。请输入1到{len(options)}之间的数字。"
-                            )
-                        )
-                        return
-                except ValueError:  # 处理非数字输入
-                    logger.warning(f"用户输入非数字: {event.message_str}")
-                    await event.send(
-                        event.plain_result(
-                            "无效输入。请输入一个阿拉伯数字作为选项序号。"
-                        )
-                    )
+    async def _disambiguation_session(
+        self, event: AstrMessageEvent, game: str, query_url: str
+    ) -> None:
+        """
+        发送消歧义页截图并等待用户输入选项序号，不占用调度名额和浏览器；
+        选中后按普通查询排队截图。同一会话再次进入时取消上一次的等待
+        """
+        entry = self.disambiguations.get(query_url)
+        images = self.screenshot_cache.lookup(game, query_url, allow_stale=True)
+        if not entry or not images:
+            await event.send(event.plain_result("消歧义页已失效，请重新查询"))
+            return
+        options = entry["options"]
+        session_key = event.unified_msg_origin
+        previous = self.choice_sessions.pop(session_key, None)
+        if previous and not previous.done():
+            previous.cancel()
+
+        msg_components = [
+            (Comp.Plain(text="请输入你要查看的选项序号数字\n")),
+            *[Comp.Image.fromFileSystem(path) for path in images],
+        ]
+        await event.send(event.chain_result(msg_components))
+        attempts = {"invalid": 0}
+
+        @session_waiter(
+            timeout=self.config.get("disambiguation_timeout", 60),
+            record_history_chains=False,
+        )
+        async def empty_mention_waiter(
+            controller: SessionController, event: AstrMessageEvent
+        ):
+            choice = event.message_str.strip()
+            if choice == "取消":
+                logger.info("用户取消选择")
+                await event.send(event.plain_result("已退出wiki查询~"))
+                controller.stop()
+                return
+            try:
+                choice_index = int(choice) - 1  # 将用户输入转换为索引
+            except ValueError:  # 处理非数字输入
+                logger.warning(f"用户输入非数字: {event.message_str}")
+                message = "无效输入。请输入一个阿拉伯数字作为选项序号。"
+            else:
+                if 0 <= choice_index < len(options):
+                    controller.stop()
+                    option = options[choice_index]
+                    logger.info(f"选择选项: {option['title']}")
+                    await self._send_choice(event, game, choice_index + 1, option)
                     return
+                logger.info(f"选项超出范围: {event.message_str}")
+                message = f"选项超出范围。请输入1到{len(options)}之间的数字。"
+            attempts["invalid"] += 1
+            if attempts["invalid"] >= 3:
+                await event.send(event.plain_result("输入错误次数过多，已退出wiki查询"))
+                controller.stop()
+                return
+            await event.send(event.plain_result(message))
+
+        task = asyncio.ensure_future(empty_mention_waiter(event))
+        self.choice_sessions[session_key] = task
+        try:
+            await task
+        except TimeoutError:
+            logger.warning("用户操作超时。")
+            await event.send(event.plain_result("已退出wiki查询，操作超时"))
+        except asyncio.CancelledError:
+            if self.choice_sessions.get(session_key) is task:
+                raise  # 插件停用，不是被新的查询取代
+            logger.info("消歧义选择已被新的查询取代")
+        except Exception as e:
+            logger.error(f"处理用户选择时出错: {str(e)}", exc_info=True)
+        finally:
+            if self.choice_sessions.get(session_key) is task:
+                del self.choice_sessions[session_key]
+            event.stop_event()
 
+    async def _send_choice(
+        self, event: AstrMessageEvent, game: str, number: int, option: dict
+    ) -> None:
+        """按普通查询处理用户选中的消歧义选项：命中缓存直接发送，否则排队截图"""
+        images = self._lookup_or_revalidate(game, option["url"], count=True)
+        if not images:
             try:
-                await empty_mention_waiter(event)
-            except TimeoutError:
-                logger.warning("用户操作超时。")
-                await event.send(event.plain_result("已退出wiki查询，操作超时"))
-            except Exception as e:
-                logger.error(f"处理用户选择时出错: {str(e)}", exc_info=True)
+                ticket = self._submit(event)
+            except RateLimited as e:
+                await event.send(event.plain_result(str(e)))
+                return
+            try:
+                await event.send(
+                    event.plain_result(
+                        f"你选择了{number}: {option['title']}"
+                        f"{self._queue_hint(ticket)}，请稍后..."
+                    )
+                )
+                async with ticket:
+                    images = await self._render_shared(game, option["url"])
+            except PoolBusyError as e:
+                logger.warning(f"浏览器池繁忙: {str(e)}")
+                await event.send(event.plain_result("当前查询人数过多，请稍后再试"))
+                return
             finally:
-                event.stop_event()
-        except Exception as e:
-            logger.error(f"处理以撒消歧义页面失败: {str(e)}", exc_info=True)
-            return None
+                ticket.cancel()
+        if images:
+            await event.send(self._image_result(event, images))
+        else:
+            await event.send(event.plain_result("截图失败，请稍后再试"))
 
     async def take_full_screenshot(
-        self, url: str, output_path: str, game: str = None, delay: int = 10
+        self,
+        url: str,
+        output_path: str,
+        game: str = None,
+        delay: int = 10,
+        worker=None,
+        section: dict = None,
+        tiles: list[str] = None,
     ) -> bool:
         """
         截取指定网站的完整页面截图并保存到本地
 
+        页面高度超过 tile_threshold 时不再把窗口拉到整页高度，而是按固定高度的视口
+        逐段滚动截图，再逐块拼接成一张图
+
         Args:
             url: 要截图的网站URL
             output_path: 截图保存路径
             delay: 页面加载等待时间(秒)
+            worker: 从浏览器池租用的浏览器，所有浏览器操作都在其专属线程中执行
+            section: 栏目规则，指定时只截取匹配的元素，页面中没有该栏目时截图失败
+            tiles: 分块截图时，传入的列表中会追加各块的路径（从上到下），
+                调用方可直接按块压缩，用完后自行删除；不传时拼接后即删除
 
         Returns:
             bool: 截图是否成功
         """
+        if not worker or not worker.driver:
+            logger.error("浏览器驱动未初始化")
+            return False
+        driver = worker.driver
+
+        game_config = self.gamelist.get(game, {})
+
+        def locate_last_height() -> int:
+            """按站点配置的 crop_end 规则定位页面有效内容的底部位置"""
+            for rule in game_config.get("crop_end", []):
+                if (
+                    rule["if_source_contains"]
+                    and rule["if_source_contains"] not in driver.page_source
+                ):
+                    continue
+                elements = driver.find_elements(rule["by"], rule["value"])
+                if not elements:
+                    continue
+                element = elements[-1]
+                height = element.location["y"] + rule["offset"]
+                if rule["edge"] == "bottom":
+                    height += element.size["height"]
+                return height
+            # 没有配置或都未命中时截到页面底部
+            return driver.execute_script("return document.body.scrollHeight")
+
+        def locate_section() -> dict:
+            return driver.execute_script(
+                SECTION_RECTS_JS,
+                section["by"],
+                section["value"],
+                section["end_by"],
+                section["end_value"],
+                section["padding"],
+            )
+
+        viewport_width = game_config.get("viewport_width", 1920)
+
+        def capture(last_height: int) -> None:
+            driver.set_window_size(viewport_width, last_height)
+            driver.execute_script("window.scrollTo(0, 0);")
+            driver.save_screenshot(output_path)
+
+        tile_paths: list[str] = []
+
+        def capture_tile(top: int, bottom: int, viewport_height: int) -> bool:
+            """截取页面 [top, bottom) 一段，已滚动到页面底部仍够不到 top 时返回 False"""
+            scrolled = driver.execute_script(TILE_SCROLL_JS, top)
+            if top - scrolled >= viewport_height:
+                return False
+            png = driver.get_screenshot_as_png()
+            if top == 0:
+                driver.execute_script(HIDE_FIXED_JS)
+            path = f"{output_path[: -len('.png')]}.tile{len(tile_paths)}.png"
+            tile_paths.append(path)
+            save_tile(png, path, top - scrolled, bottom - scrolled, viewport_height)
+            return True
+
+        async def capture_tiled(last_height: int) -> None:
+            # 每一块单独作为一次浏览器操作，超长页面也不会触发单次操作超时
+            await worker.run(driver.set_window_size, viewport_width, self.tile_height)
+            viewport_height = await worker.run(
+                driver.execute_script, "return window.innerHeight;"
+            )
+            for top in range(0, last_height, viewport_height):
+                bottom = min(top + viewport_height, last_height)
+                if not await worker.run(capture_tile, top, bottom, viewport_height):
+                    break
+            size = await asyncio.to_thread(stitch_tiles, tile_paths, output_path)
+            logger.info(
+                f"分块截图完成，共 {len(tile_paths)} 块，拼接后 {size[0]}x{size[1]}"
+            )
+
+        tabs = None
+        tab = None
         try:
             logger.info(f"开始截图: {url}")
-            driver = self.driver
-            driver.get(url)
-            initial_height = 0
-            scroll_segments = 5  # 将页面分成 5 段滚动
-            scroll_pause_time = 0.75  # 每段滑动后等待0.75秒，可根据需要调整
-
-            for i in range(scroll_segments):  # 分段滚动
-                driver.execute_script(
-                    f"window.scrollTo(0, document.body.scrollHeight / {scroll_segments} * ({i + 1}));"
-                )
-                await asyncio.sleep(scroll_pause_time)
-                new_height = driver.execute_script("return document.body.scrollHeight")
-                if new_height > initial_height:
-                    initial_height = new_height
-                if i == scroll_segments - 1:
-                    driver.execute_script(
-                        "window.scrollTo(0, document.body.scrollHeight);"
-                    )
-                    await asyncio.sleep(
-                        scroll_pause_time
-                    )  # 确保最终完全滚动到底部并等待
-            if game == "issac":
-                if "分类:消歧义页" in driver.page_source:
-                    element = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located(
-                            (
-                                By.XPATH,
-                                "//a[@title='分类:消歧义页' and text()='消歧义页']",
-                            )
-                        )
-                    )
-                    last_height = element.location["y"] + 300
-                else:
-                    element = WebDriverWait(driver, 10).until(
-                        EC.presence_of_element_located((By.ID, "mw-normal-catlinks"))
-                    )
-                    last_height = element.location["y"]
-            # 保留逻辑，以备不时之需
-            # elif game == "sr" or game == "ys":
-            #     driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            #     await asyncio.sleep(scroll_pause_time)  # 等待页面加载完成
-            #     element = (
-            #         driver.find_elements(By.CSS_SELECTOR, "div.a_section.c_0.c_3")[-1]
-            #         if game == "sr"
-            #         else driver.find_elements(
-            #             By.CSS_SELECTOR, "div.a_section.shows.shows_3"
-            #         )[-1]
-            #     )
-            #     last_height = (
-            #         element.location["y"] + element.size["height"] + 500
-            #     )  # 适配sr/ys页面
-            elif game in ["zzz", "ww", "sr", "ys"]:
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                await asyncio.sleep(scroll_pause_time)  # 等待页面加载完成
-                element = driver.find_elements(
-                    By.CSS_SELECTOR,
-                    "div.flex.flex-col.justify-center.text-sm.font-light.text-gray-400.border-opacity-20",
-                )[-1]
-                last_height = (
-                    element.location["y"] + element.size["height"]
-                )  # 适配zzz/ww页面
-            elif game == "fz":
-                driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                await asyncio.sleep(scroll_pause_time)  # 等待页面加载完成
-                element = driver.find_elements(By.ID, "footer-poweredbyico")[-1]
-                last_height = (
-                    element.location["y"] + element.size["height"]
-                )  # 适配fz页面
-
-            else:  # 终末地和其他默认逻辑
-                last_height = driver.execute_script("return document.body.scrollHeight")
+            started_at = time.monotonic()
+            # 详情页在临时标签页中打开，不影响常驻的列表页
+            tabs = await self._tabs(worker)
+            tab = await worker.run(tabs.open_detail)
+            await worker.run(driver.set_window_size, viewport_width, 1080)
+            await worker.run(tabs.navigate, url)
+            navigated_at = time.monotonic()
+            # 按页面实际加载状态等待，不再固定分段滚动和休眠
+            ready = await wait_until_ready(worker, game_config.get("ready"))
+            ready_at = time.monotonic()
+            regions = None
+            if section:
+                located = await worker.run(locate_section)
+                regions = located["rects"]
+                if not regions:
+                    logger.warning(f"页面中未找到栏目 {section['name']}: {url}")
+                    return False
+                # 只需要渲染到最后一个栏目区域的底部
+                last_height = max(int(region[3]) for region in regions) + 1
+            else:
+                last_height = await worker.run(locate_last_height)
             logger.info(f"页面最终总高度: {last_height}px")
-            driver.set_window_size(1920, last_height)
-            driver.execute_script("window.scrollTo(0, 0);")
-            driver.save_screenshot(output_path)
-            logger.info(f"截图成功保存到: {output_path}")
+            if self.tile_threshold and last_height > self.tile_threshold:
+                await capture_tiled(last_height)
+            else:
+                await worker.run(capture, last_height)
+            if regions:
+                await asyncio.to_thread(
+                    crop_regions, output_path, regions, located["width"]
+                )
+                logger.info(f"已裁出栏目 {section['name']}，共 {len(regions)} 块")
+            elif tiles is not None:
+                tiles.extend(tile_paths)
+                tile_paths.clear()
+            captured_at = time.monotonic()
+            self.metrics.record(game, "navigate", navigated_at - started_at)
+            self.metrics.record(game, "ready", ready["elapsed"])
+            self.metrics.record(game, "screenshot", captured_at - ready_at)
+            logger.info(
+                f"截图成功保存到: {output_path}，耗时 {captured_at - started_at:.2f}s"
+                f"（打开页面 {navigated_at - started_at:.2f}s，"
+                f"等待就绪 {ready['elapsed']:.2f}s{'' if ready['ready'] else '(超时)'}，"
+                f"定位与截图 {captured_at - ready_at:.2f}s）"
+            )
             return True
         except Exception as e:
             logger.error(f"截图失败: {str(e)}", exc_info=True)
             return False
+        finally:
+            remove_files(tile_paths)
+            if tab and not worker.broken:
+                try:
+                    # 关闭临时标签页并恢复窗口大小
+                    await worker.run(tabs.close_detail, tab)
+                except Exception as e:
+                    logger.warning(f"关闭截图标签页失败: {str(e)}")
 
     @filter.command("getscreenshot")
     async def getscreenshot_handler(self, event: AstrMessageEvent, url: str):
         """输入 getscreenshot [URL] 获取网页截图"""
-        output_path = os.path.join(self.assets_dir, "temp_screenshot.png")
-        success = await self.take_full_screenshot(url=url, output_path=output_path)
-        if success:
-            yield event.image_result(output_path)
-        else:
-            yield event.plain_result("截图失败，请检查URL是否正确")
+        self.last_query_at = time.time()
+        try:
+            ticket = self._submit(event)
+        except RateLimited as e:
+            self.metrics.incr("web", "rate_limited")
+            yield event.plain_result(str(e))
+            return
+        try:
+            if ticket.position:
+                yield event.plain_result(f"正在排队{self._queue_hint(ticket)}")
+            async with ticket:
+                self.metrics.record("web", "schedule", ticket.waited)
+                # 每次都重新截图，但按 URL 独立存放，同一 URL 的并发请求共享一次截图
+                images = await self._render_shared("web", url, force=True)
+            if images:
+                yield self._image_result(event, images)
+            else:
+                yield event.plain_result("截图失败，请检查URL是否正确")
+        except PoolBusyError as e:
+            logger.warning(f"浏览器池繁忙: {str(e)}")
+            yield event.plain_result("当前查询人数过多，请稍后再试")
+        finally:
+            ticket.cancel()
+
+    @filter.permission_type(filter.PermissionType.ADMIN)
+    @filter.command("infostats", alias={"gameinfo统计"})
+    async def stats_handler(self, event: AstrMessageEvent, fmt: str = None):
+        """输入 infostats [json]    查看各阶段耗时、缓存命中与浏览器池统计（管理员）"""
+        data = self.metrics.dump(self.metrics_path, self._metrics_extra())
+        if fmt == "json":
+            yield event.plain_result(json.dumps(data, ensure_ascii=False, indent=2))
+            return
+        game_names = {game: cfg["name"] for game, cfg in self.gamelist.items()}
+        yield event.plain_result(
+            f"{format_report(data, game_names)}\n完整数据已写入 {self.metrics_path}"
+        )
 
     async def terminate(self):
         """可选择实现异步的插件销毁方法，当插件被卸载/停用时会调用。"""
+        if self.warmup_task:
+            self.warmup_task.cancel()
+        self.supervisor_task.cancel()
+        if self.metrics_task:
+            self.metrics_task.cancel()
+        try:
+            self.metrics.dump(self.metrics_path, self._metrics_extra())
+        except Exception as e:
+            logger.error(f"写入统计数据失败: {str(e)}")
+        self.roster_task.cancel()
+        self.prewarm_task.cancel()
+        self.cache_task.cancel()
+        if self.shared_sync_task:
+            self.shared_sync_task.cancel()
+        for task in self.choice_sessions.values():
+            task.cancel()
+        for task in list(self._bg_tasks):
+            task.cancel()
+        self.screenshot_cache.save()
+        if self.http_resolver:
+            await self.http_resolver.close()
         logger.info("退出driver...")
-        self.driver.quit()
+        await self.browser_pool.close()
+        if self.shared_store:
+            try:
+                await self.screenshot_cache.flush_shared()
+            except Exception as e:
+                logger.error(f"写入共享截图缓存失败: {str(e)}")
+            await self.shared_store.close()
 
     @filter.command("infohelp", alias={"gameinfo帮助"})
     async def help_handler(self, event: AstrMessageEvent):